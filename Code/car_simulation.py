@@ -9,42 +9,108 @@
 
 # ============================================================
 
+import re
 import sys
-import logging
-from datetime import datetime
+from time import perf_counter
+from bisect import bisect_right
+
+from car_simulation_trace import TRACE_OFF, TRACE_STEPS, TRACE_COMMANDS, configure_from_environment
 
 DIRECTIONS = ['N', 'E', 'S', 'W']
 MOVES = {'N': (0, 1), 'E': (1, 0), 'S': (0, -1), 'W': (-1, 0)}
 COMMANDS = ['L', 'R', 'F']
 
-# Configure logging
-# logging.basicConfig(filename="../Output/car_simulation_test.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-# logging.basicConfig(filename="../Output/car_simulation.log", level=logging.INFO, format="%(message)s")
+# Configure tracing
+# Set CAR_SIMULATION_TRACE=steps or commands (and optionally CAR_SIMULATION_TRACE_FILE=../Output/car_simulation.log)
+# before starting to see the execution step details. See car_simulation_trace.py.
 
 class PrintLog:
+    # The trace level and sink are chosen once at startup. Call sites check
+    # PrintLog.level before building an event, so with tracing off no
+    # logging work is done in the simulation loop.
+    level, sink = configure_from_environment()
+
+    @staticmethod
+    def configure(level, sink=None):
+        PrintLog.level = level if sink is not None else TRACE_OFF
+        PrintLog.sink = sink
+
+    @staticmethod
+    def event(event, *args):
+        PrintLog.sink.emit(event, args)
+
+    @staticmethod
     def print_log(message):
-        if 'pydevd' in sys.modules:
-            print(f"{message}")
-        # logging.info( f"{message}")
+        if PrintLog.level:
+            PrintLog.sink.emit('message', (message,))
+
+class Program:
+    # Run-length compiled form of a command buffer: one (command, start, count)
+    # entry per run of identical commands, e.g. FFFFRR -> (F, 0, 4), (R, 4, 2).
+    def __init__(self, commands):
+        self.runs = [(chr(m.group(1)[0]), m.start(), m.end() - m.start())
+                     for m in re.finditer(rb"(.)\1*", commands, re.S)]
+        self.starts = [start for _, start, _ in self.runs]
+        # Number of F moves made before each run starts.
+        self.moves = []
+        total = 0
+        for command, start, count in self.runs:
+            self.moves.append(total)
+            if command == 'F':
+                total += count
+        self.total_moves = total
+
+    def run_at(self, cursor):
+        return bisect_right(self.starts, cursor) - 1
+
+    def moves_left(self, cursor):
+        # Number of F commands at or after the cursor.
+        if not self.runs:
+            return 0
+        i = self.run_at(cursor)
+        command, start, count = self.runs[i]
+        done = self.moves[i] + (min(cursor - start, count) if command == 'F' else 0)
+        return self.total_moves - done
+
+    def __len__(self):
+        return len(self.runs)
+
 
 class Car:
+    # Fixed attributes keep a car small when there are millions of them.
+    __slots__ = ('name', 'x', 'y', 'direction', 'commands', 'cursor', 'origin', 'program',
+                 'index', 'step', 'collided', 'collision_record')
+
     def __init__(self, name, x, y, direction, commands):
         self.name = name
         self.x = x
         self.y = y
         self.direction = direction
-        self.commands = list(commands)
+        # Keep the program as an immutable buffer and walk it with a cursor,
+        # so consuming a command is O(1) and the original program is kept.
+        if isinstance(commands, bytes):
+            self.commands = commands
+        else:
+            self.commands = "".join(commands).encode("ascii", errors="replace")
+        self.cursor = 0
+        self.origin = (x, y, direction)
+        self.program = None
+        self.index = None
         self.step = 0
         self.collided = False
-        self.collision_record = list() # create empty list.
+        # (other car index, x, y, step) per collision; turned into text
+        # only when displayed. Allocated on the first collision.
+        self.collision_record = ()
 
     def rotate_left(self):
         self.direction = DIRECTIONS[(DIRECTIONS.index(self.direction) - 1) % 4]
-        PrintLog.print_log(f"Car {self.name} stays at ({self.x}, {self.y})")
+        if PrintLog.level >= TRACE_COMMANDS:
+            PrintLog.event('stays', self.name, self.x, self.y)
 
     def rotate_right(self):
         self.direction = DIRECTIONS[(DIRECTIONS.index(self.direction) + 1) % 4]
-        PrintLog.print_log(f"Car {self.name} stays at ({self.x}, {self.y})")
+        if PrintLog.level >= TRACE_COMMANDS:
+            PrintLog.event('stays', self.name, self.x, self.y)
 
     def move_forward(self, width, height):
         if not self.collided:
@@ -52,14 +118,57 @@ class Car:
             new_x, new_y = self.x + dx, self.y + dy
             if 0 <= new_x < width and 0 <= new_y < height:
                 self.x, self.y = new_x, new_y
-                PrintLog.print_log(f"Car {self.name} moves to ({self.x}, {self.y}) in direction {self.direction}")
-            else:
-                PrintLog.print_log(f"Car {self.name} stays at ({self.x}, {self.y})")
+                if PrintLog.level >= TRACE_COMMANDS:
+                    PrintLog.event('moves', self.name, self.x, self.y, self.direction)
+            elif PrintLog.level >= TRACE_COMMANDS:
+                PrintLog.event('stays', self.name, self.x, self.y)
+
+    def has_commands(self):
+        return self.cursor < len(self.commands)
+
+    def next_command(self):
+        command = chr(self.commands[self.cursor])
+        self.cursor += 1
+        return command
+
+    def compile(self):
+        if self.program is None:
+            self.program = Program(self.commands)
+        return self.program
+
+    def moves_left(self):
+        return self.compile().moves_left(self.cursor)
+
+    def fast_forward(self, steps, width, height):
+        # Process up to `steps` commands a whole run at a time, without
+        # collision checks. A run of F moves is clamped at the field
+        # boundary, the same place repeated move_forward calls stop.
+        if self.collided:
+            return
+        program = self.compile()
+        end = min(self.cursor + steps, len(self.commands))
+        i = program.run_at(self.cursor)
+        while self.cursor < end:
+            command, start, count = program.runs[i]
+            n = min(start + count, end) - self.cursor
+            if command == 'L':
+                self.direction = DIRECTIONS[(DIRECTIONS.index(self.direction) - n) % 4]
+            elif command == 'R':
+                self.direction = DIRECTIONS[(DIRECTIONS.index(self.direction) + n) % 4]
+            elif command == 'F':
+                dx, dy = MOVES[self.direction]
+                self.x = min(max(self.x + dx * n, 0), width - 1)
+                self.y = min(max(self.y + dy * n, 0), height - 1)
+            self.cursor += n
+            i += 1
+        if PrintLog.level >= TRACE_COMMANDS:
+            PrintLog.event('fast_forward', self.name, self.x, self.y, self.direction)
 
     def process_command(self, command, width, height):
         if not self.collided:
 
-            PrintLog.print_log(f"Car {self.name} processes command {command}")
+            if PrintLog.level >= TRACE_COMMANDS:
+                PrintLog.event('command', self.name, command)
 
             if command == 'L':
                 self.rotate_left()
@@ -68,100 +177,338 @@ class Car:
             elif command == 'F':
                 self.move_forward(width, height)
 
+    def record_collision(self, other, x, y, step):
+        if not self.collision_record:
+            self.collision_record = []
+        self.collision_record.append((other, x, y, step))
+
     def __str__(self):
-        return f'- {self.name}, ({self.x},{self.y}) {self.direction}, {"".join(self.commands)}'
+        # Show the car as it was added: starting position and full program.
+        x, y, direction = self.origin
+        return f'- {self.name}, ({x},{y}) {direction}, {self.commands.decode("ascii")}'
 
 
 
-class Simulation:
+# Fields with at most this many cells, and at most DENSE_CELLS_PER_CAR
+# cells per car, use a dense occupancy grid; sparse fields use a hash.
+DENSE_GRID_CELLS = 1 << 20
+DENSE_CELLS_PER_CAR = 64
+
+# Coordinates are 64-bit: the field can be at most this wide and high.
+MAX_FIELD_SIZE = (1 << 63) - 1
+
+
+class GridOccupancy:
+    # Dense occupancy index: one slot per cell of the field.
     def __init__(self, width, height):
-        self.width = width
         self.height = height
-        self.cars = []
-        self.cars_original = []
+        self.cells = [None] * (width * height)
 
-    def add_car(self, name, x, y, direction, commands):
-        self.cars.append(Car(name, x, y, direction, commands))
+    def add(self, car):
+        key = car.x * self.height + car.y
+        if self.cells[key] is None:
+            self.cells[key] = [car]
+        else:
+            self.cells[key].append(car)
 
-    def add_car_original(self, name, x, y, direction, commands):
-        self.cars_original.append(Car(name, x, y, direction, commands))
+    def move(self, car, old_x, old_y):
+        self.cells[old_x * self.height + old_y].remove(car)
+        self.add(car)
 
-    def run(self):
+    def at(self, x, y):
+        return self.cells[x * self.height + y] or ()
 
-        # Run and move every car for each step
-        step = 0
 
-        while True:
+class HashOccupancy:
+    # Sparse occupancy index: only occupied cells are stored.
+    def __init__(self):
+        self.cells = {}
 
-            active_commands = False
+    def add(self, car):
+        key = (car.x, car.y)
+        if key in self.cells:
+            self.cells[key].append(car)
+        else:
+            self.cells[key] = [car]
 
-            # Creates an empty dictionary
-            positions = {}
+    def move(self, car, old_x, old_y):
+        cell = self.cells[(old_x, old_y)]
+        cell.remove(car)
+        if not cell:
+            del self.cells[(old_x, old_y)]
+        self.add(car)
 
-            # Check every car
-            for car in self.cars:
-                # If there is a command and not yet collided, move it.
-                if car.commands and not car.collided:
+    def at(self, x, y):
+        return self.cells.get((x, y), ())
 
-                    active_commands = True
 
-                    PrintLog.print_log(f"Step {step + 1} - Car {car.name}: {car.x}, {car.y}, {car.direction}")
+class StepDelta:
+    # What changed in one step: `moved` holds (car index, x, y, direction)
+    # of every car that processed a command, `collisions` holds
+    # (car index, other car index, x, y) of every collision in the step.
+    __slots__ = ('step', 'moved', 'collisions')
 
-                    # Pull the current command from the command list.
-                    car.process_command(car.commands.pop(0), self.width, self.height)
-                    # Record the current position
-                    pos = (car.x, car.y, step)
+    def __init__(self, step, moved, collisions):
+        self.step = step
+        self.moved = moved
+        self.collisions = collisions
 
-                    # This position at this step has no car, add it.
-                    if not pos in positions:
-                        positions[pos] = [car]
-                    else:
-                        # Meaning collision occurs !
-                        # print(f'- {positions[pos].name}, collides with {car.name} at {(positions[pos].x, positions[pos].y)} at step {step + 1}')
-                        # print(f'- {car.name}, collides with {positions[pos].name} at {(car.x, car.y)} at step {step + 1}')
+    def as_dict(self):
+        return {'step': self.step, 'moved': self.moved, 'collisions': self.collisions}
 
-                        # get each previous car at pos
-                        for c in positions[pos]:
-                            c.collided = True
-                            # append its collision list.
-                            c.collision_record.append(f'- {c.name}, collides with {car.name} at {(car.x, car.y)} at step {step + 1}')
-                            # append the current car's collision list.
-                            car.collision_record.append(f'- {car.name}, collides with {c.name} at {(c.x, c.y)} at step {step + 1}')
 
-                        car.collided = True
-                        positions[pos].append(car)
+class Simulation:
+    # Engines whose run() recomputes the whole result from step 0 set this,
+    # so metrics count that whole run.
+    RUNS_FROM_START = False
 
-            if not active_commands:
-                break
+    def __init__(self, width, height, stationary_collisions=False, swap_collisions=False):
+        self.width = width
+        self.height = height
+        self.cars = []
+        # When set, cars that are not moving (parked, out of commands or
+        # already collided) can also be hit by a moving car.
+        self.stationary_collisions = stationary_collisions
+        # When set, two cars that swap cells head-on in the same step
+        # collide as well, each in the cell it drove into.
+        self.swap_collisions = swap_collisions
+        self.occupancy = None
+        # Steps run so far; run() and iter_steps() continue from here.
+        self.steps = 0
+        # A Metrics object (see car_simulation_metrics.py) to time and count
+        # runs; with None, run() and step_cars() skip all bookkeeping.
+        self.metrics = None
 
+    def add_car(self, name, x, y, direction, commands):
+        car = Car(name, x, y, direction, commands)
+        car.index = len(self.cars)
+        self.cars.append(car)
+        if self.occupancy is not None:
+            self.occupancy.add(car)
+
+    def build_occupancy(self):
+        cells = self.width * self.height
+        if cells <= DENSE_GRID_CELLS and cells <= DENSE_CELLS_PER_CAR * len(self.cars):
+            occupancy = GridOccupancy(self.width, self.height)
+        else:
+            occupancy = HashOccupancy()
+        for car in self.cars:
+            occupancy.add(car)
+        return occupancy
+
+    def active_cars(self, cars=None):
+        return [car for car in (self.cars if cars is None else cars) if car.has_commands() and not car.collided]
+
+    def run(self):
+        # Every engine runs through here and overrides run_steps(), so the
+        # run is timed and counted the same way whichever engine runs it.
+        metrics = self.metrics
+        if metrics is None:
+            self.run_steps()
+            return
+
+        if self.RUNS_FROM_START:
+            first_step, commands, records = 0, 0, 0
+        else:
+            first_step = self.steps
+            commands, records = self.progress()
+        started = perf_counter()
+        self.run_steps()
+        seconds = perf_counter() - started
+        last_commands, last_records = self.progress()
+        # Each collision adds a record to both of its cars.
+        metrics.observe_run(seconds, self.steps - first_step, last_commands - commands,
+                            (last_records - records) // 2)
+
+    def progress(self):
+        # (commands processed, collision records) over every car.
+        return (sum(car.cursor for car in self.cars),
+                sum(len(car.collision_record) for car in self.cars))
+
+    def run_steps(self):
+        # Run and move every car for each step
+        step = self.steps
+        active = self.active_cars()
+
+        while self.step_cars(step, active):
             step += 1
+            active = self.active_cars(active)
+        self.steps = step
 
+    def rewind(self):
+        # Put every car back where it was added, ready to run from step 0.
+        for car in self.cars:
+            car.x, car.y, car.direction = car.origin
+            car.cursor = 0
+            car.step = 0
+            car.collided = False
+            car.collision_record = ()
+        self.occupancy = None
+        self.steps = 0
+
+    def rerun(self):
+        # Run from step 0 with every car, including cars added since the
+        # last run.
+        self.rewind()
+        self.run()
+
+    def iter_steps(self):
+        # Run the simulation one step at a time, yielding a StepDelta after
+        # each step. No history is kept, and the step counter lives on the
+        # simulation, so a consumer can stop at any point and carry on later
+        # with another iter_steps() or run().
+        active = self.active_cars()
+        while active:
+            step = self.steps
+            collisions = []
+            self.step_cars(step, active, collisions)
+            self.steps = step + 1
+            moved = [(car.index, car.x, car.y, car.direction) for car in active if car.step == step + 1]
+            yield StepDelta(step + 1, moved, collisions)
+            active = self.active_cars(active)
+
+    async def aiter_steps(self, steps_per_yield=1):
+        # iter_steps() for asyncio consumers; control goes back to the
+        # event loop every `steps_per_yield` steps.
+        import asyncio
+        for delta in self.iter_steps():
+            yield delta
+            if delta.step % steps_per_yield == 0:
+                await asyncio.sleep(0)
+
+    def fast_forward_cars(self, cars, steps):
+        # Fast-forward `cars` without collision checks, keeping the
+        # occupancy index up to date.
+        for car in cars:
+            old_x, old_y = car.x, car.y
+            car.fast_forward(steps, self.width, self.height)
+            if self.occupancy is not None and (car.x != old_x or car.y != old_y):
+                self.occupancy.move(car, old_x, old_y)
+
+    def step_cars(self, step, cars, collisions=None):
+        # Process one command of every active car in `cars`.
+        # Returns False once none of them has a command left.
+        # New collisions are appended to `collisions` if it is given,
+        # as (car index, other car index, x, y).
+
+        if self.occupancy is None:
+            self.occupancy = self.build_occupancy()
+        occupancy = self.occupancy
+        stationary = self.stationary_collisions
+        # Directed edges (old x, old y, new x, new y) driven in this step, so
+        # a car driving an edge backwards finds the cars it swapped with.
+        edges = {} if self.swap_collisions else None
+
+        # Per-phase timing, only when metrics are collected.
+        metrics = self.metrics
+        timed = metrics is not None
+        if timed:
+            step_started = perf_counter()
+            command_seconds = collision_seconds = 0.0
+            moved = hits = 0
+
+        active_commands = False
+
+        # Check every car
+        for car in cars:
+            # If there is a command and not yet collided, move it.
+            if car.has_commands() and not car.collided:
+
+                active_commands = True
+
+                if PrintLog.level >= TRACE_STEPS:
+                    PrintLog.event('step', step + 1, car.name, car.x, car.y, car.direction)
+
+                if timed:
+                    started = perf_counter()
+                old_x, old_y = car.x, car.y
+                # Pull the next command from the command buffer.
+                car.process_command(car.next_command(), self.width, self.height)
+                # Mark the car as moved in this step.
+                car.step = step + 1
+                if car.x != old_x or car.y != old_y:
+                    occupancy.move(car, old_x, old_y)
+                if timed:
+                    moved_at = perf_counter()
+                    command_seconds += moved_at - started
+                    moved += 1
+
+                # Cars already in this cell that collide with this car: the ones
+                # that moved earlier in this step, and optionally stationary ones.
+                others = [c for c in occupancy.at(car.x, car.y)
+                          if c is not car and (c.step == step + 1 or (stationary and (c.collided or not c.has_commands())))]
+
+                # Cars that drove the other way along the same edge in this step.
+                if edges is not None and (car.x != old_x or car.y != old_y):
+                    others.extend(edges.get((car.x, car.y, old_x, old_y), ()))
+                    edges.setdefault((old_x, old_y, car.x, car.y), []).append(car)
+
+                if others:
+                    # Meaning collision occurs !
+                    others.sort(key=lambda c: c.index)
+
+                    # get each previous car at pos
+                    for c in others:
+                        if PrintLog.level >= TRACE_STEPS:
+                            PrintLog.event('collision', step + 1, car.name, c.name, car.x, car.y)
+                        c.collided = True
+                        if collisions is not None:
+                            collisions.append((car.index, c.index, car.x, car.y))
+                        # append its collision list.
+                        c.record_collision(car.index, c.x, c.y, step + 1)
+                        # append the current car's collision list.
+                        car.record_collision(c.index, car.x, car.y, step + 1)
+
+                    car.collided = True
+                    if timed:
+                        hits += len(others)
+
+                if timed:
+                    collision_seconds += perf_counter() - moved_at
+
+        if timed and active_commands:
+            metrics.observe_step(perf_counter() - step_started, moved, hits, command_seconds, collision_seconds)
+        return active_commands
+
+    # Both listings are written with one print, not one per car.
     def display_original_position(self):
-        print("Your current list of cars are:")
-        for car in self.cars_original:
-            print(str(car))
+        print("\n".join(["Your current list of cars are:"] + [str(car) for car in self.cars]))
 
     def display_new_position(self):
-        print("\nAfter simulation, the result is:")
+        print("\n".join(["\nAfter simulation, the result is:"] + self.result_lines()))
+
+    def result_lines(self):
+        lines = []
         for car in self.cars:
             if car.collided:
                 # Show all its collision records.
-                print("\n".join(car.collision_record))
+                lines.extend(self.collision_text(car, record) for record in car.collision_record)
             else:
                 # Show the final position of the car
-                print(f'- {car.name}, ({car.x},{car.y}) {car.direction}')
+                lines.append(f'- {car.name}, ({car.x},{car.y}) {car.direction}')
+        return lines
+
+    def collision_text(self, car, record):
+        other, x, y, step = record
+        return f'- {car.name}, collides with {self.cars[other].name} at {(x, y)} at step {step}'
 
     def reset(self):
         self.cars.clear()
-        self.cars_original.clear()
+        self.occupancy = None
+        self.steps = 0
 
 
 
 class ValidInput:
     @staticmethod
     def get_valid_input(car_name, width, height):
+        line = input(f"Please enter initial position of car {car_name} in x y Direction format:\n")
+        return ValidInput.parse_position(line, width, height)
+
+    @staticmethod
+    def parse_position(line, width, height):
         try:
-            x, y, direction = input(f"Please enter initial position of car {car_name} in x y Direction format:\n").split()
+            x, y, direction = line.split()
         except ValueError as e:
             raise ValueError(e)
 
@@ -184,7 +531,11 @@ class ValidInput:
 
     @staticmethod
     def get_valid_commands(car_name):
-        commands = input(f"Please enter the commands for car {car_name}:\n").strip()
+        return ValidInput.parse_commands(input(f"Please enter the commands for car {car_name}:\n"))
+
+    @staticmethod
+    def parse_commands(line):
+        commands = line.strip()
         if not all(command in COMMANDS for command in commands):
             raise ValueError(f"Error: Invalid command. Please enter only 'L', 'R', or 'F'.")
         return commands
@@ -193,9 +544,12 @@ class ValidInput:
 class VerifyFieldSize:
     @staticmethod
     def verify_width_height():
+        return VerifyFieldSize.parse_width_height(input("Please enter the width and height of the simulation field in x y format:\n"))
 
-        user_input = input("Please enter the width and height of the simulation field in x y format:\n").strip()
-        values = user_input.split()
+    @staticmethod
+    def parse_width_height(line):
+
+        values = line.strip().split()
 
         # Ensure exactly two values are entered
         if len(values) != 2:
@@ -212,26 +566,44 @@ class VerifyFieldSize:
         if width <= 0 or height <= 0:
             raise ValueError("Error: Width and height must be greater than zero.")
 
+        # Ensure coordinates fit in 64 bits
+        if width > MAX_FIELD_SIZE or height > MAX_FIELD_SIZE:
+            raise ValueError(f"Error: Width and height must be at most {MAX_FIELD_SIZE}.")
+
         return width, height
 
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # Headless command line, e.g. python -m car_simulation run scenario.txt --format json
+        from car_simulation_cli import main
+        sys.exit(main())
+
+    try:
+        # Running a field again after adding cars only recomputes what the new cars change.
+        from car_simulation_trajectory import IncrementalSimulation as FieldSimulation
+    except ImportError:
+        FieldSimulation = Simulation
+
     print("Welcome to Auto Driving Car Simulation!")
 
+    keep_field = False
     while True:
 
-        while True:
-            try:
-                width, height = VerifyFieldSize.verify_width_height()
-                break
-            except ValueError as e:
-                print(e)
-                continue
+        if not keep_field:
+            while True:
+                try:
+                    width, height = VerifyFieldSize.verify_width_height()
+                    break
+                except ValueError as e:
+                    print(e)
+                    continue
 
-        # Create the field
-        simulation = Simulation(width, height)
-        print(f"You have created a field of {width} x {height}.\n")
+            # Create the field
+            simulation = FieldSimulation(width, height)
+            print(f"You have created a field of {width} x {height}.\n")
+        keep_field = False
 
         while True:
             print("Please choose from the following options:")
@@ -264,14 +636,13 @@ if __name__ == '__main__':
                         print(e)
                         continue
 
-                simulation.add_car_original(car_name, x, y, direction, commands)
                 simulation.add_car(car_name, x, y, direction, commands)
                 simulation.display_original_position()
 
             elif choice == '2':
 
                 simulation.display_original_position()
-                simulation.run()
+                simulation.rerun()
                 simulation.display_new_position()
                 break
 
@@ -281,9 +652,10 @@ if __name__ == '__main__':
             try:
                 print("[1] Start over")
                 print("[2] Exit")
+                print("[3] Add more cars to this field")
                 choice = input().strip()
 
-                if choice not in {'1', '2'}:
+                if choice not in {'1', '2', '3'}:
                     raise ValueError("Invalid choice")
 
                 if choice == '1':
@@ -295,8 +667,13 @@ if __name__ == '__main__':
                     print("Thank you for running the simulation. Goodbye!")
                     sys.exit()
 
+                elif choice == '3':
+                    # Keep the field and its cars for a what-if run.
+                    keep_field = True
+                    break
+
             except ValueError as e:
-                print(f"❌ Error: {e}. Please enter 1 or 2.")  # Custom error message
+                print(f"❌ Error: {e}. Please enter 1, 2 or 3.")  # Custom error message
 
 
 
@@ -0,0 +1,136 @@
+# ============================================================
+
+# This Python script runs many independent car simulation scenarios.
+# Scenario files (any format read by car_simulation_loader.py) are taken
+# from directories, file paths or a stream of paths on stdin, parsed into
+# Simulation objects and spread over a ProcessPoolExecutor.
+# Results come back in input order, followed by throughput statistics.
+
+# Usage: python car_simulation_batch.py "../Input/Test Cases" --workers 4
+
+# ============================================================
+
+import os
+import sys
+import time
+import argparse
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+from car_simulation_loader import ENGINES, engine_class, load_file
+
+
+def run_scenario(job):
+    # Worker: parse and run one scenario file.
+    # Returns (path, [result lines of each simulation], error message,
+    # [(line number, message) of each invalid entry skipped]).
+    path, engine, strict, options = job
+    skipped = []
+    try:
+        simulations = load_file(path, engine_class(engine), strict, errors=skipped, **options)
+        results = []
+        for simulation in simulations:
+            simulation.run()
+            results.append(simulation.result_lines())
+        return path, results, None, skipped
+    except Exception as e:
+        return path, [], f"{type(e).__name__}: {e}", skipped
+
+
+def scenario_paths(sources):
+    # Expand directories into their .txt files; '-' reads paths from stdin.
+    for source in sources:
+        if source == '-':
+            for line in sys.stdin:
+                if line.strip():
+                    yield line.strip()
+        elif os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.endswith('.txt'):
+                    yield os.path.join(source, name)
+        else:
+            yield source
+
+
+class BatchRunner:
+    def __init__(self, workers=None, chunksize=None, engine='simulation', strict=False, **options):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.engine = engine
+        self.strict = strict
+        self.options = options
+        self.scenarios = 0
+        self.simulations = 0
+        self.errors = 0
+        # Invalid entries skipped while loading, outside strict mode.
+        self.skipped = 0
+        self.seconds = 0.0
+
+    def run(self, paths):
+        # Yield (path, results, error, skipped entries) for every scenario,
+        # in input order.
+        # Paths are consumed a window at a time so a long stream of
+        # scenarios does not have to be held in memory.
+        start = time.perf_counter()
+        jobs = ((path, self.engine, self.strict, self.options) for path in paths)
+        chunksize = self.chunksize or 16
+        window = self.workers * chunksize * 4
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                while True:
+                    batch = list(islice(jobs, window))
+                    if not batch:
+                        break
+                    size = self.chunksize or max(1, len(batch) // (self.workers * 4))
+                    for path, results, error, skipped in executor.map(run_scenario, batch, chunksize=size):
+                        self.scenarios += 1
+                        self.simulations += len(results)
+                        self.errors += error is not None
+                        self.skipped += len(skipped)
+                        yield path, results, error, skipped
+        finally:
+            self.seconds = time.perf_counter() - start
+
+    def stats(self):
+        rate = self.scenarios / self.seconds if self.seconds else 0.0
+        return (f"{self.scenarios} scenarios, {self.simulations} simulations, {self.errors} errors, "
+                f"{self.skipped} skipped entries in {self.seconds:.3f}s ({rate:.1f} scenarios/s) with {self.workers} workers")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run car simulation scenario files in parallel.")
+    parser.add_argument('sources', nargs='+', help="scenario files, directories of .txt files, or - to read paths from stdin")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunksize', type=int, default=None, help="scenarios sent to a worker at a time")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='simulation')
+    parser.add_argument('--strict', action='store_true', help="reject scenarios with invalid entries instead of skipping them")
+    parser.add_argument('--stationary-collisions', action='store_true', help="let moving cars hit parked cars")
+    parser.add_argument('--swap-collisions', action='store_true', help="let cars that swap cells head-on collide")
+    parser.add_argument('--trajectory-cache', type=int, default=None,
+                        help="solo paths each worker keeps across scenarios (incremental engine)")
+    args = parser.parse_args(argv)
+
+    if args.trajectory_cache and args.engine != 'incremental':
+        parser.error("--trajectory-cache needs --engine incremental")
+    options = {'stationary_collisions': True} if args.stationary_collisions else {}
+    if args.swap_collisions:
+        options['swap_collisions'] = True
+    if args.trajectory_cache:
+        options['cache'] = args.trajectory_cache
+    runner = BatchRunner(args.workers, args.chunksize, args.engine, args.strict, **options)
+    for path, results, error, skipped in runner.run(scenario_paths(args.sources)):
+        print(f"== {path}")
+        for number, message in skipped:
+            print(f"Skipped line {number}: {message}")
+        if error:
+            print(f"Error: {error}")
+        for lines in results:
+            print("\n".join(lines))
+            print()
+
+    print(runner.stats(), file=sys.stderr)
+    return 1 if runner.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# ===============================================================================================
+
+# This Python test script checks the batch runner in car_simulation_batch.py:
+# result order and error reporting.
+
+# ===============================================================================================
+
+
+import os
+import unittest
+
+from car_simulation_batch import BatchRunner, scenario_paths
+
+TEST_CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Input", "Test Cases")
+
+
+class TestBatchRunner(unittest.TestCase):
+    def test_results_in_input_order(self):
+        """Test if results come back in input order with statistics."""
+        paths = list(scenario_paths([TEST_CASES]))
+        runner = BatchRunner(workers=2, chunksize=1)
+        results = list(runner.run(paths))
+        self.assertEqual([path for path, _, _, _ in results], paths)
+        self.assertEqual(runner.scenarios, len(paths))
+        self.assertEqual(runner.errors, 0)
+        collide = dict((os.path.basename(path), lines) for path, lines, _, _ in results)["Total 2 cars, 2 cars collide.txt"]
+        self.assertEqual(collide, [['- CarA, collides with CarB at (5, 4) at step 7',
+                                    '- CarB, collides with CarA at (5, 4) at step 7']])
+
+    def test_incremental_engine_with_trajectory_cache(self):
+        """Test if the incremental engine with a per-worker trajectory cache gives the same results."""
+        paths = list(scenario_paths([TEST_CASES]))
+        expected = [results for _, results, _, _ in BatchRunner(workers=1).run(paths)]
+        runner = BatchRunner(workers=2, chunksize=1, engine='incremental', cache=1000)
+        self.assertEqual([results for _, results, _, _ in runner.run(paths)], expected)
+
+    def test_missing_file_is_reported(self):
+        """Test if a scenario that cannot be read is reported as an error."""
+        runner = BatchRunner(workers=1)
+        (path, results, error, _), = runner.run(["no such scenario.txt"])
+        self.assertEqual(results, [])
+        self.assertIn("FileNotFoundError", error)
+        self.assertEqual(runner.errors, 1)
+
+    def test_skipped_entries_are_reported(self):
+        """Test if the invalid entries skipped outside strict mode are reported and counted."""
+        path = os.path.join(TEST_CASES, "Invalid Selection, Total 3 cars.txt")
+        runner = BatchRunner(workers=1)
+        (_, results, error, skipped), = runner.run([path])
+        self.assertIsNone(error)
+        self.assertEqual(skipped[0][0], 2)
+        self.assertEqual(runner.skipped, len(skipped))
+        self.assertIn(f"{len(skipped)} skipped entries", runner.stats())
+
+    def test_strict_mode_rejects_invalid_entries(self):
+        """Test if strict mode reports a scenario with invalid entries as an error."""
+        path = os.path.join(TEST_CASES, "Invalid Selection, Total 3 cars.txt")
+        (_, results, error, _), = BatchRunner(workers=1).run([path])
+        self.assertEqual(len(results), 1)
+        (_, results, error, _), = BatchRunner(workers=1, strict=True).run([path])
+        self.assertIn("line 2:", error)
+
+
+if __name__ == "__main__":
+    unittest.main()
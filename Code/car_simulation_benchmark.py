@@ -0,0 +1,165 @@
+# ============================================================
+
+# This Python script benchmarks the car simulation engines.
+# Seeded synthetic workloads vary the number of cars, the command length,
+# the field size and the collision density one at a time, giving a scaling
+# curve for each. Every run is timed and its peak memory is traced; the
+# results are written as JSON and compared against a saved baseline.
+
+# Usage: python car_simulation_benchmark.py --engines simulation vectorized
+#            --out results.json [--baseline baseline.json] [--save-baseline baseline.json]
+#            [--swap-collisions]
+
+# ============================================================
+
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+
+from car_simulation_loader import ENGINES, engine_class
+from car_simulation_generator import iter_cars
+
+# The workload every scaling curve starts from.
+BASE = {'cars': 1000, 'commands': 100, 'width': 200, 'height': 200, 'density': 0.1}
+
+# Values taken by each parameter along its scaling curve.
+CURVES = {
+    'cars': [250, 1000, 4000, 16000],
+    'commands': [25, 100, 400, 1600],
+    'width': [50, 200, 800, 3200],
+    'density': [0.0, 0.1, 0.4, 0.8],
+}
+
+# Smaller workloads for a quick check.
+QUICK_BASE = {'cars': 200, 'commands': 50, 'width': 100, 'height': 100, 'density': 0.1}
+QUICK_CURVES = {
+    'cars': [50, 200, 800],
+    'commands': [25, 50, 100],
+    'width': [25, 100, 400],
+    'density': [0.0, 0.1, 0.5],
+}
+
+# A run slower than baseline by more than this factor is a regression.
+REGRESSION_FACTOR = 1.25
+
+
+def generate_cars(cars, commands, width, height, density, seed=0):
+    # Build a seeded list of (name, x, y, direction, commands) with the
+    # scenario generator: a `density` fraction of the cars is placed in
+    # head-on pairs that drive into each other; the rest start anywhere
+    # with random programs.
+    return list(iter_cars(cars, commands, width, height, density, seed=seed))
+
+
+def build_simulation(engine, workload, seed=0, **options):
+    simulation = engine_class(engine)(workload['width'], workload['height'], **options)
+    for car in generate_cars(seed=seed, **workload):
+        simulation.add_car(*car)
+    return simulation
+
+
+def workloads(curves=CURVES, base=BASE):
+    # Yield (curve name, workload) for every point of every scaling curve.
+    for name, values in curves.items():
+        for value in values:
+            workload = dict(base, **{name: value})
+            if name == 'width':
+                workload['height'] = value
+            yield name, workload
+
+
+def measure(engine, workload, seed=0, **options):
+    # Time one run, then trace the peak memory of a second run.
+    simulation = build_simulation(engine, workload, seed, **options)
+    start = time.perf_counter()
+    simulation.run()
+    seconds = time.perf_counter() - start
+    collisions = sum(car.collided for car in simulation.cars)
+
+    simulation = build_simulation(engine, workload, seed, **options)
+    tracemalloc.start()
+    simulation.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': seconds, 'peak_bytes': peak, 'collisions': collisions}
+
+
+def result_key(result):
+    return (result['engine'], result['curve'], result['cars'], result['commands'],
+            result['width'], result['height'], result['density'])
+
+
+def compare(results, baseline, factor=REGRESSION_FACTOR):
+    # Return (result, baseline result, time ratio) for every run that is
+    # in the baseline, and the subset of them that regressed.
+    saved = dict((result_key(b), b) for b in baseline['results'])
+    comparisons = []
+    for result in results['results']:
+        b = saved.get(result_key(result))
+        if b is not None and b['seconds'] > 0:
+            comparisons.append((result, b, result['seconds'] / b['seconds']))
+    regressions = [c for c in comparisons if c[2] > factor]
+    return comparisons, regressions
+
+
+def run_benchmarks(engines, curves=CURVES, base=BASE, seed=0, progress=None, **options):
+    results = []
+    for engine in engines:
+        for curve, workload in workloads(curves, base):
+            result = dict(engine=engine, curve=curve, **workload)
+            result.update(measure(engine, workload, seed, **options))
+            results.append(result)
+            if progress:
+                progress(result)
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'seed': seed, 'options': options,
+            'results': results}
+
+
+def describe(result):
+    return (f"{result['engine']:<11}{result['curve']:<9}{result['cars']:>7}{result['commands']:>9}"
+            f"{result['width']:>7}{result['density']:>8.2f}{result['seconds']:>10.4f}"
+            f"{result['peak_bytes'] / 2 ** 20:>10.1f}{result['collisions']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the car simulation engines.")
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=['simulation', 'vectorized'])
+    parser.add_argument('--quick', action='store_true', help="run the small scaling curves")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="write the results as JSON")
+    parser.add_argument('--baseline', help="compare against results saved earlier")
+    parser.add_argument('--save-baseline', help="also write the results as the new baseline")
+    parser.add_argument('--factor', type=float, default=REGRESSION_FACTOR, help="slowdown counted as a regression")
+    parser.add_argument('--swap-collisions', action='store_true', help="also detect cars that swap cells head-on")
+    args = parser.parse_args(argv)
+    options = {'swap_collisions': True} if args.swap_collisions else {}
+
+    print(f"{'engine':<11}{'curve':<9}{'cars':>7}{'commands':>9}{'width':>7}{'density':>8}{'seconds':>10}{'peak MiB':>10}{'crashed':>8}")
+    curves, base = (QUICK_CURVES, QUICK_BASE) if args.quick else (CURVES, BASE)
+    results = run_benchmarks(args.engines, curves, base, args.seed, progress=lambda result: print(describe(result)),
+                             **options)
+
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparisons, regressions = compare(results, baseline, args.factor)
+        print(f"\nCompared {len(comparisons)} runs against {args.baseline}:")
+        for result, _, ratio in comparisons:
+            flag = "  REGRESSION" if ratio > args.factor else ""
+            print(f"{describe(result)}{ratio:>8.2f}x{flag}")
+        if regressions:
+            print(f"{len(regressions)} regression(s) slower than {args.factor}x baseline.")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
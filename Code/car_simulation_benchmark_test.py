@@ -0,0 +1,77 @@
+# ===============================================================================================
+
+# This Python test script is the pytest-benchmark performance suite of the simulation engines,
+# plus checks of the synthetic workloads and baseline comparison in car_simulation_benchmark.py.
+# Run only the benchmarks with:    python -m pytest car_simulation_benchmark_test.py --benchmark-only
+# Save / compare a baseline with:  --benchmark-autosave / --benchmark-compare
+
+# ===============================================================================================
+
+
+import unittest
+
+import pytest
+
+from car_simulation_benchmark import BASE, QUICK_BASE, QUICK_CURVES, build_simulation, compare, generate_cars, workloads
+
+ENGINES = ['simulation', 'vectorized', 'segments', 'events']
+
+
+class TestWorkloads(unittest.TestCase):
+    def test_seeded(self):
+        """Test if the same seed generates the same workload."""
+        self.assertEqual(generate_cars(seed=7, **BASE), generate_cars(seed=7, **BASE))
+        self.assertNotEqual(generate_cars(seed=7, **BASE), generate_cars(seed=8, **BASE))
+
+    def test_shape(self):
+        """Test if the workload has the requested cars, commands and positions."""
+        cars = generate_cars(50, 30, 20, 10, 0.4)
+        self.assertEqual(len(cars), 50)
+        self.assertTrue(all(len(commands) == 30 for _, _, _, _, commands in cars))
+        self.assertTrue(all(0 <= x < 20 and 0 <= y < 10 for _, x, y, _, _ in cars))
+
+    def test_density_creates_collisions(self):
+        """Test if a higher collision density crashes more cars."""
+        crashed = []
+        for density in (0.0, 0.8):
+            simulation = build_simulation('vectorized', dict(BASE, density=density))
+            simulation.run()
+            crashed.append(sum(car.collided for car in simulation.cars))
+        self.assertLess(crashed[0], crashed[1])
+
+    def test_compare(self):
+        """Test if a run slower than the baseline is reported as a regression."""
+        result = dict(engine='simulation', curve='cars', seconds=2.0, **BASE)
+        baseline = dict(result, seconds=1.0)
+        comparisons, regressions = compare({'results': [result]}, {'results': [baseline]})
+        self.assertEqual(len(comparisons), 1)
+        self.assertEqual(regressions[0][2], 2.0)
+
+
+QUICK_WORKLOADS = list(workloads(QUICK_CURVES, QUICK_BASE))
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('curve, workload', QUICK_WORKLOADS,
+                         ids=[f"{curve}-{workload[curve]}" for curve, workload in QUICK_WORKLOADS])
+def test_run(request, engine, curve, workload):
+    """Time Simulation.run of each engine along the quick scaling curves."""
+    pytest.importorskip("pytest_benchmark")
+    benchmark = request.getfixturevalue('benchmark')
+    benchmark.group = curve
+    benchmark.extra_info.update(workload)
+    benchmark.pedantic(lambda simulation: simulation.run(), setup=lambda: ((build_simulation(engine, workload),), {}),
+                       rounds=3, iterations=1)
+
+
+@pytest.mark.parametrize('engine', ['simulation', 'vectorized'])
+@pytest.mark.parametrize('swap_collisions', [False, True])
+def test_swap_collisions(request, engine, swap_collisions):
+    """Time same-cell collision detection against same-cell plus head-on swap detection."""
+    pytest.importorskip("pytest_benchmark")
+    benchmark = request.getfixturevalue('benchmark')
+    benchmark.group = f"swaps-{engine}"
+    workload = dict(QUICK_BASE, density=0.5)
+    benchmark.pedantic(lambda simulation: simulation.run(),
+                       setup=lambda: ((build_simulation(engine, workload, swap_collisions=swap_collisions),), {}),
+                       rounds=3, iterations=1)
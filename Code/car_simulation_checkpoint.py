@@ -0,0 +1,197 @@
+# ============================================================
+
+# This Python script saves and restores the full state of a car simulation.
+# A checkpoint holds every car's position, heading, command cursor,
+# collided flag and collision records, plus the field and the step counter,
+# so a restored simulation continues exactly where the saved one stopped.
+
+# File layout: an 8 byte magic, a 4 byte little-endian header length and a
+# JSON header describing the arrays, followed by the arrays themselves as
+# contiguous little-endian data, each starting on a 64 byte boundary.
+# open_checkpoint() memory-maps the arrays without reading them.
+
+# ============================================================
+
+import gc
+import os
+import json
+import struct
+
+import numpy as np
+
+from car_simulation import Simulation, DIRECTIONS
+
+MAGIC = b"CARSIMCK"
+VERSION = 1
+ALIGN = 64
+
+
+class CheckpointError(ValueError):
+    pass
+
+
+def car_arrays(simulation):
+    # The state of every car as {name: contiguous array}.
+    cars = simulation.cars
+    n = len(cars)
+    headings = {d: i for i, d in enumerate(DIRECTIONS)}
+
+    def column(values, dtype):
+        return np.fromiter(values, dtype=dtype, count=n)
+
+    def packed(chunks):
+        # Concatenated byte strings and the offset of each one.
+        chunks = list(chunks)
+        offsets = np.zeros(n + 1, dtype='<i8')
+        np.cumsum([len(chunk) for chunk in chunks], out=offsets[1:])
+        return np.frombuffer(b"".join(chunks), dtype=np.uint8), offsets
+
+    names, name_offsets = packed(car.name.encode("utf-8") for car in cars)
+    programs, program_offsets = packed(car.commands for car in cars)
+
+    records = [record for car in cars for record in car.collision_record]
+    record_offsets = np.zeros(n + 1, dtype='<i8')
+    np.cumsum([len(car.collision_record) for car in cars], out=record_offsets[1:])
+    record = np.array(records, dtype='<i8').reshape(-1, 4)
+
+    return {
+        'x': column((car.x for car in cars), '<i8'),
+        'y': column((car.y for car in cars), '<i8'),
+        'heading': column((headings[car.direction] for car in cars), np.int8),
+        'cursor': column((car.cursor for car in cars), '<i8'),
+        'step': column((car.step for car in cars), '<i8'),
+        'collided': column((car.collided for car in cars), np.bool_),
+        'origin_x': column((car.origin[0] for car in cars), '<i8'),
+        'origin_y': column((car.origin[1] for car in cars), '<i8'),
+        'origin_heading': column((headings[car.origin[2]] for car in cars), np.int8),
+        'names': names,
+        'name_offsets': name_offsets,
+        'programs': programs,
+        'program_offsets': program_offsets,
+        'record_offsets': record_offsets,
+        'record_other': np.ascontiguousarray(record[:, 0]),
+        'record_x': np.ascontiguousarray(record[:, 1]),
+        'record_y': np.ascontiguousarray(record[:, 2]),
+        'record_step': np.ascontiguousarray(record[:, 3]),
+    }
+
+
+def aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def save_checkpoint(simulation, path):
+    # Write the state of `simulation` to `path`. The file is written next
+    # to `path` first and then renamed, so an interrupted save never
+    # replaces a good checkpoint with a partial one.
+    arrays = car_arrays(simulation)
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = [array.dtype.str, offset, len(array)]
+        offset = aligned(offset + array.nbytes)
+
+    header = json.dumps({
+        'version': VERSION,
+        'width': simulation.width,
+        'height': simulation.height,
+        'stationary_collisions': simulation.stationary_collisions,
+        'swap_collisions': simulation.swap_collisions,
+        'steps': simulation.steps,
+        'cars': len(simulation.cars),
+        'arrays': layout,
+    }).encode("utf-8")
+    data_start = aligned(len(MAGIC) + 4 + len(header))
+
+    temp = f"{path}.tmp"
+    with open(temp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_start + layout[name][1] - f.tell()))
+            # Arrays are written straight from their buffers, without copies.
+            f.write(array.data)
+    os.replace(temp, path)
+
+
+class Checkpoint:
+    # A checkpoint file opened read-only; `arrays` are memory-mapped views.
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                raise CheckpointError(f"Error: {path} is not a car simulation checkpoint.")
+            size, = struct.unpack('<I', f.read(4))
+            self.header = json.loads(f.read(size).decode("utf-8"))
+        if self.header['version'] != VERSION:
+            raise CheckpointError(f"Error: Unsupported checkpoint version {self.header['version']}.")
+
+        data_start = aligned(len(MAGIC) + 4 + size)
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        self.arrays = {}
+        for name, (dtype, offset, count) in self.header['arrays'].items():
+            start = data_start + offset
+            self.arrays[name] = buffer[start:start + count * np.dtype(dtype).itemsize].view(dtype)
+
+    def __len__(self):
+        return self.header['cars']
+
+    def names(self):
+        names = self.arrays['names'].tobytes()
+        offsets = self.arrays['name_offsets'].tolist()
+        return [names[a:b].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+
+    def restore(self, simulation_class=Simulation):
+        header, arrays = self.header, self.arrays
+        simulation = simulation_class(header['width'], header['height'],
+                                      stationary_collisions=header['stationary_collisions'],
+                                      swap_collisions=header.get('swap_collisions', False))
+        simulation.steps = header['steps']
+
+        programs = arrays['programs'].tobytes()
+        program_offsets = arrays['program_offsets'].tolist()
+        record_offsets = arrays['record_offsets'].tolist()
+        records = list(zip(arrays['record_other'].tolist(), arrays['record_x'].tolist(),
+                           arrays['record_y'].tolist(), arrays['record_step'].tolist()))
+
+        # Cars hold no reference cycles, so the cyclic garbage collector is
+        # paused while a large fleet is allocated instead of rescanning it.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            columns = zip(self.names(), arrays['origin_x'].tolist(), arrays['origin_y'].tolist(),
+                          arrays['origin_heading'].tolist(), arrays['x'].tolist(), arrays['y'].tolist(),
+                          arrays['heading'].tolist(), arrays['cursor'].tolist(), arrays['step'].tolist(),
+                          arrays['collided'].tolist())
+            for i, (name, ox, oy, oh, x, y, h, cursor, step, collided) in enumerate(columns):
+                simulation.add_car(name, ox, oy, DIRECTIONS[oh], programs[program_offsets[i]:program_offsets[i + 1]])
+                car = simulation.cars[i]
+                car.x, car.y, car.direction = x, y, DIRECTIONS[h]
+                car.cursor = cursor
+                car.step = step
+                car.collided = collided
+                if record_offsets[i + 1] > record_offsets[i]:
+                    car.collision_record = records[record_offsets[i]:record_offsets[i + 1]]
+        finally:
+            if enabled:
+                gc.enable()
+        return simulation
+
+
+def open_checkpoint(path):
+    return Checkpoint(path)
+
+
+def load_checkpoint(path, simulation_class=Simulation):
+    return Checkpoint(path).restore(simulation_class)
+
+
+def run_with_checkpoints(simulation, path, every):
+    # Run `simulation` to the end, saving a checkpoint every `every` steps
+    # and once more when it finishes.
+    for delta in simulation.iter_steps():
+        if delta.step % every == 0:
+            save_checkpoint(simulation, path)
+    save_checkpoint(simulation, path)
+    return simulation
@@ -0,0 +1,109 @@
+# ===============================================================================================
+
+# This Python test script checks that car_simulation_checkpoint.py saves the full state of a
+# simulation and that a restored simulation continues exactly like one that was never stopped.
+
+# ===============================================================================================
+
+
+import os
+import random
+import tempfile
+import unittest
+
+from car_simulation import Simulation
+from car_simulation_checkpoint import (ALIGN, CheckpointError, load_checkpoint, open_checkpoint,
+                                       run_with_checkpoints, save_checkpoint)
+from car_simulation_vectorized import VectorizedSimulation
+from car_simulation_test_helpers import build, random_cars
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "run.ckpt")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertSameState(self, actual, expected):
+        self.assertEqual((actual.width, actual.height, actual.steps), (expected.width, expected.height, expected.steps))
+        self.assertEqual((actual.stationary_collisions, actual.swap_collisions),
+                         (expected.stationary_collisions, expected.swap_collisions))
+        self.assertEqual(len(actual.cars), len(expected.cars))
+        for a, e in zip(actual.cars, expected.cars):
+            self.assertEqual((a.name, a.x, a.y, a.direction, a.commands, a.cursor, a.origin, a.index, a.collided),
+                             (e.name, e.x, e.y, e.direction, e.commands, e.cursor, e.origin, e.index, e.collided))
+            self.assertEqual(list(a.collision_record), list(e.collision_record))
+
+    def test_round_trip(self):
+        """Test that a checkpoint taken part way through a run restores every field."""
+        simulation = build(Simulation, 10, 10, [("A", 1, 2, 'N', "FFRFFFFRRL"), ("B", 7, 8, 'W', "FFLFFFFFFF"),
+                                                ("Ünïcode", 0, 0, 'E', "")])
+        for delta in simulation.iter_steps():
+            if delta.step == 4:
+                break
+        save_checkpoint(simulation, self.path)
+        restored = load_checkpoint(self.path)
+        self.assertSameState(restored, simulation)
+        self.assertEqual([car.step for car in restored.cars], [car.step for car in simulation.cars])
+
+    def test_resume_matches_uninterrupted_run(self):
+        """Test that runs resumed from a checkpoint end like uninterrupted runs."""
+        rng = random.Random(20250317)
+        for _ in range(20):
+            width, height = rng.randint(1, 8), rng.randint(1, 8)
+            cars = random_cars(rng, width, height, rng.randint(1, 25), 30)
+            options = {'stationary_collisions': rng.random() < 0.5, 'swap_collisions': rng.random() < 0.5}
+            expected = build(Simulation, width, height, cars, **options)
+            expected.run()
+
+            stopped = build(Simulation, width, height, cars, **options)
+            stop = rng.randint(1, 20)
+            for delta in stopped.iter_steps():
+                if delta.step == stop:
+                    break
+            save_checkpoint(stopped, self.path)
+
+            for simulation_class in (Simulation, VectorizedSimulation):
+                restored = load_checkpoint(self.path, simulation_class)
+                restored.run()
+                self.assertSameState(restored, expected)
+                self.assertEqual(restored.result_lines(), expected.result_lines())
+
+    def test_run_with_checkpoints(self):
+        """Test that the last periodic checkpoint holds the finished run."""
+        simulation = build(Simulation, 10, 10, [("A", 1, 2, 'N', "FFRFFFFRRL"), ("B", 7, 8, 'W', "FFLFFFFFFF")])
+        run_with_checkpoints(simulation, self.path, 3)
+        self.assertSameState(load_checkpoint(self.path), simulation)
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_memory_mapped_arrays(self):
+        """Test that the arrays are aligned, memory-mapped views of the file."""
+        simulation = build(Simulation, 5, 5, [("A", 0, 1, 'N', "F"), ("B", 0, 3, 'S', "F"), ("C", 4, 4, 'W', "LL")])
+        simulation.run()
+        save_checkpoint(simulation, self.path)
+        checkpoint = open_checkpoint(self.path)
+        self.assertEqual(len(checkpoint), 3)
+        self.assertEqual(checkpoint.names(), ["A", "B", "C"])
+        self.assertEqual(checkpoint.arrays['x'].tolist(), [0, 0, 4])
+        self.assertEqual(checkpoint.arrays['collided'].tolist(), [True, True, False])
+        self.assertEqual(checkpoint.arrays['record_offsets'].tolist(), [0, 1, 2, 2])
+        for array in checkpoint.arrays.values():
+            self.assertEqual(array.__array_interface__['data'][0] % ALIGN, 0)
+
+    def test_empty_simulation(self):
+        """Test that a field without cars round-trips."""
+        save_checkpoint(Simulation(3, 4), self.path)
+        self.assertSameState(load_checkpoint(self.path), Simulation(3, 4))
+
+    def test_not_a_checkpoint(self):
+        """Test that other files are rejected."""
+        with open(self.path, 'wb') as f:
+            f.write(b"3 4\n")
+        with self.assertRaises(CheckpointError):
+            open_checkpoint(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
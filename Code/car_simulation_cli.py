@@ -0,0 +1,159 @@
+# ============================================================
+
+# This Python script is the headless command line of the car simulation.
+# It loads a scenario file in one read (any format read by
+# car_simulation_loader.py, or - for stdin), runs every simulation in it
+# and writes the results in machine-readable form, without prompts.
+
+# Only what a run needs is imported: the engine module of --engine, json
+# for JSON output, car_simulation_metrics.py for --metrics or --profile and
+# NumPy only for file output or NumPy engines, so a cold start stays close
+# to the bare interpreter.
+
+# Invalid entries are skipped, as the interactive prompts would ask again,
+# and listed with their line numbers on stderr; the exit status is then 1.
+# With --strict the scenario is rejected instead and nothing is run.
+
+# Usage: python -m car_simulation run scenario.txt --format json
+#        cat scenario.txt | python car_simulation_cli.py run - --engine vectorized
+
+# Output formats:
+#   text    the result lines of the interactive menu, a blank line after each simulation
+#   json    one JSON object per simulation (JSON lines)
+#   binary  the final state of each simulation as a checkpoint file
+#           (car_simulation_checkpoint.py); needs --output
+#   npz, npy, arrow
+#           columnar results of each simulation (car_simulation_export.py);
+#           need --output
+
+# ============================================================
+
+import os
+import sys
+import argparse
+
+from car_simulation_loader import ENGINES, ScenarioError, engine_class, load_file
+
+FORMATS = ['text', 'json', 'binary', 'npz', 'npy', 'arrow']
+
+# Formats written to files named after --output rather than to a stream.
+FILE_FORMATS = ['binary', 'npz', 'npy', 'arrow']
+
+
+def result_record(number, simulation):
+    # One simulation as a JSON-ready dict.
+    cars = simulation.cars
+    return {
+        'simulation': number,
+        'width': simulation.width,
+        'height': simulation.height,
+        'steps': simulation.steps,
+        'cars': [{'name': car.name, 'x': car.x, 'y': car.y, 'direction': car.direction, 'collided': car.collided,
+                  'collisions': [{'other': cars[other].name, 'x': x, 'y': y, 'step': step}
+                                 for other, x, y, step in car.collision_record]}
+                 for car in cars],
+    }
+
+
+def output_paths(output, count):
+    # OUTPUT for a single simulation; OUTPUT-1, OUTPUT-2, ... (before the
+    # extension) for several.
+    if count == 1:
+        return [output]
+    root, extension = os.path.splitext(output)
+    return [f"{root}-{number}{extension}" for number in range(1, count + 1)]
+
+
+def write_results(simulations, format, stream, output=None):
+    if format == 'text':
+        stream.write("".join("\n".join(simulation.result_lines()) + "\n\n" for simulation in simulations))
+    elif format == 'json':
+        import json
+        stream.write("".join(json.dumps(result_record(number, simulation), separators=(',', ':')) + "\n"
+                             for number, simulation in enumerate(simulations, 1)))
+    elif format == 'binary':
+        from car_simulation_checkpoint import save_checkpoint
+        for simulation, path in zip(simulations, output_paths(output, len(simulations))):
+            save_checkpoint(simulation, path)
+    else:
+        from car_simulation_export import export_results
+        for simulation, path in zip(simulations, output_paths(output, len(simulations))):
+            export_results(simulation, path, format)
+
+
+def trace_to_stderr():
+    # Keep trace lines (CAR_SIMULATION_TRACE) out of results written to
+    # stdout; trace files are left alone.
+    from car_simulation import PrintLog
+    sink = PrintLog.sink
+    if sink is not None and getattr(sink, 'stream', None) is sys.stdout:
+        sink.flush()
+        PrintLog.configure(PrintLog.level, type(sink)(sys.stderr, sink.buffer_lines))
+
+
+def run(args):
+    if not args.output:
+        trace_to_stderr()
+    options = {}
+    if args.stationary_collisions:
+        options['stationary_collisions'] = True
+    if args.swap_collisions:
+        options['swap_collisions'] = True
+    skipped = []
+    try:
+        simulations = load_file(args.scenario, engine_class(args.engine), args.strict, args.input_format, skipped,
+                                **options)
+    except (OSError, ScenarioError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    for number, message in skipped:
+        print(f"Skipped line {number}: {message}", file=sys.stderr)
+
+    metrics = None
+    if args.metrics or args.profile:
+        from car_simulation_metrics import Metrics, run_simulations
+        metrics = Metrics() if args.metrics else None
+        run_simulations(simulations, metrics, args.profile)
+    else:
+        for simulation in simulations:
+            simulation.run()
+
+    try:
+        if args.output and args.format not in FILE_FORMATS:
+            with open(args.output, 'w') as f:
+                write_results(simulations, args.format, f)
+        else:
+            write_results(simulations, args.format, sys.stdout, args.output)
+    except ValueError as e:
+        # e.g. the arrow format without pyarrow installed
+        print(e, file=sys.stderr)
+        return 1
+    if metrics is not None:
+        metrics.write(args.metrics)
+    return 1 if skipped else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="car_simulation", description="Run car simulation scenarios without prompts.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    parser_run = commands.add_parser('run', help="run every simulation of a scenario file")
+    parser_run.add_argument('scenario', help="scenario file, or - to read it from stdin")
+    parser_run.add_argument('--format', choices=FORMATS, default='text', help="output format")
+    parser_run.add_argument('--output', help="write the results to this file instead of stdout")
+    parser_run.add_argument('--engine', choices=sorted(ENGINES), default='simulation')
+    parser_run.add_argument('--input-format', choices=['transcript', 'columnar'], default=None,
+                            help="scenario format (default: detected)")
+    parser_run.add_argument('--strict', action='store_true', help="reject scenarios with invalid entries instead of skipping them")
+    parser_run.add_argument('--stationary-collisions', action='store_true', help="let moving cars hit parked cars")
+    parser_run.add_argument('--swap-collisions', action='store_true', help="let cars that swap cells head-on collide")
+    parser_run.add_argument('--metrics', help="write run metrics to this file (.json for JSON, else Prometheus text)")
+    parser_run.add_argument('--profile', help="write a cProfile profile of the runs to this file")
+    args = parser.parse_args(argv)
+
+    if args.format in FILE_FORMATS and not args.output:
+        parser.error(f"--format {args.format} needs --output")
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# ===============================================================================================
+
+# This Python test script checks the headless command line in car_simulation_cli.py: JSON lines,
+# text and binary output, reading the scenario from stdin, and python -m car_simulation run.
+
+# ===============================================================================================
+
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from unittest.mock import patch
+
+from car_simulation_checkpoint import open_checkpoint
+from car_simulation_cli import main
+
+CODE = os.path.dirname(os.path.abspath(__file__))
+TEST_CASES = os.path.join(CODE, "..", "Input", "Test Cases")
+COLLIDE = os.path.join(TEST_CASES, "Total 2 cars, 2 cars collide.txt")
+TWICE = os.path.join(TEST_CASES, "Total 4 cars, Total 2 cars, Simulate 2 Times.txt")
+
+
+def run_cli(*argv):
+    output, errors = StringIO(), StringIO()
+    with redirect_stdout(output), redirect_stderr(errors):
+        code = main(list(argv))
+    return code, output.getvalue(), errors.getvalue()
+
+
+class TestCommandLine(unittest.TestCase):
+    def test_json_lines(self):
+        """Test if every simulation is written as one JSON object per line."""
+        code, output, _ = run_cli('run', TWICE, '--format', 'json')
+        self.assertEqual(code, 0)
+        records = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([record['simulation'] for record in records], [1, 2])
+
+        code, output, _ = run_cli('run', COLLIDE, '--format', 'json')
+        record, = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual((record['width'], record['height'], record['steps']), (10, 10, 7))
+        self.assertEqual(record['cars'][0], {'name': 'CarA', 'x': 5, 'y': 4, 'direction': 'E', 'collided': True,
+                                             'collisions': [{'other': 'CarB', 'x': 5, 'y': 4, 'step': 7}]})
+
+    def test_text_from_stdin(self):
+        """Test if a scenario piped on stdin gives the menu's result lines."""
+        with open(COLLIDE) as f, patch('sys.stdin', StringIO(f.read())):
+            code, output, _ = run_cli('run', '-', '--engine', 'vectorized')
+        self.assertEqual(code, 0)
+        self.assertEqual(output, "- CarA, collides with CarB at (5, 4) at step 7\n"
+                                 "- CarB, collides with CarA at (5, 4) at step 7\n\n")
+
+    def test_binary_checkpoints(self):
+        """Test if binary output writes one checkpoint per simulation."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.ckpt")
+            code, output, _ = run_cli('run', TWICE, '--format', 'binary', '--output', path)
+            self.assertEqual((code, output), (0, ""))
+            self.assertEqual(sorted(os.listdir(directory)), ["results-1.ckpt", "results-2.ckpt"])
+            checkpoint = open_checkpoint(os.path.join(directory, "results-2.ckpt"))
+            self.assertEqual(len(checkpoint), 2)
+
+    def test_errors(self):
+        """Test if a missing file or invalid strict scenario exits with an error."""
+        code, _, errors = run_cli('run', 'no such scenario.txt')
+        self.assertEqual(code, 1)
+        self.assertIn("No such file", errors)
+        code, _, errors = run_cli('run', os.path.join(TEST_CASES, "Invalid Selection, Total 3 cars.txt"), '--strict')
+        self.assertEqual(code, 1)
+        self.assertIn("line 2:", errors)
+
+    def test_skipped_entries(self):
+        """Test if invalid entries skipped outside strict mode are listed on stderr with an error status."""
+        code, output, errors = run_cli('run', os.path.join(TEST_CASES, "Invalid Selection, Total 3 cars.txt"))
+        self.assertEqual(code, 1)
+        self.assertEqual(len(output.splitlines()), 4)
+        self.assertIn("Skipped line 2: Error: Invalid choice", errors)
+
+    def test_metrics_and_profile(self):
+        """Test if --metrics and --profile cover every simulation of the scenario."""
+        with tempfile.TemporaryDirectory() as directory:
+            metrics, profile = os.path.join(directory, "run.json"), os.path.join(directory, "run.prof")
+            code, _, _ = run_cli('run', TWICE, '--metrics', metrics, '--profile', profile)
+            self.assertEqual(code, 0)
+            with open(metrics) as f:
+                self.assertEqual(json.load(f)['counters']['runs'], 2)
+            self.assertTrue(os.path.getsize(profile))
+
+    def test_python_m_car_simulation(self):
+        """Test if python -m car_simulation run goes to the headless command line."""
+        with open(COLLIDE) as scenario:
+            result = subprocess.run([sys.executable, '-m', 'car_simulation', 'run', '-', '--format', 'json'], cwd=CODE,
+                                    stdin=scenario, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout)['steps'], 7)
+
+    def test_trace_goes_to_stderr(self):
+        """Test if trace lines stay out of the JSON lines written to stdout."""
+        environment = dict(os.environ, CAR_SIMULATION_TRACE='steps')
+        environment.pop('CAR_SIMULATION_TRACE_FILE', None)
+        result = subprocess.run([sys.executable, '-m', 'car_simulation', 'run', COLLIDE, '--format', 'json'], cwd=CODE,
+                                env=environment, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual([json.loads(line)['steps'] for line in result.stdout.splitlines()], [7])
+        self.assertIn("Step 1 - Car CarA", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
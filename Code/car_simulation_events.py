@@ -0,0 +1,239 @@
+# ============================================================
+
+# This Python script provides an event-driven engine for the car simulation.
+# Instead of ticking every step, it works out the earliest step at which
+# two cars could share a cell (Manhattan distance against the F moves each
+# car has left) and jumps straight there, fast-forwarding cars in closed
+# form. Steps where cars could meet are run with Simulation.step_cars, so
+# collision records are the same as Simulation.run. Two cars can swap cells
+# head-on no earlier than they could share one, so the same bound holds
+# with swap_collisions.
+
+# Meetings are looked for a limited number of steps ahead. Within that
+# horizon a car can reach no further than the smaller of its F moves left
+# and the horizon, so cars are hashed into a grid of cells twice that reach
+# wide and only cars in the same or neighbouring cells are compared, about
+# O(n log n) per event. When the next possible meeting is more than a step
+# away every car jumps there. Otherwise only the cars that could meet
+# within the next stretch of steps are run one step at a time, and the
+# others are fast-forwarded through it.
+
+# ============================================================
+
+import numpy as np
+
+from car_simulation import Simulation
+
+# Upper bound on the number of car pairs compared per car in one event
+# search; above it the search horizon is halved, so a crowded field is not
+# compared in O(n^2).
+PAIRS_PER_CAR = 8
+
+# Steps ahead meetings are first looked for.
+FIRST_HORIZON = 64
+
+# Cost of searching for meetings per car, in steps of one car.
+SEARCH_COST = 4
+
+# Longest stretch of plain per-step execution between two searches.
+MAX_BACKOFF = 64
+
+# Distances along each axis are capped here so their sum fits in an int64
+# on the widest fields; no car has this many moves to close the gap.
+DISTANCE_CAP = 1 << 61
+
+# Grid cells, relative to its own, whose cars a car is compared with. The
+# other four neighbours compare with it from their side, so each pair is
+# found once.
+NEIGHBOURS = [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def candidate_pairs(x, y, reach, limit=None):
+    """Return index arrays (i, j) of the car pairs that are close enough to meet.
+
+    Each car can move no further than its reach, so a pair is a candidate
+    when both cars lie within the sum of their reaches along each axis.
+    Every candidate pair is returned once. Returns None once more than
+    `limit` pairs were found.
+    """
+    n = len(x)
+    size = min(2 * int(reach.max(initial=0)) + 1, DISTANCE_CAP)
+    column, cx = np.unique(x // size, return_inverse=True)
+    row, cy = np.unique(y // size, return_inverse=True)
+    key = cx * len(row) + cy
+    order = np.argsort(key, kind='stable')
+    keys = key[order]
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n)
+
+    first, second = [], []
+    found = 0
+    for dx, dy in NEIGHBOURS:
+        if dx == dy == 0:
+            # Cars later in the same cell.
+            lo = rank + 1
+            hi = np.searchsorted(keys, key, 'right')
+        else:
+            nx, ny = cx + dx, cy + dy
+            # Only cells next to each other on the field, not just in rank.
+            near = (nx < len(column)) & (ny >= 0) & (ny < len(row))
+            near[near] &= ((column[nx[near]] - column[cx[near]] == dx)
+                           & (row[ny[near]] - row[cy[near]] == dy))
+            neighbour = np.where(near, nx * len(row) + ny, -1)
+            lo = np.searchsorted(keys, neighbour, 'left')
+            hi = np.where(near, np.searchsorted(keys, neighbour, 'right'), lo)
+        counts = hi - lo
+        total = int(counts.sum())
+        found += total
+        if limit is not None and found > limit:
+            return None
+        if total:
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            first.append(np.repeat(np.arange(n), counts))
+            second.append(order[np.repeat(lo, counts) + offsets])
+    if not first:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(first), np.concatenate(second)
+
+
+def meeting_steps(x, y, moves, remaining, i, j, stationary=False):
+    """Return the fewest steps after which cars i[k] and j[k] could share a cell.
+
+    Pairs that can never meet get -1. Normally both cars must still be
+    moving to collide; with stationary set, one moving car is enough.
+    """
+    limit = np.maximum if stationary else np.minimum
+    distance = (np.minimum(np.abs(x[i] - x[j]), DISTANCE_CAP)
+                + np.minimum(np.abs(y[i] - y[j]), DISTANCE_CAP))
+    fewer = np.minimum(moves[i], moves[j])
+    more = np.maximum(moves[i], moves[j])
+
+    # Both cars close in while they both have moves, then only one does.
+    steps = np.where(2 * fewer >= distance, (distance + 1) // 2, distance - fewer)
+    steps = np.maximum(steps, 1)
+    possible = (fewer + more >= distance) & (steps <= limit(remaining[i], remaining[j]))
+    return np.where(possible, steps, -1)
+
+
+def stretch_length(meeting, horizon):
+    # The number of steps, a power of two up to `horizon`, to run the cars
+    # that could meet (the fewest steps to a meeting of each car in
+    # `meeting`) one step at a time before searching again, and its cost
+    # per step: the cars run plus the search spread over the stretch.
+    ordered = np.sort(meeting)
+    best, best_cost = 1, None
+    length = 1
+    while length <= horizon:
+        cost = SEARCH_COST * len(meeting) / length + np.searchsorted(ordered, length, 'right')
+        if best_cost is None or cost < best_cost:
+            best, best_cost = length, cost
+        length *= 2
+    return best, best_cost
+
+
+class EventSimulation(Simulation):
+
+    def run_steps(self):
+        step = self.steps
+        last = step
+        active = self.active_cars()
+
+        # Steps ahead that meetings are looked for; it grows while the
+        # search is cheap and shrinks when there are too many pairs.
+        horizon = FIRST_HORIZON
+        # Steps to run every car through step_cars before searching again,
+        # for fleets too crowded for a search to pay off; doubled after
+        # every search that did not.
+        plain = 0
+        backoff = 1
+        while active:
+            if plain:
+                if self.step_cars(step, active):
+                    last = step + 1
+                step += 1
+                plain -= 1
+                active = self.active_cars(active)
+                continue
+
+            horizon = min(horizon, max(len(car.commands) - car.cursor for car in active))
+            meeting = self.meetings(active, horizon)
+            if meeting is None:
+                if horizon > 2:
+                    horizon //= 2
+                else:
+                    plain, backoff = backoff, min(backoff * 2, MAX_BACKOFF)
+                continue
+
+            gap = int(meeting.min())
+            if gap > 1:
+                # No car can meet another before the gap; jump there.
+                steps = min(gap - 1, horizon)
+                last = max(last, self.forward(active, step, steps))
+                step += steps
+                active = self.active_cars(active)
+                backoff = 1
+                if gap > horizon:
+                    horizon *= 2
+                continue
+
+            # Step the cars that could meet within the stretch; the others
+            # meet nobody in that time and are fast-forwarded through it.
+            stretch, cost = stretch_length(meeting, horizon)
+            if cost >= len(active):
+                # No cheaper than running every car: do that for a while.
+                plain, backoff = backoff, min(backoff * 2, MAX_BACKOFF)
+                continue
+            backoff = 1
+            if stretch == horizon:
+                horizon *= 2
+            risky = [car for car, steps in zip(active, meeting.tolist()) if steps <= stretch]
+            safe = [car for car, steps in zip(active, meeting.tolist()) if steps > stretch]
+            for s in range(step, step + stretch):
+                if self.step_cars(s, risky):
+                    last = max(last, s + 1)
+                risky = self.active_cars(risky)
+            last = max(last, self.forward(safe, step, stretch))
+            step += stretch
+            active = self.active_cars(active)
+        self.steps = last
+
+    def meetings(self, active, steps):
+        # The fewest steps after which each car of `active` could meet
+        # another car (or, with stationary_collisions, hit a parked one),
+        # or steps + 1 if not within `steps` steps, as an array. Returns
+        # None if there were too many pairs to compare.
+        parked = []
+        if self.stationary_collisions:
+            parked = [car for car in self.cars if car.collided or not car.has_commands()]
+        cars = active + parked
+        n = len(cars)
+        x = np.fromiter((car.x for car in cars), dtype=np.int64, count=n)
+        y = np.fromiter((car.y for car in cars), dtype=np.int64, count=n)
+        # Parked cars keep zero moves and commands left: they never move
+        # again, even collided ones that still have commands.
+        moves = np.zeros(n, dtype=np.int64)
+        remaining = np.zeros(n, dtype=np.int64)
+        # Until a car is fast-forwarded, counting its F commands left is
+        # cheaper than compiling its program.
+        moves[:len(active)] = [car.commands.count(b'F', car.cursor) if car.program is None else car.moves_left()
+                               for car in active]
+        remaining[:len(active)] = [len(car.commands) - car.cursor for car in active]
+        pairs = candidate_pairs(x, y, np.minimum(moves, steps), PAIRS_PER_CAR * n)
+        if pairs is None:
+            return None
+        i, j = pairs
+        meeting = meeting_steps(x, y, moves, remaining, i, j, self.stationary_collisions)
+        close = (meeting > 0) & (meeting <= steps)
+        earliest = np.full(n, steps + 1, dtype=np.int64)
+        np.minimum.at(earliest, i[close], meeting[close])
+        np.minimum.at(earliest, j[close], meeting[close])
+        return earliest[:len(active)]
+
+    def forward(self, cars, step, steps):
+        # Fast-forward `cars` by `steps` steps; returns the last step any of
+        # them processes a command in.
+        last = step
+        for car in cars:
+            last = max(last, step + min(steps, len(car.commands) - car.cursor))
+        self.fast_forward_cars(cars, steps)
+        return last
@@ -0,0 +1,143 @@
+# ===============================================================================================
+
+# This Python test script checks that the event-driven engine in car_simulation_events.py
+# reports exactly the same cars, positions and collision records as Simulation.run.
+
+# ===============================================================================================
+
+
+import random
+import unittest
+
+import numpy as np
+
+from car_simulation import Simulation, DIRECTIONS
+from car_simulation_events import EventSimulation, candidate_pairs, meeting_steps
+from car_simulation_test_helpers import build, final_state, SameResultMixin
+
+
+class TestMeetingSteps(unittest.TestCase):
+    def meeting(self, first, second):
+        x, y, moves, remaining = (np.array(column, dtype=np.int64) for column in zip(first, second))
+        return meeting_steps(x, y, moves, remaining, np.array([0]), np.array([1])).tolist()[0]
+
+    def test_both_cars_moving(self):
+        """Test two cars that can both close the distance."""
+        self.assertEqual(self.meeting((0, 0, 10, 10), (10, 0, 10, 10)), 5)
+
+    def test_one_car_parked(self):
+        """Test a car that has run out of F moves."""
+        self.assertEqual(self.meeting((0, 0, 0, 20), (10, 0, 20, 20)), 10)
+
+    def test_cars_that_cannot_meet(self):
+        """Test cars without enough moves or commands left to meet."""
+        self.assertEqual(self.meeting((0, 0, 3, 3), (10, 0, 3, 3)), -1)
+        self.assertEqual(self.meeting((0, 0, 10, 4), (10, 0, 10, 4)), -1)
+
+
+class TestMeetings(unittest.TestCase):
+    def test_earliest_meeting_per_car(self):
+        """Test if each car gets its earliest meeting, or steps + 1 past the horizon."""
+        cars = [("A", 0, 0, 'E', "F" * 10), ("B", 12, 0, 'W', "F" * 10), ("C", 0, 90, 'N', "F" * 10)]
+        simulation = build(EventSimulation, 100, 100, cars)
+        self.assertEqual(simulation.meetings(simulation.active_cars(), 10).tolist(), [6, 6, 11])
+        self.assertEqual(simulation.meetings(simulation.active_cars(), 4).tolist(), [5, 5, 5])
+
+    def test_parked_cars(self):
+        """Test if a parked car is only in the way with stationary_collisions."""
+        cars = [("A", 0, 0, 'E', "F" * 20), ("B", 10, 0, 'N', "")]
+        for stationary, expected in ((False, [21]), (True, [10])):
+            simulation = build(EventSimulation, 100, 100, cars, stationary_collisions=stationary)
+            self.assertEqual(simulation.meetings(simulation.active_cars(), 20).tolist(), expected)
+
+
+class TestCandidatePairs(unittest.TestCase):
+    def test_same_as_all_pairs(self):
+        """Test if every pair within reach is found exactly once."""
+        rng = random.Random(20250326)
+        for _ in range(50):
+            n = rng.randint(0, 60)
+            x = np.array([rng.randrange(100) for _ in range(n)], dtype=np.int64)
+            y = np.array([rng.randrange(100) for _ in range(n)], dtype=np.int64)
+            reach = np.array([rng.randrange(10) for _ in range(n)], dtype=np.int64)
+            i, j = candidate_pairs(x, y, reach)
+            found = sorted((min(a, b), max(a, b)) for a, b in zip(i.tolist(), j.tolist()))
+            self.assertEqual(len(found), len(set(found)))
+            within = [(a, b) for a in range(n) for b in range(a + 1, n)
+                      if abs(x[a] - x[b]) <= reach[a] + reach[b] and abs(y[a] - y[b]) <= reach[a] + reach[b]]
+            self.assertTrue(set(within) <= set(found))
+
+    def test_limit(self):
+        """Test if the search gives up past the pair limit."""
+        x = y = reach = np.zeros(10, dtype=np.int64)
+        self.assertIsNone(candidate_pairs(x, y, reach, limit=44))
+        self.assertEqual(len(candidate_pairs(x, y, reach, limit=45)[0]), 45)
+
+
+class TestEventSimulation(SameResultMixin, unittest.TestCase):
+    engine_class = EventSimulation
+
+    def test_two_cars_collide(self):
+        """Test the two car collision scenario from the specification."""
+        self.assertSameResult(10, 10, [("A", 1, 2, 'N', "FFRFFFFRRL"), ("B", 7, 8, 'W', "FFLFFFFFFF")])
+
+    def test_far_apart_cars_meet_late(self):
+        """Test cars that only meet after a long idle stretch."""
+        cars = [("A", 0, 0, 'E', "F" * 3000), ("B", 2001, 0, 'W', "F" * 3000), ("C", 0, 900, 'N', "RL" * 500)]
+        self.assertSameResult(3000, 1000, cars)
+
+    def test_random_scenarios(self):
+        """Test random fields against Simulation.run."""
+        rng = random.Random(20250318)
+        for _ in range(100):
+            width, height = rng.randint(1, 20), rng.randint(1, 20)
+            cars = [(f"Car{i}", rng.randrange(width), rng.randrange(height), rng.choice(DIRECTIONS),
+                     "".join(rng.choice("LRFFFF") for _ in range(rng.randint(0, 40)))) for i in range(rng.randint(1, 10))]
+            self.assertSameResult(width, height, cars)
+            self.assertSameResult(width, height, cars, stationary_collisions=True)
+
+    def test_random_fleets(self):
+        """Test larger random fleets with long runs, with each collision option."""
+        rng = random.Random(20250327)
+        for _ in range(30):
+            width, height = rng.randint(5, 60), rng.randint(5, 60)
+            cars = [(f"Car{i}", rng.randrange(width), rng.randrange(height), rng.choice(DIRECTIONS),
+                     "".join(rng.choice("LRFFF") * rng.randint(1, 30) for _ in range(rng.randint(0, 8))))
+                    for i in range(rng.randint(2, 60))]
+            self.assertSameResult(width, height, cars)
+            self.assertSameResult(width, height, cars, stationary_collisions=True)
+            self.assertSameResult(width, height, cars, swap_collisions=True)
+
+    def test_resume(self):
+        """Test if a run continued after iter_steps() gives the same result."""
+        cars = [("A", 0, 0, 'E', "F" * 50), ("B", 40, 0, 'W', "F" * 50), ("C", 9, 9, 'N', "RRFFFLF")]
+        expected = build(Simulation, 60, 10, cars)
+        expected.run()
+        actual = build(EventSimulation, 60, 10, cars)
+        steps = actual.iter_steps()
+        for _ in range(5):
+            next(steps)
+        actual.run()
+        self.assertEqual(final_state(actual), final_state(expected))
+
+    def test_stationary_collisions(self):
+        """Test a long run that ends in a parked car."""
+        cars = [("A", 0, 0, 'E', "F" * 500), ("B", 300, 0, 'N', ""), ("C", 299, 5, 'S', "FFFFF" + "L" * 400)]
+        self.assertSameResult(1000, 10, cars)
+        self.assertSameResult(1000, 10, cars, stationary_collisions=True)
+
+    def test_swap_collisions(self):
+        """Test far apart cars that swap cells head-on after a long idle stretch."""
+        cars = [("A", 0, 0, 'E', "F" * 3000), ("B", 2001, 0, 'W', "F" * 3000), ("C", 0, 900, 'N', "RL" * 500)]
+        self.assertSameResult(3000, 1000, cars, swap_collisions=True)
+
+    def test_sparse_field(self):
+        """Test far apart cars on a field with the largest 64-bit coordinates."""
+        edge = (1 << 63) - 1
+        cars = [("A", 0, 0, 'E', "F" * 50), ("B", 40, 0, 'W', "F" * 50), ("C", edge - 1, edge - 1, 'N', "FRF"),
+                ("D", edge - 1, 0, 'S', "FFL")]
+        self.assertSameResult(edge, edge, cars)
+
+
+if __name__ == "__main__":
+    unittest.main()
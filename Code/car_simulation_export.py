@@ -0,0 +1,143 @@
+# ============================================================
+
+# This Python script exports the results of a car simulation as columns
+# instead of text, so analysis tools can load (or memory-map) them
+# directly. Two tables are written:
+#   cars:        name, x, y, heading (index into DIRECTIONS) and collided
+#   collisions:  car, other, x, y and step of every collision record,
+#                grouped by car in record order
+# Names are stored as one UTF-8 byte array plus an offset per car.
+
+# Formats:
+#   npy    a directory with one .npy file per column; np.load(...,
+#          mmap_mode='r') memory-maps each one (open_results does this)
+#   npz    the same arrays in a single uncompressed .npz file
+#   arrow  a directory with cars.arrow and collisions.arrow Arrow IPC
+#          files (needs pyarrow); pyarrow.memory_map reads them in place
+# Arrays are written straight from their buffers, without copies.
+
+# Usage: export_results(simulation, "results", "npy"); open_results("results")['x']
+
+# ============================================================
+
+import os
+import json
+
+import numpy as np
+
+from car_simulation import DIRECTIONS
+
+FORMATS = ['npy', 'npz', 'arrow']
+
+CAR_COLUMNS = ['names', 'name_offsets', 'x', 'y', 'heading', 'collided']
+COLLISION_COLUMNS = ['collision_car', 'collision_other', 'collision_x', 'collision_y', 'collision_step']
+
+
+class ExportError(ValueError):
+    pass
+
+
+def result_arrays(simulation):
+    # The results of `simulation` as {column name: contiguous array}.
+    # 'field' holds width, height and steps.
+    cars = simulation.cars
+    n = len(cars)
+    headings = {d: i for i, d in enumerate(DIRECTIONS)}
+
+    def column(values, dtype):
+        return np.fromiter(values, dtype=dtype, count=n)
+
+    names = [car.name.encode("utf-8") for car in cars]
+    name_offsets = np.zeros(n + 1, dtype='<i8')
+    np.cumsum(np.fromiter((len(name) for name in names), dtype='<i8', count=n), out=name_offsets[1:])
+
+    counts = column((len(car.collision_record) for car in cars), '<i8')
+    records = np.array([record for car in cars for record in car.collision_record], dtype='<i8').reshape(-1, 4)
+
+    return {
+        'field': np.array([simulation.width, simulation.height, simulation.steps], dtype='<i8'),
+        'names': np.frombuffer(b"".join(names), dtype=np.uint8),
+        'name_offsets': name_offsets,
+        'x': column((car.x for car in cars), '<i8'),
+        'y': column((car.y for car in cars), '<i8'),
+        'heading': column((headings[car.direction] for car in cars), np.int8),
+        'collided': column((car.collided for car in cars), np.bool_),
+        'collision_car': np.repeat(np.arange(n, dtype='<i8'), counts),
+        'collision_other': np.ascontiguousarray(records[:, 0]),
+        'collision_x': np.ascontiguousarray(records[:, 1]),
+        'collision_y': np.ascontiguousarray(records[:, 2]),
+        'collision_step': np.ascontiguousarray(records[:, 3]),
+    }
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ExportError("Error: The arrow format needs pyarrow, which is not installed.")
+    return pyarrow
+
+
+def arrow_tables(arrays):
+    # (cars, collisions) pyarrow tables over the arrays, without copying
+    # the numeric columns.
+    pa = import_pyarrow()
+    n = len(arrays['x'])
+    names = pa.LargeStringArray.from_buffers(n, pa.py_buffer(arrays['name_offsets']), pa.py_buffer(arrays['names']))
+    width, height, steps = arrays['field'].tolist()
+    metadata = {'width': str(width), 'height': str(height), 'steps': str(steps), 'headings': "".join(DIRECTIONS)}
+    cars = pa.table({'name': names, 'x': arrays['x'], 'y': arrays['y'], 'heading': arrays['heading'],
+                     'collided': arrays['collided']}).replace_schema_metadata(metadata)
+    collisions = pa.table({name[len('collision_'):]: arrays[name] for name in COLLISION_COLUMNS})
+    return cars, collisions
+
+
+def export_results(simulation, path, format='npy'):
+    # Write the results of `simulation` to `path` (a directory for npy and
+    # arrow, a file for npz).
+    if format not in FORMATS:
+        raise ExportError(f"Error: Unknown export format {format!r}; use one of {', '.join(FORMATS)}.")
+    arrays = result_arrays(simulation)
+
+    if format == 'npz':
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+        return
+
+    if format == 'arrow':
+        pa = import_pyarrow()
+        tables = arrow_tables(arrays)
+        os.makedirs(path, exist_ok=True)
+        for name, table in zip(('cars', 'collisions'), tables):
+            with pa.OSFile(os.path.join(path, f"{name}.arrow"), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        return
+
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), array)
+    with open(os.path.join(path, "columns.json"), 'w') as f:
+        json.dump({'cars': CAR_COLUMNS, 'collisions': COLLISION_COLUMNS, 'headings': DIRECTIONS}, f)
+
+
+def open_results(path):
+    # The exported columns at `path` as {name: array}. Columns of an npy
+    # directory are memory-mapped; an arrow directory gives the two tables
+    # as {'cars': table, 'collisions': table}.
+    if os.path.isfile(path):
+        with np.load(path) as npz:
+            return {name: npz[name] for name in npz.files}
+    if os.path.exists(os.path.join(path, "cars.arrow")):
+        pa = import_pyarrow()
+        return {name: pa.ipc.open_file(pa.memory_map(os.path.join(path, f"{name}.arrow"), 'r')).read_all()
+                for name in ('cars', 'collisions')}
+    return {name[:-len(".npy")]: np.load(os.path.join(path, name), mmap_mode='r')
+            for name in sorted(os.listdir(path)) if name.endswith(".npy")}
+
+
+def car_names(arrays):
+    # Decode the car names of exported arrays.
+    blob = bytes(arrays['names'])
+    offsets = arrays['name_offsets'].tolist()
+    return [blob[a:b].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
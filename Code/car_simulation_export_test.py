@@ -0,0 +1,113 @@
+# ===============================================================================================
+
+# This Python test script checks the columnar result export in car_simulation_export.py: the
+# columns written for cars and collisions, memory-mapped npy directories, npz files and the
+# optional Arrow IPC files.
+
+# ===============================================================================================
+
+
+import os
+import random
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+
+import numpy as np
+
+from car_simulation import Simulation, DIRECTIONS
+from car_simulation_cli import main
+from car_simulation_export import ExportError, car_names, export_results, open_results
+from car_simulation_test_helpers import build, random_cars
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+TEST_CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Input", "Test Cases")
+
+
+def three_cars():
+    simulation = build(Simulation, 5, 5, [("A", 0, 1, 'N', "F"), ("Bé", 0, 3, 'S', "F"), ("C", 4, 4, 'W', "LL")])
+    simulation.run()
+    return simulation
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertSameResults(self, arrays, simulation):
+        cars = simulation.cars
+        self.assertEqual(arrays['field'].tolist(), [simulation.width, simulation.height, simulation.steps])
+        self.assertEqual(car_names(arrays), [car.name for car in cars])
+        self.assertEqual(list(zip(arrays['x'].tolist(), arrays['y'].tolist(),
+                                  [DIRECTIONS[h] for h in arrays['heading'].tolist()], arrays['collided'].tolist())),
+                         [(car.x, car.y, car.direction, car.collided) for car in cars])
+        records = list(zip(arrays['collision_car'].tolist(), arrays['collision_other'].tolist(),
+                           arrays['collision_x'].tolist(), arrays['collision_y'].tolist(),
+                           arrays['collision_step'].tolist()))
+        self.assertEqual(records, [(car.index,) + tuple(record) for car in cars for record in car.collision_record])
+
+    def test_npy_directory_is_memory_mapped(self):
+        """Test if an npy export holds every column and opens memory-mapped."""
+        simulation = three_cars()
+        export_results(simulation, self.path)
+        arrays = open_results(self.path)
+        self.assertSameResults(arrays, simulation)
+        self.assertIsInstance(arrays['x'], np.memmap)
+        self.assertEqual(arrays['collision_car'].tolist(), [0, 1])
+
+    def test_npz_file(self):
+        """Test if an npz export round-trips a random run."""
+        rng = random.Random(20250323)
+        simulation = build(Simulation, 8, 8, random_cars(rng, 8, 8, 40, 30))
+        simulation.run()
+        export_results(simulation, self.path + ".npz", 'npz')
+        self.assertSameResults(open_results(self.path + ".npz"), simulation)
+
+    def test_empty_simulation(self):
+        """Test if a field without cars exports empty columns."""
+        export_results(Simulation(3, 4), self.path)
+        arrays = open_results(self.path)
+        self.assertEqual(arrays['field'].tolist(), [3, 4, 0])
+        self.assertEqual(len(arrays['x']), 0)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow_files(self):
+        """Test if an arrow export gives cars and collisions tables."""
+        simulation = three_cars()
+        export_results(simulation, self.path, 'arrow')
+        tables = open_results(self.path)
+        self.assertEqual(tables['cars'].column('name').to_pylist(), ["A", "Bé", "C"])
+        self.assertEqual(tables['collisions'].column('other').to_pylist(), [1, 0])
+
+    @unittest.skipIf(pyarrow is not None, "pyarrow is installed")
+    def test_arrow_needs_pyarrow(self):
+        """Test if the arrow format is refused without pyarrow."""
+        with self.assertRaises(ExportError):
+            export_results(three_cars(), self.path, 'arrow')
+
+    def test_unknown_format(self):
+        """Test if an unknown format is refused."""
+        with self.assertRaises(ExportError):
+            export_results(three_cars(), self.path, 'csv')
+
+    def test_command_line(self):
+        """Test if the command line writes columnar results with --format npz."""
+        scenario = os.path.join(TEST_CASES, "Total 2 cars, 2 cars collide.txt")
+        with redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+            self.assertEqual(main(['run', scenario, '--format', 'npz', '--output', self.path + ".npz"]), 0)
+        arrays = open_results(self.path + ".npz")
+        self.assertEqual(car_names(arrays), ["CarA", "CarB"])
+        self.assertEqual(arrays['collision_step'].tolist(), [7, 7])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,239 @@
+# ============================================================
+
+# This Python script generates seeded synthetic scenarios for load tests.
+# A scenario is set by its fleet size, field width and height, command
+# length, turn ratio (the share of L and R commands in a random program)
+# and collision density (the share of cars placed in head-on pairs that
+# drive into each other). The same seed and settings give the same
+# scenario.
+
+# Cars are generated in batches of NumPy arrays and written as they are
+# made, so memory stays flat however many cars a scenario has.
+
+# Output formats:
+#   columnar    "width height", then "name x y direction commands" per car
+#   transcript  the menu transcript format of car_simulation_input.txt
+#   binary      a compact file: an 8 byte magic, a 4 byte little-endian
+#               header length and a JSON header, followed by one fixed-size
+#               record per car (x, y, heading and the commands packed four
+#               to a byte). Car names are Car0, Car1, ...
+# All three are read by car_simulation_loader.load_file.
+
+# Usage: python car_simulation_generator.py scenario.bin --cars 10000000 --commands 100
+#            --width 100000 --height 100000 --density 0.1 --format binary --seed 7
+
+# ============================================================
+
+import sys
+import json
+import struct
+import argparse
+
+import numpy as np
+
+from car_simulation import Simulation, DIRECTIONS, COMMANDS, MAX_FIELD_SIZE
+from car_simulation_loader import SCENARIO_MAGIC
+
+FORMATS = ['columnar', 'transcript', 'binary']
+
+MAGIC = SCENARIO_MAGIC
+VERSION = 1
+
+# Default share of L and R commands; as many L as R.
+TURN_RATIO = 1 / 3
+
+# Commands generated per batch; a batch holds this many divided by the
+# command length cars (an even number, so head-on pairs stay together).
+BATCH_COMMANDS = 1 << 22
+
+NAME_PREFIX = "Car"
+
+# Command letters in COMMANDS order, as bytes.
+COMMAND_LETTERS = np.frombuffer("".join(COMMANDS).encode("ascii"), dtype=np.uint8)
+EAST, WEST = DIRECTIONS.index('E'), DIRECTIONS.index('W')
+FORWARD = COMMANDS.index('F')
+
+
+class GeneratorError(ValueError):
+    pass
+
+
+def batch_size(commands):
+    return max(2, BATCH_COMMANDS // max(commands, 1) // 2 * 2)
+
+
+def record_dtype(commands):
+    # One car of a binary scenario.
+    return np.dtype([('x', '<i8'), ('y', '<i8'), ('heading', 'i1'), ('program', 'u1', ((commands + 3) // 4,))])
+
+
+def check_settings(cars, commands, width, height, density, turn_ratio):
+    if cars < 0 or commands < 0:
+        raise GeneratorError("Error: The number of cars and commands cannot be negative.")
+    if not 1 <= width <= MAX_FIELD_SIZE or not 1 <= height <= MAX_FIELD_SIZE:
+        raise GeneratorError(f"Error: Width and height must be between 1 and {MAX_FIELD_SIZE}.")
+    if not 0 <= density <= 1 or not 0 <= turn_ratio <= 1:
+        raise GeneratorError("Error: The collision density and turn ratio must be between 0 and 1.")
+
+
+def iter_batches(cars, commands, width, height, density=0.0, turn_ratio=TURN_RATIO, seed=0):
+    # Yield (first car index, x, y, heading, program) batches; heading
+    # indexes DIRECTIONS and program is a (cars, commands) array of
+    # indexes into COMMANDS.
+    check_settings(cars, commands, width, height, density, turn_ratio)
+    rng = np.random.default_rng(seed)
+    paired = int(cars * density) // 2 * 2
+    size = batch_size(commands)
+
+    for start in range(0, cars, size):
+        n = min(size, cars - start)
+        x = rng.integers(0, width, n, dtype=np.int64)
+        y = rng.integers(0, height, n, dtype=np.int64)
+        heading = rng.integers(0, len(DIRECTIONS), n, dtype=np.int8)
+        turns = rng.random((n, commands)) < turn_ratio
+        program = np.where(turns, rng.integers(0, 2, (n, commands), dtype=np.uint8), np.uint8(FORWARD))
+
+        # Head-on pairs: car i drives east and car i + 1 west towards it
+        # from 2 * gap cells away, both with only F commands.
+        pairs = max(0, min(n, paired - start)) // 2
+        if pairs:
+            gap = rng.integers(1, max(1, min(commands, width - 1) // 2) + 1, pairs, dtype=np.int64)
+            east = rng.integers(0, np.maximum(1, width - 2 * gap), dtype=np.int64)
+            x[0:2 * pairs:2] = east
+            x[1:2 * pairs:2] = np.minimum(east + 2 * gap, width - 1)
+            y[1:2 * pairs:2] = y[0:2 * pairs:2]
+            heading[0:2 * pairs:2] = EAST
+            heading[1:2 * pairs:2] = WEST
+            program[:2 * pairs] = FORWARD
+        yield start, x, y, heading, program
+
+
+def iter_cars(cars, commands, width, height, density=0.0, turn_ratio=TURN_RATIO, seed=0):
+    # Yield every car as (name, x, y, direction, commands).
+    for start, x, y, heading, program in iter_batches(cars, commands, width, height, density, turn_ratio, seed):
+        yield from batch_cars(start, x, y, heading, program)
+
+
+def batch_cars(start, x, y, heading, program):
+    letters = COMMAND_LETTERS[program].tobytes().decode("ascii")
+    length = program.shape[1]
+    for i, (cx, cy, h) in enumerate(zip(x.tolist(), y.tolist(), heading.tolist())):
+        yield f"{NAME_PREFIX}{start + i}", cx, cy, DIRECTIONS[h], letters[i * length:(i + 1) * length]
+
+
+def pack_program(program):
+    # Four 2-bit command codes per byte, the first in the lowest bits.
+    n, length = program.shape
+    padded = np.zeros((n, (length + 3) // 4 * 4), dtype=np.uint8)
+    padded[:, :length] = program
+    quads = padded.reshape(n, -1, 4)
+    return quads[..., 0] | quads[..., 1] << 2 | quads[..., 2] << 4 | quads[..., 3] << 6
+
+
+def unpack_program(packed, length):
+    codes = (packed[..., None] >> np.array([0, 2, 4, 6], dtype=np.uint8)) & 3
+    return codes.reshape(len(packed), -1)[:, :length]
+
+
+def write_scenario(stream, cars, commands, width, height, density=0.0, turn_ratio=TURN_RATIO, seed=0,
+                   format='columnar'):
+    # Write a generated scenario to `stream`, a text stream for the
+    # columnar and transcript formats and a binary stream for binary.
+    if format not in FORMATS:
+        raise GeneratorError(f"Error: Unknown scenario format {format!r}; use one of {', '.join(FORMATS)}.")
+    check_settings(cars, commands, width, height, density, turn_ratio)
+    batches = iter_batches(cars, commands, width, height, density, turn_ratio, seed)
+
+    if format == 'binary':
+        header = json.dumps({'version': VERSION, 'width': width, 'height': height, 'cars': cars,
+                             'commands': commands, 'seed': seed}).encode("utf-8")
+        stream.write(MAGIC)
+        stream.write(struct.pack('<I', len(header)))
+        stream.write(header)
+        dtype = record_dtype(commands)
+        for _, x, y, heading, program in batches:
+            records = np.empty(len(x), dtype=dtype)
+            records['x'], records['y'], records['heading'] = x, y, heading
+            records['program'] = pack_program(program)
+            stream.write(records.tobytes())
+        return
+
+    stream.write(f"{width} {height}\n")
+    for batch in batches:
+        if format == 'columnar':
+            stream.write("".join(f"{name} {x} {y} {direction} {program}\n"
+                                 for name, x, y, direction, program in batch_cars(*batch)))
+        else:
+            stream.write("".join(f"1\n{name}\n{x} {y} {direction}\n{program}\n"
+                                 for name, x, y, direction, program in batch_cars(*batch)))
+    if format == 'transcript':
+        # Run the simulation, then exit.
+        stream.write("2\n2\n")
+
+
+def iter_binary_batches(path):
+    # Read a binary scenario. Returns its header and an iterator over
+    # batches like iter_batches; the records are memory-mapped, not read
+    # at once.
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise GeneratorError(f"Error: {path} is not a binary car simulation scenario.")
+        size, = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(size).decode("utf-8"))
+    if header.get('version') != VERSION:
+        raise GeneratorError(f"Error: Unsupported binary scenario version {header.get('version')!r}.")
+    commands = header['commands']
+    records = np.memmap(path, dtype=record_dtype(commands), mode='r', offset=len(MAGIC) + 4 + size,
+                        shape=(header['cars'],))
+
+    def batches():
+        step = batch_size(commands)
+        for start in range(0, len(records), step):
+            chunk = records[start:start + step]
+            yield (start, np.array(chunk['x']), np.array(chunk['y']), np.array(chunk['heading']),
+                   unpack_program(np.array(chunk['program']), commands))
+
+    return header, batches()
+
+
+def load_binary(path, simulation_class=Simulation, **options):
+    # A simulation holding the cars of a binary scenario.
+    header, batches = iter_binary_batches(path)
+    simulation = simulation_class(header['width'], header['height'], **options)
+    for batch in batches:
+        for car in batch_cars(*batch):
+            simulation.add_car(*car)
+    return simulation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic car simulation scenario.")
+    parser.add_argument('output', help="scenario file to write, or - for stdout (text formats only)")
+    parser.add_argument('--cars', type=int, default=1000, help="fleet size")
+    parser.add_argument('--commands', type=int, default=100, help="commands per car")
+    parser.add_argument('--width', type=int, default=200)
+    parser.add_argument('--height', type=int, default=200)
+    parser.add_argument('--turn-ratio', type=float, default=TURN_RATIO, help="share of L and R commands")
+    parser.add_argument('--density', type=float, default=0.0, help="share of cars placed in head-on pairs")
+    parser.add_argument('--format', choices=FORMATS, default='columnar')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    settings = dict(cars=args.cars, commands=args.commands, width=args.width, height=args.height,
+                    density=args.density, turn_ratio=args.turn_ratio, seed=args.seed, format=args.format)
+    try:
+        if args.output == '-':
+            if args.format == 'binary':
+                parser.error("--format binary needs an output file")
+            write_scenario(sys.stdout, **settings)
+        else:
+            with open(args.output, 'wb' if args.format == 'binary' else 'w') as f:
+                write_scenario(f, **settings)
+    except GeneratorError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
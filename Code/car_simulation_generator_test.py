@@ -0,0 +1,117 @@
+# ===============================================================================================
+
+# This Python test script checks the seeded scenario generator in car_simulation_generator.py:
+# the settings it honours, the three output formats and reading them back with the loader.
+
+# ===============================================================================================
+
+
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import car_simulation_generator
+from car_simulation import Simulation
+from car_simulation_generator import (GeneratorError, iter_cars, load_binary, pack_program, unpack_program,
+                                      write_scenario)
+from car_simulation_loader import load, load_file
+
+SETTINGS = dict(cars=60, commands=9, width=30, height=12, density=0.4, seed=11)
+
+
+def state(simulation):
+    return [(car.name, car.x, car.y, car.direction, car.commands) for car in simulation.cars]
+
+
+class TestGenerator(unittest.TestCase):
+    def test_seeded(self):
+        """Test if the same seed generates the same scenario and another seed a different one."""
+        self.assertEqual(list(iter_cars(**SETTINGS)), list(iter_cars(**SETTINGS)))
+        self.assertNotEqual(list(iter_cars(**SETTINGS)), list(iter_cars(**dict(SETTINGS, seed=12))))
+
+    def test_settings(self):
+        """Test if the fleet size, field, command length and turn ratio are honoured."""
+        cars = list(iter_cars(2000, 50, 40, 7, turn_ratio=0.25))
+        self.assertEqual(len(cars), 2000)
+        self.assertTrue(all(0 <= x < 40 and 0 <= y < 7 and len(commands) == 50 for _, x, y, _, commands in cars))
+        programs = "".join(commands for *_, commands in cars)
+        self.assertAlmostEqual((programs.count('L') + programs.count('R')) / len(programs), 0.25, delta=0.01)
+        self.assertEqual(set(programs), {'L', 'R', 'F'})
+
+    def test_density(self):
+        """Test if the collision density sets how many cars start in head-on pairs and collide."""
+        cars = list(iter_cars(100, 20, 50, 50, density=0.3))
+        for (_, x0, y0, d0, c0), (_, x1, y1, d1, c1) in zip(cars[0:30:2], cars[1:30:2]):
+            self.assertEqual((d0, d1, y0, c0, c1), ('E', 'W', y1, 'F' * 20, 'F' * 20))
+            self.assertLess(x0, x1)
+        crashed = []
+        for density in (0.0, 0.8):
+            simulation = Simulation(50, 50)
+            for car in iter_cars(100, 20, 50, 50, density=density):
+                simulation.add_car(*car)
+            simulation.run()
+            crashed.append(sum(car.collided for car in simulation.cars))
+        self.assertLess(crashed[0], crashed[1])
+
+    def test_batches(self):
+        """Test if a scenario spanning several batches keeps its head-on pairs together."""
+        saved = car_simulation_generator.BATCH_COMMANDS
+        car_simulation_generator.BATCH_COMMANDS = 40
+        try:
+            cars = list(iter_cars(25, 10, 30, 30, density=1.0))
+        finally:
+            car_simulation_generator.BATCH_COMMANDS = saved
+        self.assertEqual([name for name, *_ in cars], [f"Car{i}" for i in range(25)])
+        self.assertEqual([direction for _, _, _, direction, _ in cars[:24]], ['E', 'W'] * 12)
+
+    def test_formats(self):
+        """Test if the columnar, transcript and binary formats load the same cars."""
+        loaded = []
+        for format in ('columnar', 'transcript'):
+            stream = io.StringIO()
+            write_scenario(stream, format=format, **SETTINGS)
+            loaded.append(state(load(stream.getvalue().splitlines(), format=format)[0]))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "scenario.bin")
+            with open(path, 'wb') as f:
+                write_scenario(f, format='binary', **SETTINGS)
+            loaded.append(state(load_binary(path)))
+            simulations = load_file(path, swap_collisions=True)
+        self.assertEqual(loaded[0], [(name, x, y, d, c.encode()) for name, x, y, d, c in iter_cars(**SETTINGS)])
+        self.assertEqual(loaded[0], loaded[1])
+        self.assertEqual(loaded[0], loaded[2])
+        self.assertEqual(state(simulations[0]), loaded[0])
+        self.assertTrue(simulations[0].swap_collisions)
+
+    def test_pack_program(self):
+        """Test if packed programs of every length unpack to the same commands."""
+        rng = np.random.default_rng(5)
+        for length in range(0, 10):
+            program = rng.integers(0, 3, (6, length), dtype=np.uint8)
+            self.assertEqual(unpack_program(pack_program(program), length).tolist(), program.tolist())
+
+    def test_invalid_settings(self):
+        """Test if invalid settings are refused."""
+        for settings in (dict(width=0), dict(density=1.5), dict(turn_ratio=-0.1), dict(cars=-1)):
+            with self.assertRaises(GeneratorError):
+                write_scenario(io.StringIO(), **dict(SETTINGS, **settings))
+        with self.assertRaises(GeneratorError):
+            write_scenario(io.StringIO(), format='csv', **SETTINGS)
+
+    def test_large_field(self):
+        """Test if each side of the field may be as large as the loader accepts."""
+        side = 10 ** 10
+        stream = io.StringIO()
+        write_scenario(stream, **dict(SETTINGS, width=side, height=side))
+        simulation = load(stream.getvalue().splitlines())[0]
+        self.assertEqual((simulation.width, simulation.height), (side, side))
+        self.assertTrue(all(0 <= car.x < side and 0 <= car.y < side for car in simulation.cars))
+        with self.assertRaises(GeneratorError):
+            write_scenario(io.StringIO(), **dict(SETTINGS, width=1 << 63))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+# ============================================================
+
+# This Python script loads car simulation scenarios without prompting.
+# Two formats are read in one pass:
+#   - the menu transcript format of car_simulation_input.txt, and
+#   - a columnar format: a "width height" line followed by one
+#     "name x y direction commands" line per car.
+# Entries are validated with the same rules as the interactive prompts,
+# and every error is reported with its line number. load_file also reads
+# the binary scenarios of car_simulation_generator.py.
+
+# ============================================================
+
+import sys
+
+from car_simulation import Simulation, ValidInput, VerifyFieldSize
+
+# Engines that can run a scenario, by name; modules are imported on demand.
+ENGINES = {
+    'simulation': ('car_simulation', 'Simulation'),
+    'vectorized': ('car_simulation_vectorized', 'VectorizedSimulation'),
+    'segments': ('car_simulation_segments', 'SegmentSimulation'),
+    'events': ('car_simulation_events', 'EventSimulation'),
+    'incremental': ('car_simulation_trajectory', 'IncrementalSimulation'),
+    'tiled': ('car_simulation_tiled', 'TiledSimulation'),
+}
+
+# First bytes of a binary scenario written by car_simulation_generator.py.
+SCENARIO_MAGIC = b"CARSIMSC"
+
+
+def engine_class(name):
+    module, class_name = ENGINES[name]
+    return getattr(__import__(module), class_name)
+
+
+class ScenarioError(ValueError):
+    def __init__(self, errors):
+        # errors is a list of (line number, message) pairs.
+        self.errors = errors
+        super().__init__("\n".join(f"line {number}: {message}" for number, message in errors))
+
+
+def parse_transcript(lines, simulation_class=Simulation, **options):
+    # Read a menu transcript the way the interactive __main__ loop does.
+    # An invalid entry is recorded and skipped, as the loop would prompt
+    # again. Returns (simulations that were run, [(line number, message)]).
+    simulations = []
+    errors = []
+    numbered = enumerate(lines, 1)
+
+    try:
+        kept = None
+        while True:
+            if kept is None:
+                while True:
+                    number, line = next(numbered)
+                    try:
+                        width, height = VerifyFieldSize.parse_width_height(line)
+                        break
+                    except ValueError as e:
+                        errors.append((number, str(e)))
+
+            simulation = simulation_class(width, height, **options)
+            if kept is not None:
+                # A what-if run on the same field: start from the kept cars.
+                for car in kept.cars:
+                    simulation.add_car(car.name, *car.origin, car.commands)
+                kept = None
+
+            while True:
+                number, line = next(numbered)
+                choice = line.strip()
+                if choice == '1':
+                    number, line = next(numbered)
+                    car_name = line.strip()
+                    while not car_name:
+                        errors.append((number, "Error: Car name cannot be an empty string."))
+                        number, line = next(numbered)
+                        car_name = line.strip()
+                    while True:
+                        number, line = next(numbered)
+                        try:
+                            x, y, direction = ValidInput.parse_position(line, width, height)
+                            break
+                        except ValueError as e:
+                            errors.append((number, str(e)))
+                    while True:
+                        number, line = next(numbered)
+                        try:
+                            commands = ValidInput.parse_commands(line)
+                            break
+                        except ValueError as e:
+                            errors.append((number, str(e)))
+                    simulation.add_car(car_name, x, y, direction, commands)
+                elif choice == '2':
+                    simulations.append(simulation)
+                    break
+                else:
+                    errors.append((number, f"Error: Invalid choice {choice!r}. Please enter 1 or 2."))
+
+            while True:
+                number, line = next(numbered)
+                choice = line.strip()
+                if choice == '1':
+                    break
+                elif choice == '2':
+                    return simulations, errors
+                elif choice == '3':
+                    kept = simulation
+                    break
+                errors.append((number, f"Error: Invalid choice {choice!r}. Please enter 1, 2 or 3."))
+    except StopIteration:
+        return simulations, errors
+
+
+def parse_columnar(lines, simulation_class=Simulation, **options):
+    # Read the columnar format. Blank lines and lines starting with # are
+    # ignored. Returns ([simulation], [(line number, message)]).
+    errors = []
+    simulation = None
+    for number, line in enumerate(lines, 1):
+        fields = line.split()
+        if not fields or fields[0].startswith('#'):
+            continue
+
+        if simulation is None:
+            try:
+                width, height = VerifyFieldSize.parse_width_height(line)
+            except ValueError as e:
+                errors.append((number, str(e)))
+                return [], errors
+            simulation = simulation_class(width, height, **options)
+            continue
+
+        if len(fields) not in (4, 5):
+            errors.append((number, "Error: Please enter a car as name x y Direction commands."))
+            continue
+        try:
+            x, y, direction = ValidInput.parse_position(" ".join(fields[1:4]), width, height)
+            commands = ValidInput.parse_commands(fields[4] if len(fields) == 5 else "")
+        except ValueError as e:
+            errors.append((number, str(e)))
+            continue
+        simulation.add_car(fields[0], x, y, direction, commands)
+
+    if simulation is None:
+        errors.append((1, "Error: Please enter the width and height of the simulation field."))
+        return [], errors
+    return [simulation], errors
+
+
+def detect_format(lines):
+    # A transcript answers the menu with a single token on its second line;
+    # a columnar file has a whole car on it.
+    content = [line.split() for line in lines[:50] if line.strip() and not line.lstrip().startswith('#')]
+    if len(content) > 1 and len(content[1]) >= 4:
+        return 'columnar'
+    return 'transcript'
+
+
+def load(lines, simulation_class=Simulation, strict=True, format=None, errors=None, **options):
+    # Load every simulation in `lines`. With strict set, a ScenarioError
+    # listing all errors is raised; otherwise invalid entries are skipped
+    # and their (line number, message) pairs appended to `errors`, if given.
+    lines = list(lines)
+    format = format or detect_format(lines)
+    parse = parse_columnar if format == 'columnar' else parse_transcript
+    simulations, found = parse(lines, simulation_class, **options)
+    if strict and found:
+        raise ScenarioError(found)
+    if errors is not None:
+        errors.extend(found)
+    return simulations
+
+
+def load_file(path, simulation_class=Simulation, strict=True, format=None, errors=None, **options):
+    # A path of - reads the scenario from stdin.
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, 'rb') as f:
+            binary = f.read(len(SCENARIO_MAGIC)) == SCENARIO_MAGIC
+        if binary:
+            from car_simulation_generator import load_binary
+            return [load_binary(path, simulation_class, **options)]
+        with open(path) as f:
+            lines = f.read().splitlines()
+    return load(lines, simulation_class, strict, format, errors, **options)
@@ -0,0 +1,95 @@
+# ===============================================================================================
+
+# This Python test script checks the non-interactive scenario loader in car_simulation_loader.py
+# for both the menu transcript format and the columnar format.
+
+# ===============================================================================================
+
+
+import os
+import unittest
+
+from car_simulation_loader import ScenarioError, load, load_file, detect_format
+from car_simulation_vectorized import VectorizedSimulation
+
+INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Input")
+TEST_CASES = os.path.join(INPUT, "Test Cases")
+
+COLLISION = ['- A, collides with B at (5, 4) at step 7', '- B, collides with A at (5, 4) at step 7']
+
+
+class TestTranscript(unittest.TestCase):
+    def test_two_cars_collide(self):
+        """Test if a transcript is loaded into a simulation."""
+        lines = ["10 10", "1", "A", "1 2 N", "FFRFFFFRRL", "1", "B", "7 8 W", "FFLFFFFFFF", "2", "2"]
+        simulations = load(lines)
+        self.assertEqual(len(simulations), 1)
+        simulations[0].run()
+        self.assertEqual(simulations[0].result_lines(), COLLISION)
+
+    def test_every_error_is_reported(self):
+        """Test if every invalid entry is reported with its line number."""
+        lines = ["0 5", "5 5", "Invalid Selection", "1", "", "A", "9 9 N", "1 1 X", "1 1 N", "FX", "FF", "2", "4", "2"]
+        with self.assertRaises(ScenarioError) as context:
+            load(lines)
+        self.assertEqual([number for number, _ in context.exception.errors], [1, 3, 5, 7, 8, 10, 13])
+        self.assertIn("line 7: Error: The coordinates (9, 9) are outside the valid range.", str(context.exception))
+
+    def test_lenient_mode_skips_errors(self):
+        """Test if invalid entries are skipped the way the interactive loop prompts again."""
+        lines = ["0 5", "5 5", "Invalid Selection", "1", "", "A", "9 9 N", "1 1 X", "1 1 N", "FX", "FF", "2", "4", "2"]
+        errors = []
+        simulations = load(lines, strict=False, errors=errors)
+        self.assertEqual(len(simulations), 1)
+        self.assertEqual(str(simulations[0].cars[0]), '- A, (1,1) N, FF')
+        self.assertEqual([number for number, _ in errors], [1, 3, 5, 7, 8, 10, 13])
+
+    def test_start_over(self):
+        """Test if starting over loads a second simulation."""
+        simulations = load_file(os.path.join(TEST_CASES, "Total 4 cars, Total 2 cars, Simulate 2 Times.txt"))
+        self.assertEqual([len(s.cars) for s in simulations], [4, 2])
+        self.assertEqual((simulations[1].width, simulations[1].height), (108, 108))
+
+    def test_add_more_cars(self):
+        """Test if adding more cars after a run loads a second simulation with every car."""
+        lines = ["10 10", "1", "A", "1 2 N", "FFRFFFFRRL", "2", "3", "1", "B", "7 8 W", "FFLFFFFFFF", "2", "2"]
+        simulations = load(lines)
+        self.assertEqual([[str(car) for car in s.cars] for s in simulations],
+                         [['- A, (1,2) N, FFRFFFFRRL'], ['- A, (1,2) N, FFRFFFFRRL', '- B, (7,8) W, FFLFFFFFFF']])
+        simulations[1].run()
+        self.assertEqual(simulations[1].result_lines(), COLLISION)
+
+    def test_all_test_cases_load(self):
+        """Test if every valid test case loads in strict mode."""
+        for name in os.listdir(TEST_CASES):
+            if not name.startswith("Invalid"):
+                self.assertTrue(load_file(os.path.join(TEST_CASES, name)))
+
+
+class TestColumnar(unittest.TestCase):
+    def test_sample_file(self):
+        """Test if the columnar sample loads into a simulation of the chosen engine."""
+        simulation, = load_file(os.path.join(INPUT, "car_simulation_columnar.txt"), VectorizedSimulation)
+        self.assertIsInstance(simulation, VectorizedSimulation)
+        simulation.run()
+        self.assertEqual(simulation.result_lines(), COLLISION)
+
+    def test_car_without_commands(self):
+        """Test if a car line may leave out its commands."""
+        simulation, = load(["5 5", "A 1 1 N"])
+        self.assertEqual(str(simulation.cars[0]), '- A, (1,1) N, ')
+
+    def test_every_error_is_reported(self):
+        """Test if every invalid car line is reported with its line number."""
+        with self.assertRaises(ScenarioError) as context:
+            load(["5 5", "A 1 1 N FF", "B 7 1 N F", "C 1 1 Q F", "D 1 1 N FXF", "E 1"], format='columnar')
+        self.assertEqual([number for number, _ in context.exception.errors], [3, 4, 5, 6])
+
+    def test_detect_format(self):
+        """Test if the file format is detected from its second line."""
+        self.assertEqual(detect_format(["5 5", "1", "A"]), 'transcript')
+        self.assertEqual(detect_format(["# cars", "5 5", "A 1 1 N FF"]), 'columnar')
+
+
+if __name__ == "__main__":
+    unittest.main()
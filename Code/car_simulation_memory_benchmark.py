@@ -0,0 +1,115 @@
+# ============================================================
+
+# This Python script measures the memory used by cars and their collision
+# records, comparing the __slots__ Car with tuple collision records against
+# the previous representation (a __dict__ per car, a list copy of the
+# commands, a second copy of every car in cars_original and eagerly
+# formatted collision strings).
+
+# Usage: python car_simulation_memory_benchmark.py --cars 100000 1000000
+
+# ============================================================
+
+import gc
+import sys
+import argparse
+import tracemalloc
+
+from car_simulation import Car
+
+
+class LegacyCar:
+    # The Car representation before __slots__ and tuple collision records.
+    def __init__(self, name, x, y, direction, commands):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.direction = direction
+        self.commands = list(commands)
+        self.step = 0
+        self.collided = False
+        self.collision_record = list()
+
+
+def legacy_collide(car, c, step):
+    c.collision_record.append(f'- {c.name}, collides with {car.name} at {(car.x, car.y)} at step {step}')
+    car.collision_record.append(f'- {car.name}, collides with {c.name} at {(c.x, c.y)} at step {step}')
+
+
+def slots_collide(car, c, step):
+    c.record_collision(car.index, car.x, car.y, step)
+    car.record_collision(c.index, c.x, c.y, step)
+
+
+def build_legacy_fleet(count, commands):
+    cars, cars_original = [], []
+    for i in range(count):
+        cars.append(LegacyCar(f"Car{i}", i % 1000, i // 1000, 'N', commands))
+        cars_original.append(LegacyCar(f"Car{i}", i % 1000, i // 1000, 'N', commands))
+    return cars, cars_original
+
+
+def build_fleet(count, commands):
+    cars = []
+    for i in range(count):
+        car = Car(f"Car{i}", i % 1000, i // 1000, 'N', commands)
+        car.index = i
+        cars.append(car)
+    return cars, []
+
+
+def pile_up(cars, collide, group):
+    # Every `group` consecutive cars collide with each other at step 1.
+    for start in range(0, len(cars) - group + 1, group):
+        members = cars[start:start + group]
+        for m in range(1, group):
+            for j in range(m):
+                collide(members[m], members[j], 1)
+
+
+def measure(build):
+    # Traced memory, in bytes, still held by the objects `build` returns
+    # (the current size once it has returned, not the peak while building).
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return current
+
+
+def benchmark(count, commands="FFRFFLFFRR", group=4):
+    rows = []
+    for label, build, collide in (("legacy", build_legacy_fleet, legacy_collide), ("slots", build_fleet, slots_collide)):
+        fleet = measure(lambda: build(count, commands))
+
+        def crashed():
+            cars, cars_original = build(count, commands)
+            pile_up(cars, collide, group)
+            return cars, cars_original
+
+        rows.append((label, count, fleet, measure(crashed)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure car and collision record memory.")
+    parser.add_argument('--cars', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--commands', default="FFRFFLFFRR", help="program given to every car")
+    parser.add_argument('--group', type=int, default=4, help="cars per pile-up")
+    args = parser.parse_args(argv)
+
+    print(f"{'representation':<16}{'cars':>10}{'fleet MiB':>12}{'per car B':>11}{'pile-up MiB':>13}{'per car B':>11}")
+    for count in args.cars:
+        rows = benchmark(count, args.commands, args.group)
+        for label, cars, fleet, crashed in rows:
+            print(f"{label:<16}{cars:>10}{fleet / 2 ** 20:>12.1f}{fleet / cars:>11.0f}{crashed / 2 ** 20:>13.1f}{crashed / cars:>11.0f}")
+        (_, _, legacy_fleet, legacy_crashed), (_, _, slots_fleet, slots_crashed) = rows
+        print(f"{'savings':<16}{count:>10}{1 - slots_fleet / legacy_fleet:>12.0%}{'':>11}{1 - slots_crashed / legacy_crashed:>13.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,23 @@
+# ===============================================================================================
+
+# This Python test script checks the memory benchmark in car_simulation_memory_benchmark.py.
+
+# ===============================================================================================
+
+
+import unittest
+
+from car_simulation_memory_benchmark import benchmark
+
+
+class TestMemoryBenchmark(unittest.TestCase):
+    def test_slots_cars_use_less_memory(self):
+        """Test if the slots representation is smaller for the fleet and for pile-ups."""
+        (legacy, _, legacy_fleet, legacy_crashed), (slots, _, slots_fleet, slots_crashed) = benchmark(2000)
+        self.assertEqual((legacy, slots), ("legacy", "slots"))
+        self.assertLess(slots_fleet, legacy_fleet)
+        self.assertLess(slots_crashed, legacy_crashed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+# ============================================================
+
+# This Python script collects performance metrics of car simulation runs.
+# Set simulation.metrics = Metrics() before running. Simulation.run, which
+# every engine goes through, times each run and counts its steps, commands
+# and collisions. Simulation.step_cars also times the phases of a step
+# (processing commands vs. collision bookkeeping) and keeps histograms of
+# step time, active cars and collisions per step; engines that skip or
+# batch steps (vectorized, segments, events, ...) only fill these for the
+# steps they run through step_cars.
+# With simulation.metrics left as None nothing is timed or counted.
+
+# Metrics are exported as JSON or in the Prometheus text format.
+# The command line runs a scenario file with metrics and, optionally,
+# under cProfile; the .prof file opens in snakeviz, flameprof or pstats.
+
+# Usage: python car_simulation_metrics.py scenario.txt --metrics run.prom --profile run.prof
+
+# ============================================================
+
+import sys
+import json
+import argparse
+from bisect import bisect_left
+
+from car_simulation_loader import ENGINES, engine_class, load_file
+
+PREFIX = "car_simulation"
+
+# Upper bounds of the histogram buckets; the last bucket is unbounded.
+SECONDS_BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+COUNT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+# Metric name -> help text.
+COUNTERS = {
+    'runs': "Simulation runs.",
+    'steps': "Steps run.",
+    'commands': "Commands processed, one per active car per step.",
+    'collisions': "Collisions between two cars.",
+}
+PHASES = {
+    'run': "Seconds spent in Simulation.run.",
+    'command': "Seconds spent processing commands and moving cars.",
+    'collision': "Seconds spent finding and recording collisions.",
+}
+HISTOGRAMS = {
+    'step_seconds': (SECONDS_BUCKETS, "Seconds per step."),
+    'active_cars': (COUNT_BUCKETS, "Cars that processed a command in a step."),
+    'step_collisions': (COUNT_BUCKETS, "Collisions per step."),
+}
+
+
+class Histogram:
+    # Observations counted into fixed buckets, like a Prometheus histogram.
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        # (upper bound, observations at or below it), ending with +Inf.
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def as_dict(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts), 'sum': self.sum, 'count': self.count}
+
+
+class Metrics:
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.histograms = {name: Histogram(buckets) for name, (buckets, _) in HISTOGRAMS.items()}
+
+    def observe_run(self, seconds, steps, commands, collisions):
+        self.counters['runs'] += 1
+        self.counters['steps'] += steps
+        self.counters['commands'] += commands
+        self.counters['collisions'] += collisions
+        self.phases['run'] += seconds
+
+    def observe_step(self, seconds, active, collisions, command_seconds, collision_seconds):
+        self.phases['command'] += command_seconds
+        self.phases['collision'] += collision_seconds
+        self.histograms['step_seconds'].observe(seconds)
+        self.histograms['active_cars'].observe(active)
+        self.histograms['step_collisions'].observe(collisions)
+
+    def as_dict(self):
+        return {'counters': dict(self.counters), 'phase_seconds': dict(self.phases),
+                'histograms': {name: histogram.as_dict() for name, histogram in self.histograms.items()}}
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), indent=1)
+
+    def to_prometheus(self):
+        lines = []
+        for name, help_text in COUNTERS.items():
+            metric = f"{PREFIX}_{name}_total"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter", f"{metric} {self.counters[name]}"]
+
+        metric = f"{PREFIX}_phase_seconds_total"
+        lines += [f"# HELP {metric} Seconds spent in each phase of a run.", f"# TYPE {metric} counter"]
+        lines += [f'{metric}{{phase="{phase}"}} {self.phases[phase]!r}' for phase in PHASES]
+
+        for name, (_, help_text) in HISTOGRAMS.items():
+            metric = f"{PREFIX}_{name}"
+            histogram = self.histograms[name]
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+            lines += [f'{metric}_bucket{{le="{"+Inf" if bound == float("inf") else bound}"}} {count}'
+                      for bound, count in histogram.cumulative()]
+            lines += [f"{metric}_sum {histogram.sum!r}", f"{metric}_count {histogram.count}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        # .json files get JSON, anything else the Prometheus text format.
+        with open(path, 'w') as f:
+            f.write(self.to_json() if path.endswith('.json') else self.to_prometheus())
+
+
+def run_scenario(path, engine='simulation', metrics=None, profile=None, **options):
+    # Run every simulation of a scenario file, collecting into `metrics`
+    # and, if a path is given, writing a cProfile profile of the runs.
+    simulations = load_file(path, engine_class(engine), **options)
+    run_simulations(simulations, metrics, profile)
+    return simulations
+
+
+def run_simulations(simulations, metrics=None, profile=None):
+    # Run loaded simulations the way run_scenario does; the run command of
+    # car_simulation_cli.py goes through here too.
+    for simulation in simulations:
+        simulation.metrics = metrics
+
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        for simulation in simulations:
+            simulation.run()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a car simulation scenario with metrics or profiling.")
+    parser.add_argument('scenario', help="scenario file (any format read by car_simulation_loader.py)")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='simulation')
+    parser.add_argument('--metrics', help="write the metrics to this file (.json for JSON, else Prometheus text)")
+    parser.add_argument('--profile', help="write a cProfile profile of the runs to this file")
+    args = parser.parse_args(argv)
+
+    metrics = Metrics()
+    simulations = run_scenario(args.scenario, args.engine, metrics, args.profile)
+    for simulation in simulations:
+        print("\n".join(simulation.result_lines()))
+        print()
+
+    if args.metrics:
+        metrics.write(args.metrics)
+    counters, phases = metrics.counters, metrics.phases
+    print(f"{counters['runs']} runs, {counters['steps']} steps, {counters['commands']} commands, "
+          f"{counters['collisions']} collisions in {phases['run']:.3f}s "
+          f"(commands {phases['command']:.3f}s, collisions {phases['collision']:.3f}s)", file=sys.stderr)
+    if args.profile:
+        import pstats
+        pstats.Stats(args.profile, stream=sys.stderr).sort_stats('cumulative').print_stats(15)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
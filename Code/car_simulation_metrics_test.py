@@ -0,0 +1,132 @@
+# ===============================================================================================
+
+# This Python test script checks the metrics collected by Simulation.run into a Metrics object
+# (car_simulation_metrics.py), their JSON and Prometheus exports, and the profiling command line.
+
+# ===============================================================================================
+
+
+import os
+import json
+import random
+import pstats
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+
+from car_simulation import Simulation
+from car_simulation_loader import ENGINES, engine_class
+from car_simulation_metrics import Histogram, Metrics, main
+from car_simulation_test_helpers import build, random_cars
+
+TEST_CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Input", "Test Cases")
+
+
+def two_cars():
+    simulation = Simulation(10, 10)
+    simulation.add_car("A", 1, 2, 'N', "FFRFFFFRRL")
+    simulation.add_car("B", 7, 8, 'W', "FFLFFFFFFF")
+    return simulation
+
+
+class TestMetrics(unittest.TestCase):
+    def test_disabled_by_default(self):
+        """Test if a simulation runs without metrics unless they are set."""
+        simulation = two_cars()
+        self.assertIsNone(simulation.metrics)
+        simulation.run()
+        self.assertEqual(simulation.steps, 7)
+
+    def test_run_is_counted(self):
+        """Test if a run counts its steps, commands and collisions and times its phases."""
+        simulation = two_cars()
+        simulation.metrics = metrics = Metrics()
+        simulation.run()
+        self.assertEqual(metrics.counters, {'runs': 1, 'steps': 7, 'commands': 14, 'collisions': 1})
+        self.assertGreater(metrics.phases['run'], 0.0)
+        self.assertLessEqual(metrics.phases['command'] + metrics.phases['collision'], metrics.phases['run'])
+        self.assertEqual(metrics.histograms['active_cars'].counts[:3], [0, 0, 7])
+        self.assertEqual(metrics.histograms['step_collisions'].counts[:2], [6, 1])
+        self.assertEqual(metrics.histograms['step_seconds'].count, 7)
+
+    def test_every_engine_is_counted(self):
+        """Test if every engine reports the runs, steps, commands and collisions Simulation.run reports."""
+        rng = random.Random(20250324)
+        for _ in range(10):
+            cars = random_cars(rng, 6, 6, rng.randint(2, 15), 12)
+            for options in ({}, {'stationary_collisions': True}):
+                counters = {}
+                for engine in sorted(ENGINES):
+                    simulation = build(engine_class(engine), 6, 6, cars, **options)
+                    simulation.metrics = metrics = Metrics()
+                    simulation.run()
+                    counters[engine] = metrics.counters
+                    self.assertGreaterEqual(metrics.phases['run'], 0.0)
+                expected = counters['simulation']
+                self.assertEqual(expected['runs'], 1)
+                for engine, engine_counters in counters.items():
+                    self.assertEqual(engine_counters, expected, engine)
+
+    def test_resumed_run_is_counted_once(self):
+        """Test if a run continued after iter_steps() counts only the steps it ran."""
+        simulation = two_cars()
+        simulation.metrics = metrics = Metrics()
+        steps = simulation.iter_steps()
+        next(steps)
+        next(steps)
+        simulation.run()
+        self.assertEqual(metrics.counters, {'runs': 1, 'steps': 5, 'commands': 10, 'collisions': 1})
+
+    def test_histogram_buckets(self):
+        """Test if observations fall in the first bucket whose bound is not below them."""
+        histogram = Histogram((1, 10))
+        for value in (0, 1, 2, 10, 11):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 2, 1])
+        self.assertEqual(histogram.cumulative(), [(1, 2), (10, 4), (float('inf'), 5)])
+        self.assertEqual((histogram.sum, histogram.count), (24, 5))
+
+    def test_prometheus_export(self):
+        """Test if the Prometheus text export holds counters, phases and cumulative buckets."""
+        simulation = two_cars()
+        simulation.metrics = metrics = Metrics()
+        simulation.run()
+        lines = metrics.to_prometheus().splitlines()
+        self.assertIn("# TYPE car_simulation_steps_total counter", lines)
+        self.assertIn("car_simulation_steps_total 7", lines)
+        self.assertIn("car_simulation_collisions_total 1", lines)
+        self.assertTrue(any(line.startswith('car_simulation_phase_seconds_total{phase="command"} ') for line in lines))
+        self.assertIn("# TYPE car_simulation_active_cars histogram", lines)
+        self.assertIn('car_simulation_active_cars_bucket{le="+Inf"} 7', lines)
+        self.assertIn("car_simulation_active_cars_sum 14", lines)
+
+    def test_json_export(self):
+        """Test if the JSON export round-trips the counters and histograms."""
+        simulation = two_cars()
+        simulation.metrics = metrics = Metrics()
+        simulation.run()
+        exported = json.loads(metrics.to_json())
+        self.assertEqual(exported['counters']['steps'], 7)
+        self.assertEqual(exported['histograms']['step_collisions']['count'], 7)
+
+
+class TestCommandLine(unittest.TestCase):
+    def test_metrics_and_profile(self):
+        """Test if the command line writes metrics and a loadable cProfile profile of a scenario."""
+        scenario = os.path.join(TEST_CASES, "Total 2 cars, 2 cars collide.txt")
+        with tempfile.TemporaryDirectory() as directory:
+            metrics_path = os.path.join(directory, "run.json")
+            profile_path = os.path.join(directory, "run.prof")
+            output, errors = StringIO(), StringIO()
+            with redirect_stdout(output), redirect_stderr(errors):
+                self.assertEqual(main([scenario, '--metrics', metrics_path, '--profile', profile_path]), 0)
+            self.assertIn("- CarA, collides with CarB at (5, 4) at step 7", output.getvalue())
+            with open(metrics_path) as f:
+                self.assertEqual(json.load(f)['counters']['collisions'], 1)
+            stats = pstats.Stats(profile_path)
+            self.assertTrue(any(name == 'step_cars' for _, _, name in stats.stats))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,262 @@
+# ============================================================
+
+# This Python script records a car simulation as a replay log and answers
+# questions about any step of the recorded run without running it again.
+
+# The log is a series of chunks. Each chunk starts with a keyframe (the
+# position, heading and collided flag of every car) followed by the moves
+# and collisions of the next `keyframe_every` steps. A footer at the end
+# of the file indexes the chunks, so a query memory-maps the file and reads
+# only the chunks it needs: the state at a step is the nearest earlier
+# keyframe with that chunk's moves applied, and a car's trajectory is read
+# chunk by chunk.
+
+# Usage: log = record(simulation, "run.replay"); ReplayLog("run.replay").state_at(734212)
+
+# ============================================================
+
+import json
+import struct
+from bisect import bisect_right
+
+import numpy as np
+
+from car_simulation import DIRECTIONS
+from car_simulation_checkpoint import aligned
+
+MAGIC = b"CARSIMRP"
+VERSION = 1
+DEFAULT_KEYFRAME_EVERY = 1024
+
+HEADINGS = {d: i for i, d in enumerate(DIRECTIONS)}
+
+
+class ReplayError(ValueError):
+    pass
+
+
+class ReplayWriter:
+    # Writes the log of `simulation` while it is stepped; feed it every
+    # StepDelta from simulation.iter_steps() and close it at the end.
+    def __init__(self, path, simulation, keyframe_every=DEFAULT_KEYFRAME_EVERY):
+        self.simulation = simulation
+        self.keyframe_every = keyframe_every
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self.chunks = []
+
+        names = [car.name.encode("utf-8") for car in simulation.cars]
+        name_offsets = np.zeros(len(names) + 1, dtype='<i8')
+        name_offsets[1:] = np.cumsum([len(name) for name in names])
+        self.fleet = self.write_arrays({'names': np.frombuffer(b"".join(names), dtype=np.uint8),
+                                        'name_offsets': name_offsets})
+        self.start_chunk()
+
+    def write_arrays(self, arrays):
+        # Write each array on an aligned offset; returns their layout.
+        layout = {}
+        for name, array in arrays.items():
+            offset = aligned(self.file.tell())
+            self.file.write(b"\0" * (offset - self.file.tell()))
+            self.file.write(np.ascontiguousarray(array).data)
+            layout[name] = [array.dtype.str, offset, len(array)]
+        return layout
+
+    def start_chunk(self):
+        cars = self.simulation.cars
+        n = len(cars)
+        self.first_step = self.simulation.steps
+        self.keyframe = {
+            'x': np.fromiter((car.x for car in cars), dtype='<i8', count=n),
+            'y': np.fromiter((car.y for car in cars), dtype='<i8', count=n),
+            'heading': np.fromiter((HEADINGS[car.direction] for car in cars), dtype=np.int8, count=n),
+            'collided': np.fromiter((car.collided for car in cars), dtype=np.bool_, count=n),
+        }
+        self.step_offsets = [0]
+        self.move_car, self.move_x, self.move_y, self.move_heading = [], [], [], []
+        self.collision_offsets = [0]
+        self.collision_car, self.collision_other, self.collision_x, self.collision_y = [], [], [], []
+
+    def add(self, delta):
+        for car, x, y, direction in delta.moved:
+            self.move_car.append(car)
+            self.move_x.append(x)
+            self.move_y.append(y)
+            self.move_heading.append(HEADINGS[direction])
+        self.step_offsets.append(len(self.move_car))
+        for car, other, x, y in delta.collisions:
+            self.collision_car.append(car)
+            self.collision_other.append(other)
+            self.collision_x.append(x)
+            self.collision_y.append(y)
+        self.collision_offsets.append(len(self.collision_car))
+
+        if delta.step - self.first_step >= self.keyframe_every:
+            self.end_chunk()
+            self.start_chunk()
+
+    def end_chunk(self):
+        arrays = dict(self.keyframe)
+        arrays.update({
+            'step_offsets': np.array(self.step_offsets, dtype='<i8'),
+            'move_car': np.array(self.move_car, dtype='<i4'),
+            'move_x': np.array(self.move_x, dtype='<i8'),
+            'move_y': np.array(self.move_y, dtype='<i8'),
+            'move_heading': np.array(self.move_heading, dtype=np.int8),
+            'collision_offsets': np.array(self.collision_offsets, dtype='<i8'),
+            'collision_car': np.array(self.collision_car, dtype='<i4'),
+            'collision_other': np.array(self.collision_other, dtype='<i4'),
+            'collision_x': np.array(self.collision_x, dtype='<i8'),
+            'collision_y': np.array(self.collision_y, dtype='<i8'),
+        })
+        last_step = self.first_step + len(self.step_offsets) - 1
+        self.chunks.append([self.first_step, last_step, self.write_arrays(arrays)])
+
+    def close(self):
+        # The last chunk is kept even without steps: it is the final keyframe.
+        if len(self.step_offsets) > 1 or not self.chunks:
+            self.end_chunk()
+        simulation = self.simulation
+        footer = json.dumps({
+            'version': VERSION,
+            'width': simulation.width,
+            'height': simulation.height,
+            'cars': len(simulation.cars),
+            'steps': self.chunks[-1][1],
+            'fleet': self.fleet,
+            'chunks': self.chunks,
+        }).encode("utf-8")
+        offset = self.file.tell()
+        self.file.write(footer)
+        self.file.write(struct.pack('<Q', offset))
+        self.file.close()
+
+
+def record(simulation, path, keyframe_every=DEFAULT_KEYFRAME_EVERY):
+    # Run `simulation` to the end, logging every step to `path`.
+    writer = ReplayWriter(path, simulation, keyframe_every)
+    try:
+        for delta in simulation.iter_steps():
+            writer.add(delta)
+    finally:
+        writer.close()
+    return simulation
+
+
+class ReplayLog:
+    # A replay log opened read-only. Arrays are memory-mapped, so only the
+    # chunks touched by a query are read from disk.
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ReplayError(f"Error: {path} is not a car simulation replay log.")
+            f.seek(-8, 2)
+            offset, = struct.unpack('<Q', f.read(8))
+            f.seek(offset)
+            self.header = json.loads(f.read()[:-8].decode("utf-8"))
+        if self.header['version'] != VERSION:
+            raise ReplayError(f"Error: Unsupported replay log version {self.header['version']}.")
+        self.buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        self.steps = self.header['steps']
+        self.first_steps = [chunk[0] for chunk in self.header['chunks']]
+
+    def __len__(self):
+        return self.header['cars']
+
+    def arrays(self, layout):
+        return {name: self.buffer[offset:offset + count * np.dtype(dtype).itemsize].view(dtype)
+                for name, (dtype, offset, count) in layout.items()}
+
+    def chunk(self, step):
+        # (index, first step, arrays) of the chunk holding `step`.
+        i = max(bisect_right(self.first_steps, step) - 1, 0)
+        first_step, _, layout = self.header['chunks'][i]
+        return i, first_step, self.arrays(layout)
+
+    def names(self):
+        fleet = self.arrays(self.header['fleet'])
+        names = fleet['names'].tobytes()
+        offsets = fleet['name_offsets'].tolist()
+        return [names[a:b].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+
+    def state_at(self, step):
+        # Every car after `step` as arrays x, y, heading (index into
+        # DIRECTIONS) and collided. Steps past the end give the final state.
+        step = min(max(step, 0), self.steps)
+        _, first_step, chunk = self.chunk(step)
+        x, y = chunk['x'].copy(), chunk['y'].copy()
+        heading, collided = chunk['heading'].copy(), chunk['collided'].copy()
+
+        moves = int(chunk['step_offsets'][step - first_step])
+        if moves:
+            # Only the last move of each car in the range counts.
+            cars = chunk['move_car'][:moves][::-1]
+            cars, last = np.unique(cars, return_index=True)
+            last = moves - 1 - last
+            x[cars] = chunk['move_x'][last]
+            y[cars] = chunk['move_y'][last]
+            heading[cars] = chunk['move_heading'][last]
+
+        hits = int(chunk['collision_offsets'][step - first_step])
+        collided[chunk['collision_car'][:hits]] = True
+        collided[chunk['collision_other'][:hits]] = True
+        return {'step': step, 'x': x, 'y': y, 'heading': heading, 'collided': collided}
+
+    def cars_at(self, step):
+        # [(name, x, y, direction, collided)] of every car after `step`.
+        state = self.state_at(step)
+        return [(name, x, y, DIRECTIONS[h], hit) for name, x, y, h, hit in
+                zip(self.names(), state['x'].tolist(), state['y'].tolist(), state['heading'].tolist(),
+                    state['collided'].tolist())]
+
+    def trajectory(self, car, start=0, stop=None):
+        # [(step, x, y, direction)] of car number `car`: its pose after
+        # `start`, then every step up to `stop` in which it moved.
+        stop = self.steps if stop is None else min(stop, self.steps)
+        start = min(max(start, 0), stop)
+        i, first_step, chunk = self.chunk(start)
+
+        # Pose at `start`: the keyframe, or the car's last move before it.
+        moves = int(chunk['step_offsets'][start - first_step])
+        own = np.flatnonzero(chunk['move_car'][:moves] == car)
+        if own.size:
+            m = own[-1]
+            pose = chunk['move_x'][m], chunk['move_y'][m], chunk['move_heading'][m]
+        else:
+            pose = chunk['x'][car], chunk['y'][car], chunk['heading'][car]
+        result = [(start, int(pose[0]), int(pose[1]), DIRECTIONS[pose[2]])]
+
+        chunks = self.header['chunks']
+        while i < len(chunks):
+            first_step, last_step, _ = chunks[i]
+            if first_step >= stop:
+                break
+            step_offsets = chunk['step_offsets']
+            begin = int(step_offsets[max(start - first_step, 0)])
+            end = int(step_offsets[min(stop, last_step) - first_step])
+            own = begin + np.flatnonzero(chunk['move_car'][begin:end] == car)
+            steps = first_step + np.searchsorted(step_offsets, own, side='right')
+            result.extend(zip(steps.tolist(), chunk['move_x'][own].tolist(), chunk['move_y'][own].tolist(),
+                              [DIRECTIONS[h] for h in chunk['move_heading'][own].tolist()]))
+            i += 1
+            if i < len(chunks):
+                chunk = self.arrays(chunks[i][2])
+        return result
+
+    def collisions(self, start=0, stop=None):
+        # [(step, car, other car, x, y)] of every collision after `start`
+        # up to and including `stop`.
+        stop = self.steps if stop is None else min(stop, self.steps)
+        result = []
+        for first_step, last_step, layout in self.header['chunks']:
+            if last_step <= start or first_step >= stop:
+                continue
+            chunk = self.arrays(layout)
+            offsets = chunk['collision_offsets']
+            begin = int(offsets[max(start - first_step, 0)])
+            end = int(offsets[min(stop, last_step) - first_step])
+            steps = first_step + np.searchsorted(offsets, np.arange(begin, end), side='right')
+            result.extend(zip(steps.tolist(), chunk['collision_car'][begin:end].tolist(),
+                              chunk['collision_other'][begin:end].tolist(), chunk['collision_x'][begin:end].tolist(),
+                              chunk['collision_y'][begin:end].tolist()))
+        return result
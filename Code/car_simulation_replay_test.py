@@ -0,0 +1,104 @@
+# ===============================================================================================
+
+# This Python test script checks that the replay log of car_simulation_replay.py gives the same
+# cars, trajectories and collisions at every step as stepping the simulation itself.
+
+# ===============================================================================================
+
+
+import os
+import random
+import tempfile
+import unittest
+
+from car_simulation import Simulation, DIRECTIONS
+from car_simulation_replay import ReplayError, ReplayLog, record
+from car_simulation_test_helpers import build, random_cars
+
+
+def snapshots(simulation):
+    # [(x, y, direction, collided) of every car] after each step, from step 0.
+    states = [[(car.x, car.y, car.direction, car.collided) for car in simulation.cars]]
+    for _ in simulation.iter_steps():
+        states.append([(car.x, car.y, car.direction, car.collided) for car in simulation.cars])
+    return states
+
+
+class TestReplayLog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "run.replay")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertMatchesRun(self, width, height, cars, keyframe_every, **options):
+        expected = snapshots(build(Simulation, width, height, cars, **options))
+        simulation = record(build(Simulation, width, height, cars, **options), self.path, keyframe_every)
+        log = ReplayLog(self.path)
+        self.assertEqual(log.steps, len(expected) - 1)
+        self.assertEqual(log.names(), [car[0] for car in cars])
+
+        for step, cars_at in enumerate(expected):
+            state = log.state_at(step)
+            self.assertEqual(list(zip(state['x'].tolist(), state['y'].tolist(),
+                                      [DIRECTIONS[h] for h in state['heading'].tolist()], state['collided'].tolist())),
+                             cars_at)
+        self.assertEqual(log.cars_at(log.steps + 10),
+                         [(car.name, car.x, car.y, car.direction, car.collided) for car in simulation.cars])
+
+        for car in range(len(cars)):
+            start, stop = sorted(random.Random(car).choices(range(len(expected)), k=2))
+            poses = [(step, *expected[step][car][:3]) for step in range(start, stop + 1)]
+            changes = [pose for i, pose in enumerate(poses) if i == 0 or pose[1:] != poses[i - 1][1:]]
+            trajectory = log.trajectory(car, start, stop)
+            self.assertEqual(trajectory[0], poses[0])
+            # A move that leaves the pose unchanged (against the boundary) is still listed.
+            self.assertEqual([pose for i, pose in enumerate(trajectory)
+                              if i == 0 or pose[1:] != trajectory[i - 1][1:]], changes)
+
+        collisions = [(record[3], car.index, record[0], record[1], record[2])
+                      for car in simulation.cars for record in car.collision_record]
+        self.assertTrue(set(log.collisions()) <= set(collisions))
+        self.assertEqual({(step, *sorted((a, b))) for step, a, b, _, _ in log.collisions()},
+                         {(step, *sorted((a, b))) for step, a, b, _, _ in collisions})
+
+    def test_two_cars_collide(self):
+        """Test the two car collision scenario from the specification."""
+        self.assertMatchesRun(10, 10, [("A", 1, 2, 'N', "FFRFFFFRRL"), ("B", 7, 8, 'W', "FFLFFFFFFF")], 3)
+
+    def test_random_scenarios(self):
+        """Test random crowded fields with small and large keyframe intervals."""
+        rng = random.Random(20250318)
+        for _ in range(30):
+            width, height = rng.randint(1, 8), rng.randint(1, 8)
+            cars = random_cars(rng, width, height, rng.randint(1, 20), 30)
+            self.assertMatchesRun(width, height, cars, rng.choice([1, 4, 1024]),
+                                  stationary_collisions=rng.random() < 0.5)
+
+    def test_collisions_in_range(self):
+        """Test that collisions are reported only for the steps asked for."""
+        cars = [("A", 0, 1, 'N', "F"), ("B", 0, 3, 'S', "F"), ("C", 2, 0, 'N', "FFF"), ("D", 2, 4, 'S', "FFF")]
+        record(build(Simulation, 5, 5, cars), self.path, 1)
+        log = ReplayLog(self.path)
+        self.assertEqual(log.collisions(), [(1, 1, 0, 0, 2), (2, 3, 2, 2, 2)])
+        self.assertEqual(log.collisions(1, 2), [(2, 3, 2, 2, 2)])
+        self.assertEqual(log.collisions(0, 1), [(1, 1, 0, 0, 2)])
+
+    def test_empty_simulation(self):
+        """Test that a field without cars is logged."""
+        record(Simulation(3, 3), self.path)
+        log = ReplayLog(self.path)
+        self.assertEqual((len(log), log.steps), (0, 0))
+        self.assertEqual(log.cars_at(5), [])
+
+    def test_not_a_replay_log(self):
+        """Test that other files are rejected."""
+        with open(self.path, 'wb') as f:
+            f.write(b"3 4\n1\n")
+        with self.assertRaises(ReplayError):
+            ReplayLog(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,241 @@
+# ============================================================
+
+# This Python script provides a segment engine for the car simulation.
+# Car programs are run-length compiled (see Program in car_simulation.py)
+# and cars are advanced a whole run at a time in closed form.
+
+# Time is cut into windows. For each window every car gets the bounding box
+# of the cells it visits in that window, and a grid hash groups the cars
+# whose boxes intersect. A car in no group cannot meet anyone and is
+# fast-forwarded through the whole window. Each group is handled on its
+# own: it is grouped again over the first and second half of the window,
+# down to single steps, which are run with Simulation.step_cars. Only cars
+# that could meet pay for per-step execution, so collision records are
+# the same as Simulation.run. Where most cars could meet anyway, every car
+# is stepped as in Simulation.run until a window pays off again.
+
+# ============================================================
+
+from car_simulation import Simulation, DIRECTIONS, MOVES
+
+# A grouping that compares more than this many box pairs per box is given
+# up and the window halved, so grouping stays close to O(n).
+PAIRS_PER_BOX = 8
+
+# Fleets where most programs average fewer commands per run than this are
+# stepped as in Simulation.run: walking their runs costs about as much as
+# stepping. Programs are looked at in a sample of this many cars.
+MIN_RUN_LENGTH = 4
+RUN_LENGTH_SAMPLE = 64
+
+# Windows of a group this short are stepped rather than split further.
+STEPPED_WINDOW = 2
+
+# Longest stretch of plain per-step execution between two tries of a window.
+MAX_PLAIN_STEPS = 64
+
+
+def path_box(car, steps, width, height):
+    # Bounding box (x0, y0, x1, y1) of the cells the car visits in its next
+    # `steps` commands, walked a run at a time like Car.fast_forward.
+    x0 = x1 = x = car.x
+    y0 = y1 = y = car.y
+    program = car.compile()
+    cursor = car.cursor
+    end = min(cursor + steps, len(car.commands))
+    heading = DIRECTIONS.index(car.direction)
+    i = program.run_at(cursor)
+    while cursor < end:
+        command, start, count = program.runs[i]
+        n = min(start + count, end) - cursor
+        if command == 'L':
+            heading = (heading - n) % 4
+        elif command == 'R':
+            heading = (heading + n) % 4
+        elif command == 'F':
+            dx, dy = MOVES[DIRECTIONS[heading]]
+            x = min(max(x + dx * n, 0), width - 1)
+            y = min(max(y + dy * n, 0), height - 1)
+            x0, x1 = min(x0, x), max(x1, x)
+            y0, y1 = min(y0, y), max(y1, y)
+        cursor += n
+        i += 1
+    return x0, y0, x1, y1
+
+
+def long_runs(cars):
+    # Whether at least half of the cars average MIN_RUN_LENGTH commands per
+    # run over what is left of their programs.
+    long = 0
+    for car in cars:
+        program = car.compile()
+        runs = len(program) - program.run_at(car.cursor)
+        if len(car.commands) - car.cursor >= MIN_RUN_LENGTH * runs:
+            long += 1
+    return 2 * long >= len(cars)
+
+
+def overlapping_groups(boxes, moving, limit=None):
+    # Group the boxes that intersect, directly or through other boxes.
+    # Boxes are hashed into a grid of cells as large as the largest box, so
+    # a box lies in at most four cells and only boxes sharing a cell are
+    # compared. Boxes from index `moving` on are parked cars and are only
+    # grouped with moving ones. Returns lists of box indexes in ascending
+    # order, or None once more than `limit` pairs were compared.
+    size = 1 + max((max(x1 - x0, y1 - y0) for x0, y0, x1, y1 in boxes), default=0)
+    cells = {}
+    for i, (x0, y0, x1, y1) in enumerate(boxes):
+        for cx in range(x0 // size, x1 // size + 1):
+            for cy in range(y0 // size, y1 // size + 1):
+                cells.setdefault((cx, cy), []).append(i)
+
+    parent = list(range(len(boxes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    compared = 0
+    for members in cells.values():
+        if len(members) < 2:
+            continue
+        compared += len(members) * (len(members) - 1) // 2
+        if limit is not None and compared > limit:
+            return None
+        for a, i in enumerate(members):
+            x0, y0, x1, y1 = boxes[i]
+            for j in members[a + 1:]:
+                if (i < moving or j < moving) and x0 <= boxes[j][2] and boxes[j][0] <= x1 \
+                        and y0 <= boxes[j][3] and boxes[j][1] <= y1:
+                    parent[find(i)] = find(j)
+
+    groups = {}
+    for i in range(len(boxes)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+class SegmentSimulation(Simulation):
+
+    def run_steps(self):
+        step = self.steps
+        last = step
+        active = self.active_cars()
+
+        # Window of the next round; it grows while most cars move freely.
+        window = 2
+        # Steps to run every car through step_cars before trying a window
+        # again, for fleets too crowded (or turning too often) for windows
+        # to pay off; doubled after every window that did not.
+        plain = 0
+        backoff = 1
+        while active:
+            if plain:
+                self.step_cars(step, active)
+                step += 1
+                last = step
+                plain -= 1
+                active = self.active_cars(active)
+                continue
+
+            window = min(window, max(len(car.commands) - car.cursor for car in active))
+            if window > 1 and not long_runs(active[::max(1, len(active) // RUN_LENGTH_SAMPLE)]):
+                # Most cars turn too often for runs to be worth skipping.
+                window = 1
+            parts = self.partition(active, window, self.parked_cars()) if window > 1 else None
+            if parts is None:
+                if window > 2:
+                    window //= 2
+                else:
+                    plain, backoff = backoff, min(backoff * 2, MAX_PLAIN_STEPS)
+                continue
+
+            free, groups = parts
+            last = max(last, self.fast_forward_free(free, step, window))
+            for cars, parked in groups:
+                last = max(last, self.advance(cars, step, window, parked))
+            step += window
+            active = self.active_cars(active)
+
+            grouped = sum(len(cars) for cars, _ in groups)
+            if len(free) >= 3 * grouped:
+                window *= 2
+                backoff = 1
+            else:
+                if window > 2:
+                    window //= 2
+                else:
+                    plain, backoff = backoff, min(backoff * 2, MAX_PLAIN_STEPS)
+        self.steps = last
+
+    def parked_cars(self, cars=None):
+        # Cars a moving car can hit while they stand still.
+        if not self.stationary_collisions:
+            return []
+        return [car for car in (self.cars if cars is None else cars) if car.collided or not car.has_commands()]
+
+    def partition(self, cars, steps, parked, limited=True):
+        # Split `cars` into the ones that cannot meet another car (or hit
+        # one of `parked`) within `steps` steps and groups of (cars, parked
+        # cars) that might. Returns None if the sweep was given up.
+        boxes = ([path_box(car, steps, self.width, self.height) for car in cars]
+                 + [(car.x, car.y, car.x, car.y) for car in parked])
+        groups = overlapping_groups(boxes, len(cars), PAIRS_PER_BOX * len(boxes) if limited else None)
+        if groups is None:
+            return None
+        free = []
+        risky = []
+        for members in groups:
+            if len(members) > 1:
+                risky.append(([cars[i] for i in members if i < len(cars)],
+                              [parked[i - len(cars)] for i in members if i >= len(cars)]))
+            elif members[0] < len(cars):
+                free.append(cars[members[0]])
+        return free, risky
+
+    def fast_forward_free(self, cars, step, steps):
+        # Fast-forward cars that meet nobody; returns the last step any of
+        # them processes a command in.
+        last = step
+        for car in cars:
+            last = max(last, step + min(steps, len(car.commands) - car.cursor))
+        self.fast_forward_cars(cars, steps)
+        return last
+
+    def advance(self, cars, step, steps, parked):
+        # Run a group of cars for `steps` steps, given that no car outside
+        # the group (other than `parked`) can meet them in that time.
+        # Returns the last step any of them processes a command in.
+        last = step
+        pending = [(cars, step, steps, parked)]
+        while pending:
+            cars, step, steps, parked = pending.pop()
+            moving = self.active_cars(cars)
+            if not moving:
+                continue
+            # Cars of the group that have stopped are in the way as well.
+            obstacles = parked + self.parked_cars(cars)
+
+            if steps <= STEPPED_WINDOW:
+                # Too short to be worth grouping again.
+                for s in range(step, step + steps):
+                    if self.step_cars(s, moving):
+                        last = s + 1
+                    moving = self.active_cars(moving)
+                continue
+
+            parts = self.partition(moving, steps, obstacles)
+            if parts is None or (not parts[0] and len(parts[1]) == 1):
+                # Nothing splits off over the whole window: take its two
+                # halves in turn.
+                half = steps // 2
+                pending.append((cars, step + half, steps - half, parked))
+                pending.append((cars, step, half, parked))
+                continue
+
+            free, groups = parts
+            last = max(last, self.fast_forward_free(free, step, steps))
+            pending.extend((group, step, steps, group_parked) for group, group_parked in groups)
+        return last
@@ -0,0 +1,107 @@
+# ===============================================================================================
+
+# This Python test script checks that the segment engine in car_simulation_segments.py
+# produces exactly the same cars, positions and collision records as Simulation.run.
+
+# ===============================================================================================
+
+
+import random
+import unittest
+
+from car_simulation import Simulation, Program, DIRECTIONS
+from car_simulation_segments import SegmentSimulation, overlapping_groups, path_box
+from car_simulation_test_helpers import build, final_state, SameResultMixin
+
+
+def run_length_commands(rng, runs, longest):
+    return "".join(rng.choice("LRFFF") * rng.randint(1, longest) for _ in range(runs))
+
+
+class TestProgram(unittest.TestCase):
+    def test_runs(self):
+        """Test if a program is compiled into runs of identical commands."""
+        program = Program(b"FFFFRRLF")
+        self.assertEqual(program.runs, [('F', 0, 4), ('R', 4, 2), ('L', 6, 1), ('F', 7, 1)])
+        self.assertEqual(program.run_at(0), 0)
+        self.assertEqual(program.run_at(5), 1)
+        self.assertEqual(program.run_at(7), 3)
+
+    def test_overlapping_groups(self):
+        """Test if the sweep groups intersecting boxes, and parked boxes only with moving ones."""
+        self.assertEqual(overlapping_groups([(0, 0, 5, 0), (0, 1, 5, 1), (6, 0, 6, 9)], 3), [[0], [1], [2]])
+        self.assertEqual(sorted(overlapping_groups([(0, 0, 5, 0), (3, 0, 3, 9), (3, 9, 8, 9), (9, 9, 9, 9)], 4)),
+                         [[0, 1, 2], [3]])
+        self.assertEqual(sorted(overlapping_groups([(0, 0, 5, 0), (1, 1, 1, 1), (1, 1, 1, 1)], 1)), [[0], [1], [2]])
+        self.assertIsNone(overlapping_groups([(0, 0, 9, 9)] * 5, 5, limit=4))
+
+    def test_path_box(self):
+        """Test if a path box covers every run in the window, clamped at the boundary."""
+        car = build(Simulation, 10, 10, [("A", 5, 5, 'N', "FFRFFFFFFFFLL")]).cars[0]
+        self.assertEqual(path_box(car, 3, 10, 10), (5, 5, 5, 7))
+        self.assertEqual(path_box(car, 20, 10, 10), (5, 5, 9, 7))
+
+
+class TestSegmentSimulation(SameResultMixin, unittest.TestCase):
+    engine_class = SegmentSimulation
+
+    def test_two_cars_collide(self):
+        """Test the two car collision scenario from the specification."""
+        self.assertSameResult(10, 10, [("A", 1, 2, 'N', "FFRFFFFRRL"), ("B", 7, 8, 'W', "FFLFFFFFFF")])
+
+    def test_long_run_is_clamped(self):
+        """Test that a long run of F moves stops at the field boundary."""
+        self.assertSameResult(5, 5, [("A", 1, 1, 'N', "F" * 100000 + "R" + "F" * 3)])
+
+    def test_head_on_runs(self):
+        """Test two cars that drive into each other on long runs."""
+        self.assertSameResult(1000, 1, [("A", 0, 0, 'E', "F" * 5000), ("B", 998, 0, 'W', "F" * 5000)])
+
+    def test_head_on_swap(self):
+        """Test two cars on long runs that swap cells head-on."""
+        cars = [("A", 0, 0, 'E', "F" * 5000), ("B", 999, 0, 'W', "F" * 5000)]
+        self.assertSameResult(1000, 1, cars)
+        self.assertSameResult(1000, 1, cars, swap_collisions=True)
+
+    def test_random_scenarios(self):
+        """Test random run-length programs against Simulation.run."""
+        rng = random.Random(20250317)
+        for _ in range(100):
+            width, height = rng.randint(1, 12), rng.randint(1, 12)
+            cars = [(f"Car{i}", rng.randrange(width), rng.randrange(height), rng.choice(DIRECTIONS),
+                     run_length_commands(rng, rng.randint(0, 6), 8)) for i in range(rng.randint(1, 8))]
+            self.assertSameResult(width, height, cars)
+            self.assertSameResult(width, height, cars, stationary_collisions=True)
+
+    def test_random_fleets(self):
+        """Test larger random fleets with long runs, with each collision option."""
+        rng = random.Random(20250325)
+        for _ in range(30):
+            width, height = rng.randint(5, 40), rng.randint(5, 40)
+            cars = [(f"Car{i}", rng.randrange(width), rng.randrange(height), rng.choice(DIRECTIONS),
+                     run_length_commands(rng, rng.randint(0, 8), 30)) for i in range(rng.randint(2, 40))]
+            self.assertSameResult(width, height, cars)
+            self.assertSameResult(width, height, cars, stationary_collisions=True)
+            self.assertSameResult(width, height, cars, swap_collisions=True)
+
+    def test_resume(self):
+        """Test if a run continued after iter_steps() gives the same result."""
+        cars = [("A", 0, 0, 'E', "F" * 50), ("B", 40, 0, 'W', "F" * 50), ("C", 9, 9, 'N', "RRFFFLF")]
+        expected = build(Simulation, 60, 10, cars)
+        expected.run()
+        actual = build(SegmentSimulation, 60, 10, cars)
+        steps = actual.iter_steps()
+        for _ in range(5):
+            next(steps)
+        actual.run()
+        self.assertEqual(final_state(actual), final_state(expected))
+
+    def test_stationary_collisions(self):
+        """Test a long run that ends in a parked car."""
+        cars = [("A", 0, 0, 'E', "F" * 500), ("B", 300, 0, 'N', ""), ("C", 299, 5, 'S', "FFFFF" + "L" * 400)]
+        self.assertSameResult(1000, 10, cars)
+        self.assertSameResult(1000, 10, cars, stationary_collisions=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
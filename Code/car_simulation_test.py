@@ -19,7 +19,7 @@ from unittest.mock import patch
 from io import StringIO
 import sys
 
-from car_simulation import Car, Simulation, DIRECTIONS, MOVES, ValidInput
+from car_simulation import Car, Simulation, DIRECTIONS, MOVES, ValidInput, GridOccupancy, HashOccupancy, VerifyFieldSize
 
 # Configure logging
 # logging.basicConfig(filename="../Output/car_simulation_test.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -124,23 +124,58 @@ class TestCar(unittest.TestCase):
         PrintLog.print_log_2(9, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
 
 
+    def test_next_command_advances_cursor(self):
+        """Test if commands are consumed through the cursor without changing the program."""
+        PrintLog.print_log_1(18)
+        self.assertTrue(self.car.has_commands())
+        self.assertEqual(self.car.next_command(), 'F')
+        self.assertEqual(self.car.next_command(), 'R')
+        self.assertEqual(self.car.next_command(), 'F')
+        self.assertFalse(self.car.has_commands())
+        self.assertEqual(self.car.commands, b'FRF')
+        PrintLog.print_log_2(18, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
+
+    def test_str_shows_original_program(self):
+        """Test if the car is described by its starting position and full program."""
+        PrintLog.print_log_1(19)
+        self.car.process_command(self.car.next_command(), 5, 5)
+        self.assertEqual(str(self.car), '- TestCar, (0,0) N, FRF')
+        PrintLog.print_log_2(19, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
+
+    def test_fast_forward(self):
+        """Test if fast-forwarding matches processing the commands one by one."""
+        PrintLog.print_log_1(20)
+        car = Car("TestCar", 1, 1, 'N', "FFFFFFFFRRRLFFFFFFFFFF")
+        expected = Car("TestCar", 1, 1, 'N', "FFFFFFFFRRRLFFFFFFFFFF")
+        car.fast_forward(100, 5, 5)
+        while expected.has_commands():
+            expected.process_command(expected.next_command(), 5, 5)
+        self.assertEqual((car.x, car.y, car.direction, car.cursor), (expected.x, expected.y, expected.direction, expected.cursor))
+        PrintLog.print_log_2(20, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
+
+    def test_compact_car(self):
+        """Test if the car has no per-instance dictionary and records collisions as tuples."""
+        PrintLog.print_log_1(24)
+        self.assertFalse(hasattr(self.car, '__dict__'))
+        self.assertEqual(self.car.collision_record, ())
+        self.car.record_collision(3, 0, 1, 7)
+        self.assertEqual(self.car.collision_record, [(3, 0, 1, 7)])
+        PrintLog.print_log_2(24, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
+
+
 class TestSimulation(unittest.TestCase):
     def setUp(self):
         """Set up the initial conditions for the simulation."""
         PrintLog.print_log_1(10)
         self.simulation = Simulation(5, 5)  # Create a 5x5 grid
-        # Add cars to both lists using both methods
         self.simulation.add_car("Car1", 0, 0, 'N', ['F', 'R', 'F'])
-        self.simulation.add_car_original("Car1", 0, 0, 'N', ['F', 'R', 'F'])
         self.simulation.add_car("Car2", 1, 0, 'E', ['F', 'R', 'F'])
-        self.simulation.add_car_original("Car2", 1, 0, 'E', ['F', 'R', 'F'])
         PrintLog.print_log_2(10, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
 
     def test_car_added_to_simulation(self):
         """Test if cars are properly added to the simulation."""
         PrintLog.print_log_1(11)
         self.assertEqual(len(self.simulation.cars), 2)  # Ensure two cars in self.cars
-        self.assertEqual(len(self.simulation.cars_original), 2)  # Ensure two cars in self.cars_original
         PrintLog.print_log_2(11, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
 
     def test_run_simulation_no_collision(self):
@@ -177,9 +212,129 @@ class TestSimulation(unittest.TestCase):
         PrintLog.print_log_1(14)
         self.simulation.reset()
         self.assertEqual(len(self.simulation.cars), 0)
-        self.assertEqual(len(self.simulation.cars_original), 0)
         PrintLog.print_log_2(14, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
 
+    def test_parked_car_ignored_by_default(self):
+        """Test if a moving car drives through a parked car unless stationary collisions are on."""
+        PrintLog.print_log_1(21)
+        self.simulation.reset()
+        self.simulation.add_car("Car3", 0, 0, 'N', ['F', 'F'])
+        self.simulation.add_car("Car4", 0, 1, 'N', [])
+        self.simulation.run()
+        self.assertFalse(self.simulation.cars[0].collided)
+        self.assertEqual(self.simulation.cars[0].y, 2)
+        PrintLog.print_log_2(21, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
+
+    def test_stationary_collisions(self):
+        """Test if a moving car collides with a parked car when stationary collisions are on."""
+        PrintLog.print_log_1(22)
+        simulation = Simulation(5, 5, stationary_collisions=True)
+        simulation.add_car("Car3", 0, 0, 'N', ['F', 'F'])
+        simulation.add_car("Car4", 0, 1, 'N', [])
+        simulation.run()
+        self.assertTrue(simulation.cars[0].collided)
+        self.assertTrue(simulation.cars[1].collided)
+        self.assertEqual(simulation.cars[0].collision_record, [(1, 0, 1, 1)])
+        self.assertEqual(simulation.cars[1].collision_record, [(0, 0, 1, 1)])
+        self.assertEqual(simulation.result_lines(), ['- Car3, collides with Car4 at (0, 1) at step 1',
+                                                     '- Car4, collides with Car3 at (0, 1) at step 1'])
+        PrintLog.print_log_2(22, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
+
+    def test_sparse_field_collision(self):
+        """Test if collisions are found on a field too large for the dense occupancy grid."""
+        PrintLog.print_log_1(23)
+        simulation = Simulation(100000, 100000)
+        simulation.add_car("Car3", 50000, 1, 'N', ['F'])
+        simulation.add_car("Car4", 50000, 3, 'S', ['F'])
+        simulation.run()
+        self.assertNotIsInstance(simulation.occupancy, GridOccupancy)
+        self.assertTrue(simulation.cars[0].collided)
+        self.assertTrue(simulation.cars[1].collided)
+        PrintLog.print_log_2(23, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
+
+    def test_iter_steps(self):
+        """Test if iter_steps yields the moved cars and new collisions of every step."""
+        PrintLog.print_log_1(25)
+        self.simulation.reset()
+        self.simulation.add_car("Car3", 0, 1, 'N', ['R', 'F'])
+        self.simulation.add_car("Car4", 1, 3, 'S', ['F', 'F', 'F'])
+        deltas = [delta.as_dict() for delta in self.simulation.iter_steps()]
+        self.assertEqual(deltas, [
+            {'step': 1, 'moved': [(0, 0, 1, 'E'), (1, 1, 2, 'S')], 'collisions': []},
+            {'step': 2, 'moved': [(0, 1, 1, 'E'), (1, 1, 1, 'S')], 'collisions': [(1, 0, 1, 1)]},
+        ])
+        self.assertEqual(self.simulation.steps, 2)
+        self.assertEqual(self.simulation.cars[1].collision_record, [(0, 1, 1, 2)])
+        PrintLog.print_log_2(25, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
+
+    def test_iter_steps_resume(self):
+        """Test if a run stopped part way through iter_steps ends like an uninterrupted run."""
+        PrintLog.print_log_1(26)
+        cars = [("Car3", 0, 0, 'N', "FFRFFLFF"), ("Car4", 4, 4, 'S', "FFRFFLFFFF"), ("Car5", 2, 0, 'N', "FFFF")]
+        expected = Simulation(5, 5)
+        stopped = Simulation(5, 5)
+        for car in cars:
+            expected.add_car(*car)
+            stopped.add_car(*car)
+        expected.run()
+
+        for delta in stopped.iter_steps():
+            if delta.step == 3:
+                break
+        self.assertEqual(stopped.steps, 3)
+        stopped.run()
+        self.assertEqual(stopped.steps, expected.steps)
+        self.assertEqual(stopped.result_lines(), expected.result_lines())
+        PrintLog.print_log_2(26, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
+
+    def test_aiter_steps(self):
+        """Test if the async variant yields the same steps as iter_steps."""
+        PrintLog.print_log_1(27)
+        import asyncio
+
+        async def collect(simulation):
+            return [delta.as_dict() async for delta in simulation.aiter_steps()]
+
+        self.simulation.reset()
+        self.simulation.add_car("Car3", 0, 1, 'N', ['F'])
+        self.simulation.add_car("Car4", 0, 3, 'S', ['F'])
+        self.assertEqual(asyncio.run(collect(self.simulation)),
+                         [{'step': 1, 'moved': [(0, 0, 2, 'N'), (1, 0, 2, 'S')], 'collisions': [(1, 0, 0, 2)]}])
+        PrintLog.print_log_2(27, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
+
+    def test_sparse_field(self):
+        """Test if a field with 64-bit coordinates runs on a sparse occupancy index."""
+        PrintLog.print_log_1(28)
+        edge = (1 << 63) - 1
+        self.assertEqual(VerifyFieldSize.parse_width_height(f"{edge} {edge}"), (edge, edge))
+        with self.assertRaises(ValueError):
+            VerifyFieldSize.parse_width_height(f"{edge + 1} 10")
+        simulation = Simulation(edge, edge)
+        simulation.add_car("Car1", edge - 1, edge - 2, 'N', ['F', 'F', 'F'])
+        simulation.add_car("Car2", edge - 1, 0, 'S', ['F'])
+        simulation.run()
+        self.assertIsInstance(simulation.occupancy, HashOccupancy)
+        self.assertEqual([(car.x, car.y) for car in simulation.cars], [(edge - 1, edge - 1), (edge - 1, 0)])
+        PrintLog.print_log_2(28, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
+
+    def test_swap_collisions(self):
+        """Test if cars that swap cells head-on only collide with swap_collisions set."""
+        PrintLog.print_log_1(29)
+        for swap_collisions in (False, True):
+            simulation = Simulation(5, 5, swap_collisions=swap_collisions)
+            simulation.add_car("Car1", 1, 2, 'E', ['F', 'F'])
+            simulation.add_car("Car2", 2, 2, 'W', ['F', 'F'])
+            simulation.add_car("Car3", 0, 0, 'N', ['F'])
+            collisions = [delta.collisions for delta in simulation.iter_steps()]
+            if swap_collisions:
+                self.assertEqual(collisions, [[(1, 0, 1, 2)]])
+                self.assertEqual(simulation.result_lines()[:2], ['- Car1, collides with Car2 at (2, 2) at step 1',
+                                                                 '- Car2, collides with Car1 at (1, 2) at step 1'])
+            else:
+                self.assertEqual(collisions, [[], []])
+                self.assertEqual(simulation.result_lines()[:2], ['- Car1, (3,2) E', '- Car2, (0,2) W'])
+        PrintLog.print_log_2(29, f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name}() passed")
+
 
 class TestValidInput(unittest.TestCase):
     def test_get_valid_input_valid(self):
@@ -0,0 +1,69 @@
+# ===============================================================================================
+
+# Helpers shared by the engine test scripts: building a simulation from car tuples, running it
+# with its result listing captured, random scenarios, the final state every engine must match
+# against Simulation.run, and a TestCase mixin that compares an engine with Simulation.run.
+
+# ===============================================================================================
+
+
+from contextlib import redirect_stdout
+from io import StringIO
+
+from car_simulation import Simulation, DIRECTIONS, COMMANDS
+
+
+def build(simulation_class, width, height, cars, **options):
+    simulation = simulation_class(width, height, **options)
+    for name, x, y, direction, commands in cars:
+        simulation.add_car(name, x, y, direction, commands)
+    return simulation
+
+
+def run_and_display(simulation):
+    output = StringIO()
+    with redirect_stdout(output):
+        simulation.run()
+        simulation.display_new_position()
+    return output.getvalue()
+
+
+def random_cars(rng, width, height, count, length):
+    cars = []
+    for i in range(count):
+        commands = "".join(rng.choice(COMMANDS) for _ in range(rng.randint(0, length)))
+        cars.append((f"Car{i}", rng.randrange(width), rng.randrange(height), rng.choice(DIRECTIONS), commands))
+    return cars
+
+
+def final_state(simulation):
+    # Step counter plus position, heading, cursor, collided flag and
+    # collision records of every car.
+    return simulation.steps, [(car.x, car.y, car.direction, car.cursor, car.collided, tuple(car.collision_record))
+                              for car in simulation.cars]
+
+
+class SameResultMixin:
+    # Mixed into the unittest.TestCase of an engine. engine_class is the
+    # engine under test; override build_engine to build it another way.
+    engine_class = None
+
+    def build_engine(self, width, height, cars, **options):
+        return build(self.engine_class, width, height, cars, **options)
+
+    def assertSameResult(self, width, height, cars, engine_options=None, **options):
+        # Run the cars with the engine and with Simulation.run and compare.
+        # engine_options are given to the engine only.
+        expected = build(Simulation, width, height, cars, **options)
+        actual = self.build_engine(width, height, cars, **options, **(engine_options or {}))
+        self.assertEqual(run_and_display(actual), run_and_display(expected))
+        self.assertEqual(final_state(actual), final_state(expected))
+
+    def assertSameAsRerun(self, simulation, **options):
+        # Compare a simulation that has been run with Simulation.run of all
+        # its cars from step 0.
+        expected = build(Simulation, simulation.width, simulation.height,
+                         [(car.name, *car.origin, car.commands) for car in simulation.cars], **options)
+        expected.run()
+        self.assertEqual(simulation.result_lines(), expected.result_lines())
+        self.assertEqual(final_state(simulation), final_state(expected))
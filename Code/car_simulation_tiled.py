@@ -0,0 +1,257 @@
+# ============================================================
+
+# This Python script provides a parallel engine for one large field.
+# The field is cut into strips of columns (tiles), one per worker process.
+# Car state lives in multiprocessing.shared_memory arrays, so workers read
+# and write it in place. Each worker steps the cars in its tile with the
+# vectorized step of car_simulation_vectorized.py. Cars that drive across
+# a border are handed to the neighbouring worker through its inbox queue.
+
+# A car moves at most one cell per step, so a tile only ever meets its
+# two neighbours:
+# - Same-cell collisions are checked by the tile the cars end up in.
+# - Parked cars are checked by the tile they wait in.
+# - A head-on swap is checked by the tile holding the lower cell of its
+#   edge.
+# Workers step in lockstep behind a barrier. Every collision is sent back
+# as (step, car, other) and written to the cars in the order Simulation.run
+# produces, so results are the same as the single-process engines.
+
+# Usage: TiledSimulation(width, height, workers=8) in place of Simulation.
+
+# ============================================================
+
+import os
+import multiprocessing
+from queue import Empty
+from threading import BrokenBarrierError
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from car_simulation import DIRECTIONS
+from car_simulation_vectorized import (VectorizedSimulation, WIDE_FIELD_CELLS, TURNS, STEP_X, STEP_Y,
+                                       cell_keys, edge_keys, encode_commands, collision_pairs, parked_pairs,
+                                       swap_pairs)
+
+# Seconds a worker waits for a neighbour before checking that no other
+# worker has failed.
+POLL_SECONDS = 0.1
+
+
+def tile_bounds(x, width, tiles):
+    # Column borders of `tiles` strips holding about the same number of cars.
+    # Tiles are at least one column wide, so there may be fewer of them.
+    ordered = np.sort(x)
+    cuts = ordered[len(ordered) * np.arange(1, tiles) // tiles]
+    return np.unique(np.concatenate(([0], cuts, [width])))
+
+
+def share(arrays):
+    # Copy every array into a new shared memory block. Returns the blocks
+    # and a picklable (name, dtype, shape) description of each array.
+    blocks, layout = {}, {}
+    for name, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        blocks[name] = block
+        layout[name] = (block.name, array.dtype.str, array.shape)
+    return blocks, layout
+
+
+def attach(layout):
+    blocks, arrays = [], {}
+    for name, (block_name, dtype, shape) in layout.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype, buffer=block.buf)
+    return blocks, arrays
+
+
+def receive(inbox, barrier):
+    # Next message from a neighbour; gives up once another worker failed.
+    while True:
+        try:
+            return inbox.get(timeout=POLL_SECONDS)
+        except Empty:
+            if barrier.broken:
+                raise BrokenBarrierError
+
+
+def run_tile(tile, bounds, arrays, options, inboxes, barrier):
+    # Step the cars of one tile until no car of the field is active.
+    # Returns the step reached and every collision as (step, car, other).
+    x, y, heading, cursor, collided = (arrays[name] for name in ('x', 'y', 'heading', 'cursor', 'collided'))
+    program, offsets, lengths, counts = arrays['program'], arrays['offsets'], arrays['lengths'], arrays['counts']
+    width, height, stationary, swaps = (options[name] for name in ('width', 'height', 'stationary', 'swaps'))
+    wide = width * height >= WIDE_FIELD_CELLS
+    wide_edges = 2 * width * height >= WIDE_FIELD_CELLS
+    lo, hi = bounds[tile], bounds[tile + 1]
+    neighbours = [t for t in (tile - 1, tile + 1) if 0 <= t < len(bounds) - 1]
+
+    events = []
+    step = options['step']
+    here = np.flatnonzero((x >= lo) & (x < hi))
+    parked_cars = here[:0]
+    parked_keys = cell_keys(x[parked_cars], y[parked_cars], height, wide)
+
+    while True:
+        # Collided flags of the last step may have been set by a neighbour.
+        barrier.wait()
+        moving = (cursor[here] < lengths[here]) & ~collided[here]
+        if stationary and not moving.all():
+            stopped = here[~moving]
+            parked_cars = np.concatenate((parked_cars, stopped))
+            parked_keys = np.concatenate((parked_keys, cell_keys(x[stopped], y[stopped], height, wide)))
+            order = np.lexsort((parked_cars, parked_keys))
+            parked_cars, parked_keys = parked_cars[order], parked_keys[order]
+        active = here[moving]
+        counts[step % 2, tile] = active.size
+        barrier.wait()
+        if not counts[step % 2].any():
+            return step, events
+
+        # Move every active car of the tile.
+        command = program[offsets[active] + cursor[active]]
+        new_heading = TURNS[command, heading[active]]
+        heading[active] = new_heading
+        old_x, old_y = x[active], y[active]
+        ax = np.clip(old_x + STEP_X[command, new_heading], 0, width - 1)
+        ay = np.clip(old_y + STEP_Y[command, new_heading], 0, height - 1)
+        x[active], y[active] = ax, ay
+        cursor[active] += 1
+
+        # Hand cars that left the tile to their new owner.
+        left, right = ax < lo, ax >= hi
+        for t in neighbours:
+            inboxes[t].put((tile, active[left if t < tile else right]))
+        from_left = from_right = active[:0]
+        for _ in neighbours:
+            sender, cars = receive(inboxes[tile], barrier)
+            if sender < tile:
+                from_left = cars
+            else:
+                from_right = cars
+        here = np.sort(np.concatenate((active[~(left | right)], from_left, from_right)))
+
+        keys = cell_keys(x[here], y[here], height, wide)
+        hit, pairs = collision_pairs(keys, here)
+        if pairs:
+            collided[hit] = True
+        if stationary and parked_cars.size:
+            parked_hit, hit_pairs = parked_pairs(keys, here, parked_keys, parked_cars)
+            if hit_pairs:
+                collided[parked_hit] = True
+                collided[[car for car, _ in hit_pairs]] = True
+                pairs = pairs + hit_pairs
+        if swaps:
+            # Edges whose lower cell is in this tile: moves of the tile's own
+            # cars, except those that left to the left, and of cars that
+            # came in from the right, which moved one column to the left.
+            kept = ~left
+            cars = np.concatenate((active[kept], from_right))
+            x0 = np.concatenate((old_x[kept], x[from_right] + 1))
+            y0 = np.concatenate((old_y[kept], y[from_right]))
+            order = np.argsort(cars)
+            cars, x0, y0 = cars[order], x0[order], y0[order]
+            x1, y1 = x[cars], y[cars]
+            moved = np.flatnonzero((x1 != x0) | (y1 != y0))
+            if moved.size > 1:
+                mx0, my0, mx1, my1 = x0[moved], y0[moved], x1[moved], y1[moved]
+                edges = edge_keys(mx0, my0, mx1, my1, height, wide_edges)
+                swap_hit, swapped = swap_pairs(edges, (mx0 < mx1) | (my0 < my1), cars[moved])
+                if swapped:
+                    collided[swap_hit] = True
+                    pairs = pairs + swapped
+        events.extend((step, car, other) for car, other in pairs)
+        step += 1
+
+
+def tile_worker(tile, bounds, layout, options, inboxes, barrier, results):
+    blocks, arrays = attach(layout)
+    try:
+        results.put((tile, run_tile(tile, bounds, arrays, options, inboxes, barrier), None))
+    except BrokenBarrierError:
+        results.put((tile, None, None))
+    except Exception as e:
+        barrier.abort()
+        results.put((tile, None, f"{type(e).__name__}: {e}"))
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+class TiledSimulation(VectorizedSimulation):
+    # Fields with fewer cars than this per worker are run in this process.
+    MIN_CARS_PER_WORKER = 20000
+
+    def __init__(self, width, height, stationary_collisions=False, swap_collisions=False, workers=None):
+        super().__init__(width, height, stationary_collisions, swap_collisions)
+        self.workers = workers or os.cpu_count() or 1
+
+    def run_steps(self):
+        cars = self.cars
+        workers = min(self.workers, len(cars) // max(self.MIN_CARS_PER_WORKER, 1))
+        # Daemonic processes, such as pool workers on Python 3.8, cannot
+        # start workers of their own.
+        if workers < 2 or multiprocessing.current_process().daemon:
+            VectorizedSimulation.run_steps(self)
+            return
+
+        n = len(cars)
+        program, offsets, lengths = encode_commands(cars)
+        x = np.fromiter((car.x for car in cars), dtype=np.int64, count=n)
+        bounds = tile_bounds(x, self.width, workers)
+        tiles = len(bounds) - 1
+        blocks, layout = share({
+            'x': x,
+            'y': np.fromiter((car.y for car in cars), dtype=np.int64, count=n),
+            'heading': np.fromiter((DIRECTIONS.index(car.direction) for car in cars), dtype=np.int8, count=n),
+            'cursor': np.fromiter((car.cursor for car in cars), dtype=np.int64, count=n),
+            'collided': np.fromiter((car.collided for car in cars), dtype=bool, count=n),
+            'program': program,
+            'offsets': offsets,
+            'lengths': lengths,
+            # Active cars of every tile, for even and odd steps.
+            'counts': np.zeros((2, tiles), dtype=np.int64),
+        })
+        options = {'width': self.width, 'height': self.height, 'stationary': self.stationary_collisions,
+                   'swaps': self.swap_collisions, 'step': self.steps}
+
+        context = multiprocessing.get_context()
+        inboxes = [context.Queue() for _ in range(tiles)]
+        barrier = context.Barrier(tiles)
+        results = context.Queue()
+        processes = [context.Process(target=tile_worker, args=(t, bounds, layout, options, inboxes, barrier, results))
+                     for t in range(tiles)]
+        try:
+            for process in processes:
+                process.start()
+            outcomes = []
+            while len(outcomes) < tiles:
+                try:
+                    outcomes.append(results.get(timeout=POLL_SECONDS))
+                except Empty:
+                    if any(process.exitcode not in (None, 0) for process in processes):
+                        raise RuntimeError("Error: A tiled simulation worker exited unexpectedly.")
+            for process in processes:
+                process.join()
+
+            errors = [error for _, _, error in outcomes if error]
+            if errors or any(result is None for _, result, _ in outcomes):
+                raise RuntimeError(f"Error: Tiled simulation worker failed: {'; '.join(errors) or 'no result'}")
+            events = sorted(event for _, (_, tile_events), _ in outcomes for event in tile_events)
+            self.steps = outcomes[0][1][0]
+
+            state = {name: np.ndarray(shape, dtype, buffer=blocks[name].buf).copy()
+                     for name, (_, dtype, shape) in layout.items()}
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+
+        self._write_back(state['x'], state['y'], state['heading'], state['cursor'], state['collided'], events)
@@ -0,0 +1,85 @@
+# ===============================================================================================
+
+# This Python test script checks that the tiled engine in car_simulation_tiled.py, stepping one
+# field in several worker processes, produces exactly the same cars, positions and collision
+# records as Simulation.run, including cars handed over and colliding at tile borders.
+
+# ===============================================================================================
+
+
+import random
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from car_simulation import Simulation
+from car_simulation_tiled import TiledSimulation, tile_bounds
+from car_simulation_test_helpers import build, random_cars, SameResultMixin
+
+
+def tiled(width, height, cars, workers=3, **options):
+    simulation = build(TiledSimulation, width, height, cars, workers=workers, **options)
+    # Run small test fields in worker processes too.
+    simulation.MIN_CARS_PER_WORKER = 1
+    return simulation
+
+
+class TestTileBounds(unittest.TestCase):
+    def test_balanced_strips(self):
+        """Test if the strips hold about the same number of cars and cover the field."""
+        self.assertEqual(tile_bounds(np.array([0, 1, 2, 3, 4, 5, 6, 7, 8]), 10, 3).tolist(), [0, 3, 6, 10])
+
+    def test_crowded_column(self):
+        """Test if cars sharing a column give fewer, non-empty strips."""
+        self.assertEqual(tile_bounds(np.array([4, 4, 4, 4]), 10, 4).tolist(), [0, 4, 10])
+
+
+class TestTiledSimulation(SameResultMixin, unittest.TestCase):
+    def build_engine(self, width, height, cars, **options):
+        return tiled(width, height, cars, **options)
+
+    def test_collisions_at_borders(self):
+        """Test cars that cross tile borders and collide on and across them."""
+        cars = [("A", 0, 0, 'E', "FFFFFF"), ("B", 5, 0, 'W', "FFFFFF"), ("C", 2, 1, 'E', "FFFFFF"),
+                ("D", 7, 1, 'W', "FFFFFF"), ("E", 3, 2, 'E', "FF"), ("F", 6, 2, 'N', "")]
+        self.assertSameResult(9, 3, cars)
+        self.assertSameResult(9, 3, cars, swap_collisions=True)
+        self.assertSameResult(9, 3, cars, stationary_collisions=True)
+
+    def test_random_scenarios(self):
+        """Test random crowded fields against Simulation.run."""
+        rng = random.Random(20250321)
+        for _ in range(8):
+            width, height = rng.randint(3, 12), rng.randint(1, 6)
+            cars = random_cars(rng, width, height, rng.randint(6, 40), 30)
+            options = {'stationary_collisions': rng.random() < 0.5, 'swap_collisions': rng.random() < 0.5}
+            self.assertSameResult(width, height, cars, {'workers': rng.randint(2, 4)}, **options)
+
+    def test_resume_after_iter_steps(self):
+        """Test that run() in worker processes continues a simulation stopped part way through."""
+        rng = random.Random(20250322)
+        cars = random_cars(rng, 9, 6, 40, 30)
+        expected = build(Simulation, 9, 6, cars)
+        expected.run()
+        actual = tiled(9, 6, cars)
+        for delta in actual.iter_steps():
+            if delta.step == 7:
+                break
+        actual.run()
+        self.assertEqual(actual.steps, expected.steps)
+        self.assertEqual(actual.result_lines(), expected.result_lines())
+
+    def test_small_field_runs_in_process(self):
+        """Test if a field with few cars per worker runs without worker processes."""
+        simulation = build(TiledSimulation, 10, 10, [("A", 1, 2, 'N', "FFRFFFFRRL"), ("B", 7, 8, 'W', "FFLFFFFFFF")],
+                           workers=4)
+        with patch('car_simulation_tiled.share') as share:
+            simulation.run()
+        share.assert_not_called()
+        self.assertEqual(simulation.result_lines(), ['- A, collides with B at (5, 4) at step 7',
+                                                     '- B, collides with A at (5, 4) at step 7'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# ============================================================
+
+# This Python script is the trace subsystem of the car simulation.
+# The trace level and sink are chosen once at startup. Events are passed
+# as an event name plus raw values, and are only turned into text (or
+# JSON) by the sink, so nothing is formatted unless it is written.
+# Sinks buffer their output and write it in large blocks.
+
+# Startup configuration comes from the environment:
+#   CAR_SIMULATION_TRACE=off|steps|commands
+#   CAR_SIMULATION_TRACE_FILE=path   (.ndjson / .jsonl writes NDJSON, else text)
+
+# ============================================================
+
+import os
+import sys
+import json
+import atexit
+
+# Trace levels.
+TRACE_OFF = 0
+TRACE_STEPS = 1       # one event per car per step, plus collisions
+TRACE_COMMANDS = 2    # also every command and move
+
+LEVELS = {'off': TRACE_OFF, 'steps': TRACE_STEPS, 'commands': TRACE_COMMANDS}
+
+# Event name -> (field names, text template).
+EVENTS = {
+    'message': (('text',), "{0}"),
+    'step': (('step', 'car', 'x', 'y', 'direction'), "Step {0} - Car {1}: {2}, {3}, {4}"),
+    'collision': (('step', 'car', 'other', 'x', 'y'), "Car {1} collides with {2} at ({3}, {4}) at step {0}"),
+    'command': (('car', 'command'), "Car {0} processes command {1}"),
+    'moves': (('car', 'x', 'y', 'direction'), "Car {0} moves to ({1}, {2}) in direction {3}"),
+    'stays': (('car', 'x', 'y'), "Car {0} stays at ({1}, {2})"),
+    'fast_forward': (('car', 'x', 'y', 'direction'), "Car {0} fast-forwards to ({1}, {2}) in direction {3}"),
+}
+
+
+class TextSink:
+    # Writes one formatted line per event.
+    def __init__(self, stream, buffer_lines=1):
+        self.stream = stream
+        self.buffer_lines = buffer_lines
+        self.buffer = []
+
+    def emit(self, event, args):
+        self.buffer.append(EVENTS[event][1].format(*args))
+        if len(self.buffer) >= self.buffer_lines:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.stream.write("\n".join(self.buffer) + "\n")
+            self.buffer.clear()
+            self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class NDJSONSink(TextSink):
+    # Writes one JSON object per event, e.g. {"event": "moves", "car": "A", ...}.
+    def emit(self, event, args):
+        record = dict(zip(EVENTS[event][0], args))
+        record['event'] = event
+        self.buffer.append(json.dumps(record, separators=(',', ':')))
+        if len(self.buffer) >= self.buffer_lines:
+            self.flush()
+
+
+def open_sink(path, buffer_lines=4096):
+    stream = open(path, 'a')
+    if path.endswith(('.ndjson', '.jsonl')):
+        sink = NDJSONSink(stream, buffer_lines)
+    else:
+        sink = TextSink(stream, buffer_lines)
+    atexit.register(sink.close)
+    return sink
+
+
+def configure_from_environment(environ=os.environ):
+    # Returns (level, sink) for this process.
+    path = environ.get('CAR_SIMULATION_TRACE_FILE')
+    name = environ.get('CAR_SIMULATION_TRACE')
+    if name is None:
+        # Keep the old behaviour of printing every step under the debugger.
+        name = 'commands' if (path or 'pydevd' in sys.modules) else 'off'
+    level = LEVELS.get(name.lower())
+    if level is None:
+        # An unknown level must not stop the menu or any tool from starting.
+        print(f"Warning: Unknown CAR_SIMULATION_TRACE value {name!r}; use {'|'.join(LEVELS)}. Tracing is off.",
+              file=sys.stderr)
+        level = TRACE_OFF
+    if level == TRACE_OFF:
+        return TRACE_OFF, None
+    return level, open_sink(path) if path else TextSink(sys.stdout)
@@ -0,0 +1,96 @@
+# ===============================================================================================
+
+# This Python test script checks the trace subsystem in car_simulation_trace.py
+# and how the simulation reports its steps through PrintLog.
+
+# ===============================================================================================
+
+
+import json
+import unittest
+from contextlib import redirect_stderr
+from io import StringIO
+
+from car_simulation import PrintLog, Simulation
+from car_simulation_trace import TRACE_OFF, TRACE_STEPS, TRACE_COMMANDS, TextSink, NDJSONSink, configure_from_environment
+
+
+class RecordingSink:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event, args):
+        self.events.append((event,) + tuple(args))
+
+
+class TestSinks(unittest.TestCase):
+    def test_text_sink(self):
+        """Test if the text sink formats events the way the old print_log messages read."""
+        stream = StringIO()
+        sink = TextSink(stream, buffer_lines=10)
+        sink.emit('moves', ('A', 1, 2, 'N'))
+        sink.emit('stays', ('A', 1, 2))
+        self.assertEqual(stream.getvalue(), "")
+        sink.close()
+        self.assertEqual(stream.getvalue(), "Car A moves to (1, 2) in direction N\nCar A stays at (1, 2)\n")
+
+    def test_ndjson_sink(self):
+        """Test if the NDJSON sink writes one JSON object per event."""
+        stream = StringIO()
+        sink = NDJSONSink(stream)
+        sink.emit('step', (1, 'A', 0, 0, 'N'))
+        self.assertEqual(json.loads(stream.getvalue()), {'event': 'step', 'step': 1, 'car': 'A', 'x': 0, 'y': 0, 'direction': 'N'})
+
+    def test_configure_from_environment(self):
+        """Test if the level and sink are read from the environment."""
+        self.assertEqual(configure_from_environment({'CAR_SIMULATION_TRACE': 'off'}), (TRACE_OFF, None))
+        level, sink = configure_from_environment({'CAR_SIMULATION_TRACE': 'steps'})
+        self.assertEqual(level, TRACE_STEPS)
+        self.assertIsInstance(sink, TextSink)
+
+    def test_unknown_level(self):
+        """Test if an unknown trace level turns tracing off with a warning instead of failing."""
+        stderr = StringIO()
+        with redirect_stderr(stderr):
+            self.assertEqual(configure_from_environment({'CAR_SIMULATION_TRACE': 'verbose'}), (TRACE_OFF, None))
+        self.assertIn("off|steps|commands", stderr.getvalue())
+
+
+class TestSimulationTrace(unittest.TestCase):
+    def setUp(self):
+        self.saved = (PrintLog.level, PrintLog.sink)
+        self.simulation = Simulation(5, 5)
+        self.simulation.add_car("A", 0, 1, 'N', "F")
+        self.simulation.add_car("B", 0, 3, 'S', "F")
+
+    def tearDown(self):
+        PrintLog.level, PrintLog.sink = self.saved
+
+    def test_commands_level(self):
+        """Test if every step, command, move and collision is traced."""
+        sink = RecordingSink()
+        PrintLog.configure(TRACE_COMMANDS, sink)
+        self.simulation.run()
+        self.assertEqual(sink.events, [
+            ('step', 1, 'A', 0, 1, 'N'), ('command', 'A', 'F'), ('moves', 'A', 0, 2, 'N'),
+            ('step', 1, 'B', 0, 3, 'S'), ('command', 'B', 'F'), ('moves', 'B', 0, 2, 'S'),
+            ('collision', 1, 'B', 'A', 0, 2),
+        ])
+
+    def test_steps_level(self):
+        """Test if only steps and collisions are traced at the steps level."""
+        sink = RecordingSink()
+        PrintLog.configure(TRACE_STEPS, sink)
+        self.simulation.run()
+        self.assertEqual([event[0] for event in sink.events], ['step', 'step', 'collision'])
+
+    def test_off(self):
+        """Test if nothing reaches the sink with tracing off."""
+        sink = RecordingSink()
+        PrintLog.configure(TRACE_OFF, sink)
+        self.simulation.run()
+        self.assertEqual(sink.events, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
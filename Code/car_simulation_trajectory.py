@@ -0,0 +1,361 @@
+# ============================================================
+
+# This Python script provides IncrementalSimulation, a Simulation for
+# what-if sessions where cars are added to a field and the run is repeated.
+
+# Until its first collision a car drives its program alone, so its path is
+# fixed by its starting pose and commands. Every step of every car's solo
+# path is indexed by a cell key (step, x, y); two cars can only collide at
+# a key they share. A run resolves those shared keys in step order, which
+# gives the same collisions as Simulation.run. Adding a car only indexes
+# the new path, looks up the keys it shares with the cached paths and
+# resolves again from the first step the new car can interfere.
+
+# Solo paths can be memoized in a TrajectoryCache, keyed by the field size,
+# the starting pose and the program, so fields that reuse the same cars
+# only have to intersect the cached paths.
+
+# Collisions with parked cars (stationary_collisions) depend on where
+# stopped cars wait rather than on the solo paths, and head-on swaps
+# (swap_collisions) are not cell keys, so in those modes every run falls
+# back to running the whole field from step 0.
+
+# ============================================================
+
+from collections import OrderedDict
+from heapq import heapify, heappop, heappush
+
+import numpy as np
+
+from car_simulation import Simulation, DIRECTIONS
+from car_simulation_vectorized import encode_commands, TURNS, STEP_X, STEP_Y
+
+# Cell keys are step * width * height + x * height + y in an int64.
+MAX_KEY = (1 << 63) - 1
+
+
+def solo_keys(cars, width, height, first=0):
+    # The cell key of every step of every car driving alone from its
+    # starting pose, sorted by key then car. Cars are numbered from `first`.
+    # Returns (keys, owners, (x, y, heading) at the end of each solo path).
+    cells = width * height
+    program, offsets, lengths = encode_commands(cars)
+    n = len(cars)
+    x = np.fromiter((car.origin[0] for car in cars), dtype=np.int64, count=n)
+    y = np.fromiter((car.origin[1] for car in cars), dtype=np.int64, count=n)
+    heading = np.fromiter((DIRECTIONS.index(car.origin[2]) for car in cars), dtype=np.int8, count=n)
+
+    keys, owners = [], []
+    step = 0
+    active = np.flatnonzero(lengths > 0)
+    while active.size:
+        command = program[offsets[active] + step]
+        step += 1
+        new_heading = TURNS[command, heading[active]]
+        heading[active] = new_heading
+        ax = np.clip(x[active] + STEP_X[command, new_heading], 0, width - 1)
+        ay = np.clip(y[active] + STEP_Y[command, new_heading], 0, height - 1)
+        x[active], y[active] = ax, ay
+        # Keys of one step all fall in one range, so sorting each step's
+        # keys sorts the whole index; the stable sort keeps cars in order.
+        step_keys = step * cells + ax * height + ay
+        order = np.argsort(step_keys, kind='stable')
+        keys.append(step_keys[order])
+        owners.append(active[order] + first)
+        active = active[lengths[active] > step]
+
+    if not keys:
+        keys, owners = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    return np.concatenate(keys), np.concatenate(owners), (x, y, heading)
+
+
+def shared_keys(keys, owners):
+    # {key: [cars]} of the keys in sorted `keys` held by more than one car.
+    if len(keys) < 2:
+        return {}
+    repeat = keys[1:] == keys[:-1]
+    # Runs of equal keys start where a repeat follows a non-repeat.
+    starts = np.flatnonzero(repeat & ~np.concatenate(([False], repeat[:-1])))
+    ends = np.flatnonzero(repeat & ~np.concatenate((repeat[1:], [False]))) + 2
+    owners = owners.tolist()
+    return {key: owners[a:b] for key, a, b in zip(keys[starts].tolist(), starts.tolist(), ends.tolist())}
+
+
+class TrajectoryCache:
+    # Least recently used solo paths, keyed by
+    # (width, height, x, y, direction, program). A path is stored as its
+    # read-only array of cell keys and its final (x, y, heading).
+    def __init__(self, max_entries=100000, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        path = self.entries.get(key)
+        if path is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return path
+
+    def put(self, key, keys, final):
+        keys.flags.writeable = False
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[0].nbytes
+        self.entries[key] = (keys, final)
+        self.bytes += keys.nbytes
+        while self.entries and (len(self.entries) > self.max_entries or
+                                (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            _, (evicted, _) = self.entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (f"{len(self.entries)} paths, {self.bytes / 2 ** 20:.1f} MiB, {self.hits} hits, "
+                f"{self.misses} misses ({rate:.1%} hit rate), {self.evictions} evictions")
+
+
+# Cache shared by the simulations of this process, see process_cache().
+_process_cache = None
+
+
+def process_cache(max_entries=100000, max_bytes=None):
+    # The TrajectoryCache of this process, e.g. for a batch worker that runs
+    # many fields; later calls resize it.
+    global _process_cache
+    if _process_cache is None:
+        _process_cache = TrajectoryCache(max_entries, max_bytes)
+    _process_cache.max_entries, _process_cache.max_bytes = max_entries, max_bytes
+    return _process_cache
+
+
+def cached_solo_keys(cache, cars, width, height, first=0):
+    # solo_keys() that takes the paths it can from `cache` and only drives
+    # the cars missing from it, each distinct car once.
+    lookups = [(width, height) + car.origin + (car.commands,) for car in cars]
+    paths = {}
+    missing = {}
+    for car, lookup in zip(cars, lookups):
+        if lookup not in paths:
+            paths[lookup] = cache.get(lookup)
+            if paths[lookup] is None:
+                missing[lookup] = car
+
+    if missing:
+        keys, owners, (x, y, heading) = solo_keys(list(missing.values()), width, height)
+        order = np.argsort(owners, kind='stable')
+        counts = np.bincount(owners, minlength=len(missing))
+        for j, (lookup, path_keys) in enumerate(zip(missing, np.split(keys[order], np.cumsum(counts)[:-1]))):
+            # A copy, not a view: a cached view would keep the whole batch
+            # alive after its siblings are evicted, beyond max_bytes.
+            paths[lookup] = (path_keys.copy(), (int(x[j]), int(y[j]), int(heading[j])))
+            cache.put(lookup, *paths[lookup])
+
+    car_paths = [paths[lookup] for lookup in lookups]
+    keys = np.concatenate([path_keys for path_keys, _ in car_paths] or [np.zeros(0, dtype=np.int64)])
+    owners = np.repeat(np.arange(first, first + len(cars), dtype=np.int64), [len(k) for k, _ in car_paths])
+    order = np.argsort(keys, kind='stable')
+    final = np.array([f for _, f in car_paths], dtype=np.int64).reshape(-1, 3)
+    return keys[order], owners[order], (final[:, 0], final[:, 1], final[:, 2])
+
+
+class IncrementalSimulation(Simulation):
+    # Pending paths are merged into the main sorted index once they hold
+    # more than this fraction of it.
+    MERGE_FRACTION = 0.25
+    RUNS_FROM_START = True
+
+    def __init__(self, width, height, stationary_collisions=False, swap_collisions=False, cache=None):
+        super().__init__(width, height, stationary_collisions, swap_collisions)
+        self.cells = width * height
+        # A TrajectoryCache, or the number of paths kept by process_cache().
+        if isinstance(cache, int):
+            cache = process_cache(cache)
+        self.cache = cache
+        self.clear_paths()
+
+    def clear_paths(self):
+        # Sorted cell keys of the cached solo paths, and the car of each.
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.owners = np.zeros(0, dtype=np.int64)
+        # (keys, owners) of paths cached since the last merge.
+        self.pending = []
+        # Keys shared by two or more cars, with the cars at each, and the
+        # shared keys of every car.
+        self.meetings = {}
+        self.car_meetings = []
+        # Per car: the key it collided at (0 if none) and where its solo
+        # path ends.
+        self.collided_key = []
+        self.final = []
+        # Steps each car runs for.
+        self.stops = np.zeros(0, dtype=np.int64)
+        # Cars whose paths are cached.
+        self.traced = 0
+
+    def reset(self):
+        super().reset()
+        self.clear_paths()
+
+    def rewind(self):
+        # Cars are back at their start, so the next run indexes them all again.
+        super().rewind()
+        self.clear_paths()
+
+    def rerun(self):
+        # run() always gives the result from step 0.
+        self.run()
+
+    def run_steps(self):
+        longest = max((len(car.commands) for car in self.cars), default=0)
+        if self.stationary_collisions or self.swap_collisions or (longest + 1) * self.cells > MAX_KEY:
+            self.rewind()
+            Simulation.run_steps(self)
+            return
+
+        new = list(range(self.traced, len(self.cars)))
+        if not new:
+            return
+        self.collided_key.extend(0 for _ in new)
+        self.car_meetings.extend([] for _ in new)
+        self.stops = np.concatenate((self.stops, np.zeros(len(new), dtype=np.int64)))
+
+        met = self.index_paths(self.cars[self.traced:], self.traced)
+        self.traced = len(self.cars)
+        changed = self.resolve(met)
+
+        # Cars whose outcome changed, plus the cars they collided with
+        # before and collide with now.
+        dirty = set(new)
+        for car, old_key in changed.items():
+            dirty.add(car)
+            for key in (old_key, self.collided_key[car]):
+                if key:
+                    dirty.update(self.meetings[key])
+        self.write_back(sorted(dirty))
+
+    def index_paths(self, cars, first):
+        # Cache the paths of `cars` and record the keys they share with each
+        # other and with cached paths. Returns the keys that gained a car.
+        if self.cache is None:
+            keys, owners, (x, y, heading) = solo_keys(cars, self.width, self.height, first)
+        else:
+            keys, owners, (x, y, heading) = cached_solo_keys(self.cache, cars, self.width, self.height, first)
+        self.final.extend(zip(x.tolist(), y.tolist(), heading.tolist()))
+        met = shared_keys(keys, owners)
+
+        # Keys already held by cached cars.
+        for cached_keys, cached_owners in [(self.keys, self.owners)] + self.pending:
+            if not cached_keys.size or not keys.size:
+                continue
+            left = np.searchsorted(cached_keys, keys, 'left')
+            right = np.searchsorted(cached_keys, keys, 'right')
+            for i in np.flatnonzero(right > left).tolist():
+                key = int(keys[i])
+                met.setdefault(key, []).append(int(owners[i]))
+                met[key].extend(cached_owners[left[i]:right[i]].tolist())
+
+        meetings, car_meetings = self.meetings, self.car_meetings
+        for key, cars_at_key in met.items():
+            known = meetings.get(key)
+            if known is None:
+                cars_at_key = sorted(set(cars_at_key))
+                for car in cars_at_key:
+                    car_meetings[car].append(key)
+            else:
+                for car in set(cars_at_key).difference(known):
+                    car_meetings[car].append(key)
+                cars_at_key = sorted(set(cars_at_key).union(known))
+            meetings[key] = cars_at_key
+
+        if keys.size:
+            self.pending.append((keys, owners))
+            if sum(len(k) for k, _ in self.pending) > self.MERGE_FRACTION * len(self.keys):
+                self.merge()
+        return list(met)
+
+    def merge(self):
+        if not self.keys.size and len(self.pending) == 1:
+            self.keys, self.owners = self.pending.pop()
+            return
+        keys = np.concatenate([self.keys] + [k for k, _ in self.pending])
+        owners = np.concatenate([self.owners] + [o for _, o in self.pending])
+        order = np.lexsort((owners, keys))
+        self.keys, self.owners = keys[order], owners[order]
+        self.pending = []
+
+    def resolve(self, keys):
+        # Work out the collisions again at `keys`, and at every later key
+        # whose outcome that changes, in key (so step) order. Cars meeting
+        # at a key collide there if none of them has collided before.
+        # Returns {car: its previous collided key} of the cars that changed.
+        collided_key, meetings, car_meetings = self.collided_key, self.meetings, self.car_meetings
+        queue = list(keys)
+        heapify(queue)
+        queued = set(queue)
+        changed = {}
+        while queue:
+            key = heappop(queue)
+            cars = meetings[key]
+            alive = [car for car in cars if not collided_key[car] or collided_key[car] >= key]
+            collides = len(alive) > 1
+            for car in alive:
+                old_key = collided_key[car]
+                new_key = key if collides else 0
+                if old_key == new_key or (not collides and old_key != key):
+                    continue
+                changed.setdefault(car, old_key)
+                collided_key[car] = new_key
+                if collides:
+                    # The car stops here, so a later collision it had may not happen.
+                    later = [old_key] if old_key else []
+                else:
+                    # The car no longer stops here and drives on.
+                    later = [k for k in car_meetings[car] if k > key]
+                for k in later:
+                    if k not in queued:
+                        queued.add(k)
+                        heappush(queue, k)
+        return changed
+
+    def write_back(self, cars):
+        # Put each car in `cars` where its (solo or cut short) path ends.
+        cells, height, meetings, collided_key = self.cells, self.height, self.meetings, self.collided_key
+        stops = self.stops
+        for i in cars:
+            car = self.cars[i]
+            key = collided_key[i]
+            car.collision_record = ()
+            if key:
+                stop = key // cells
+                # The heading after `stop` commands is set by the turns among them.
+                turns = car.commands.count(b'R', 0, stop) - car.commands.count(b'L', 0, stop)
+                car.x, car.y = key % cells // height, key % height
+                car.direction = DIRECTIONS[(DIRECTIONS.index(car.origin[2]) + turns) % 4]
+                car.collided = True
+                for other in meetings[key]:
+                    if other != i and collided_key[other] == key:
+                        car.record_collision(other, car.x, car.y, stop)
+            else:
+                stop = len(car.commands)
+                x, y, heading = self.final[i]
+                car.x, car.y, car.direction = x, y, DIRECTIONS[heading]
+                car.collided = False
+            car.cursor = stop
+            car.step = stop
+            stops[i] = stop
+        self.steps = int(stops.max()) if stops.size else 0
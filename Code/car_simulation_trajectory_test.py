@@ -0,0 +1,176 @@
+# ===============================================================================================
+
+# This Python test script checks that IncrementalSimulation in car_simulation_trajectory.py gives
+# the same result as Simulation.run after every car added in a what-if session.
+
+# ===============================================================================================
+
+
+import random
+import unittest
+
+from car_simulation import Simulation
+from car_simulation_trajectory import IncrementalSimulation, TrajectoryCache, cached_solo_keys, process_cache, solo_keys
+from car_simulation_test_helpers import build, random_cars, SameResultMixin
+
+
+class TestIncrementalSimulation(SameResultMixin, unittest.TestCase):
+    def test_solo_keys(self):
+        """Test if a solo path is indexed by step and cell, clamped at the boundary."""
+        simulation = build(Simulation, 3, 3, [("A", 1, 1, 'N', "FFR")])
+        keys, owners, (x, y, heading) = solo_keys(simulation.cars, 3, 3)
+        self.assertEqual(keys.tolist(), [1 * 9 + 1 * 3 + 2, 2 * 9 + 1 * 3 + 2, 3 * 9 + 1 * 3 + 2])
+        self.assertEqual(owners.tolist(), [0, 0, 0])
+        self.assertEqual((x.tolist(), y.tolist(), heading.tolist()), ([1], [2], [1]))
+
+    def test_add_car_after_run(self):
+        """Test if a car added after a run is resolved against the cached paths."""
+        simulation = build(IncrementalSimulation, 10, 10, [("A", 1, 2, 'N', "FFRFFFFRRL")])
+        simulation.run()
+        self.assertEqual(simulation.result_lines(), ['- A, (5,4) S'])
+        simulation.add_car("B", 7, 8, 'W', "FFLFFFFFFF")
+        simulation.run()
+        self.assertEqual(simulation.result_lines(), ['- A, collides with B at (5, 4) at step 7',
+                                                     '- B, collides with A at (5, 4) at step 7'])
+
+    def test_new_car_breaks_up_a_collision(self):
+        """Test if a new car that stops one car earlier undoes that car's later collision."""
+        simulation = build(IncrementalSimulation, 5, 5, [("A", 0, 2, 'E', "FFFF"), ("B", 4, 2, 'W', "FFFF")])
+        simulation.run()
+        self.assertSameAsRerun(simulation)
+        simulation.add_car("C", 1, 3, 'S', "F")
+        simulation.run()
+        self.assertSameAsRerun(simulation)
+        self.assertEqual(simulation.result_lines()[1], '- B, (0,2) W')
+
+    def test_random_what_if_sessions(self):
+        """Test random fields where cars are added one or a few at a time."""
+        rng = random.Random(20250319)
+        for _ in range(40):
+            width, height = rng.randint(1, 8), rng.randint(1, 8)
+            simulation = IncrementalSimulation(width, height)
+            simulation.MERGE_FRACTION = rng.choice([0.0, 0.25, 10.0])
+            cars = random_cars(rng, width, height, rng.randint(1, 25), 30)
+            while cars:
+                for _ in range(rng.randint(1, 3)):
+                    if cars:
+                        simulation.add_car(*cars.pop())
+                simulation.run()
+                self.assertSameAsRerun(simulation)
+
+    def test_rerun_and_rewind(self):
+        """Test if running again, rewinding and resetting keep results correct."""
+        simulation = build(IncrementalSimulation, 5, 5, [("A", 0, 1, 'N', "F"), ("B", 0, 3, 'S', "F")])
+        simulation.rerun()
+        simulation.rerun()
+        self.assertSameAsRerun(simulation)
+        simulation.rewind()
+        self.assertEqual((simulation.cars[0].y, simulation.cars[0].collided), (1, False))
+        simulation.run()
+        self.assertSameAsRerun(simulation)
+        simulation.reset()
+        simulation.add_car("C", 2, 2, 'E', "FF")
+        simulation.run()
+        self.assertEqual(simulation.result_lines(), ['- C, (4,2) E'])
+
+    def test_stationary_collisions(self):
+        """Test if stationary collisions run the whole field again."""
+        simulation = build(IncrementalSimulation, 5, 5, [("A", 0, 0, 'N', "FF"), ("B", 0, 1, 'N', "")],
+                           stationary_collisions=True)
+        simulation.run()
+        simulation.add_car("C", 2, 0, 'N', "FFF")
+        simulation.run()
+        self.assertSameAsRerun(simulation, stationary_collisions=True)
+        self.assertTrue(simulation.cars[0].collided)
+
+    def test_swap_collisions(self):
+        """Test if head-on swaps run the whole field again."""
+        simulation = build(IncrementalSimulation, 5, 5, [("A", 0, 0, 'E', "FF")], swap_collisions=True)
+        simulation.run()
+        simulation.add_car("B", 3, 0, 'W', "FF")
+        simulation.run()
+        self.assertSameAsRerun(simulation, swap_collisions=True)
+        self.assertEqual(simulation.result_lines(), ['- A, collides with B at (2, 0) at step 2',
+                                                     '- B, collides with A at (1, 0) at step 2'])
+
+
+class TestTrajectoryCache(unittest.TestCase):
+    def test_cached_paths_match(self):
+        """Test if paths taken from the cache are the same as paths driven again."""
+        rng = random.Random(20250320)
+        cache = TrajectoryCache()
+        for _ in range(20):
+            cars = build(Simulation, 6, 6, random_cars(rng, 2, 2, rng.randint(0, 20), 6)).cars
+            expected = solo_keys(cars, 6, 6, 3)
+            actual = cached_solo_keys(cache, cars, 6, 6, 3)
+            self.assertEqual(actual[0].tolist(), expected[0].tolist())
+            self.assertEqual(actual[1].tolist(), expected[1].tolist())
+            for a, e in zip(actual[2], expected[2]):
+                self.assertEqual(a.tolist(), e.tolist())
+        self.assertGreater(cache.hits, 0)
+
+    def test_hit_and_miss_statistics(self):
+        """Test if lookups are counted and each distinct car is driven once."""
+        cache = TrajectoryCache()
+        cars = build(Simulation, 5, 5, [("A", 0, 0, 'N', "FF"), ("B", 0, 0, 'N', "FF"), ("C", 1, 1, 'E', "F")]).cars
+        cached_solo_keys(cache, cars, 5, 5)
+        self.assertEqual((len(cache), cache.hits, cache.misses), (2, 0, 2))
+        cached_solo_keys(cache, cars, 5, 5)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        # The same car on a field of another size is a different path.
+        cached_solo_keys(cache, cars[:1], 6, 5)
+        self.assertEqual((len(cache), cache.misses), (3, 3))
+        self.assertIn("3 paths", cache.stats())
+
+    def test_least_recently_used_is_evicted(self):
+        """Test if the cache evicts the least recently used paths beyond its size."""
+        cache = TrajectoryCache(max_entries=2)
+        a, b, c = build(Simulation, 5, 5, [("A", 0, 0, 'N', "F"), ("B", 1, 1, 'N', "F"), ("C", 2, 2, 'N', "F")]).cars
+        cached_solo_keys(cache, [a], 5, 5)
+        cached_solo_keys(cache, [b], 5, 5)
+        cached_solo_keys(cache, [a], 5, 5)
+        cached_solo_keys(cache, [c], 5, 5)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual([key[2:4] for key in cache.entries], [(0, 0), (2, 2)])
+
+        cache = TrajectoryCache(max_bytes=8 * 3)
+        cached_solo_keys(cache, [a, b], 5, 5)
+        self.assertEqual((len(cache), cache.bytes), (2, 16))
+        cached_solo_keys(cache, build(Simulation, 5, 5, [("D", 3, 3, 'N', "FF")]).cars, 5, 5)
+        self.assertEqual((len(cache), cache.bytes), (2, 24))
+        self.assertEqual([key[2:4] for key in cache.entries], [(1, 1), (3, 3)])
+
+    def test_cached_paths_own_their_memory(self):
+        """Test if every cached path holds its own array, so evicting it frees its bytes."""
+        cache = TrajectoryCache(max_entries=2)
+        cars = build(Simulation, 50, 50, [(f"Car{i}", i, 0, 'N', "F" * 40) for i in range(50)]).cars
+        cached_solo_keys(cache, cars, 50, 50)
+        self.assertEqual(len(cache), 2)
+        for keys, _ in cache.entries.values():
+            self.assertIsNone(keys.base)
+        self.assertEqual(cache.bytes, sum(keys.nbytes for keys, _ in cache.entries.values()))
+
+    def test_fields_share_the_cache(self):
+        """Test if fields that reuse cars take their paths from the cache and still match Simulation.run."""
+        rng = random.Random(20250321)
+        cache = TrajectoryCache()
+        programs = ["FFRFF", "LFFRF", "FFFFF", "RFLF"]
+        for _ in range(30):
+            cars = [(f"Car{i}", rng.randrange(4), rng.randrange(4), rng.choice("NESW"), rng.choice(programs))
+                    for i in range(rng.randint(1, 12))]
+            simulation = build(IncrementalSimulation, 4, 4, cars, cache=cache)
+            simulation.run()
+            expected = build(Simulation, 4, 4, cars)
+            expected.run()
+            self.assertEqual(simulation.result_lines(), expected.result_lines())
+        self.assertGreater(cache.hits, 0)
+
+    def test_process_cache(self):
+        """Test if a cache size selects the cache shared by the process."""
+        simulation = IncrementalSimulation(5, 5, cache=10)
+        self.assertIs(simulation.cache, process_cache(10))
+        self.assertEqual(simulation.cache.max_entries, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
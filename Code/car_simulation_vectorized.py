@@ -0,0 +1,255 @@
+# ============================================================
+
+# This Python script provides a NumPy engine for the car simulation.
+# Car state is kept as a struct of arrays (x, y, heading, command cursor
+# and collided flag) and every active car is advanced in one vectorized
+# step. The result written back to the Car objects matches Simulation.run.
+
+# ============================================================
+
+import numpy as np
+
+from car_simulation import Simulation, DIRECTIONS, MOVES, COMMANDS
+
+# Command codes follow the order of COMMANDS: 0 = L, 1 = R, 2 = F. Any other
+# byte is 3, a command that is used up without turning or moving, as
+# Car.process_command ignores it.
+# Headings follow the order of DIRECTIONS: 0 = N, 1 = E, 2 = S, 3 = W.
+NO_OP = len(COMMANDS)
+COMMAND_CODES = np.full(256, NO_OP, dtype=np.int8)
+for code, command in enumerate(COMMANDS):
+    COMMAND_CODES[ord(command)] = code
+
+# TURNS[command, heading] is the heading after the command is processed.
+TURNS = np.array([
+    [(heading - 1) % 4 for heading in range(4)],  # L
+    [(heading + 1) % 4 for heading in range(4)],  # R
+    [heading for heading in range(4)],            # F
+    [heading for heading in range(4)],            # anything else
+], dtype=np.int8)
+
+# STEP_X / STEP_Y[command, heading] is the attempted move of the command.
+STEP_X = np.array([[0] * 4, [0] * 4, [MOVES[d][0] for d in DIRECTIONS], [0] * 4], dtype=np.int64)
+STEP_Y = np.array([[0] * 4, [0] * 4, [MOVES[d][1] for d in DIRECTIONS], [0] * 4], dtype=np.int64)
+
+
+# Cells are keyed by x * height + y while that fits in an int64; on wider
+# fields they are keyed by their (x, y) pair, which sorts and compares the
+# same way but more slowly.
+WIDE_FIELD_CELLS = 1 << 63
+CELL = np.dtype([('x', '<i8'), ('y', '<i8')])
+
+
+def cell_keys(x, y, height, wide=False):
+    if not wide:
+        return x * height + y
+    keys = np.empty(len(x), dtype=CELL)
+    keys['x'], keys['y'] = x, y
+    return keys
+
+
+# A move runs along an edge between two neighbouring cells. The edge is
+# keyed by its lower cell and its axis, (x * height + y) * 2 + axis, so both
+# directions of an edge share a key; wider fields use an (x, y, axis) key.
+EDGE = np.dtype([('x', '<i8'), ('y', '<i8'), ('axis', '<i8')])
+
+
+def edge_keys(x0, y0, x1, y1, height, wide=False):
+    # One coordinate is the same at both ends, so the lower cell is the
+    # lower of each coordinate.
+    low_x, low_y = np.minimum(x0, x1), np.minimum(y0, y1)
+    axis = (x0 != x1).astype(np.int64)
+    if not wide:
+        return (low_x * height + low_y) * 2 + axis
+    keys = np.empty(len(x0), dtype=EDGE)
+    keys['x'], keys['y'], keys['axis'] = low_x, low_y, axis
+    return keys
+
+
+def encode_commands(cars):
+    """Encode the command buffers of all cars into one flat int8 buffer.
+
+    Returns (program, offsets, lengths); the commands of car i are
+    program[offsets[i]:offsets[i] + lengths[i]].
+    """
+    lengths = np.fromiter((len(car.commands) for car in cars), dtype=np.int64, count=len(cars))
+    offsets = np.zeros(len(cars), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    program = COMMAND_CODES[np.frombuffer(b"".join(car.commands for car in cars), dtype=np.uint8)]
+    return program, offsets, lengths
+
+
+def collision_pairs(keys, members):
+    """Find cars of this step that share a cell.
+
+    keys holds the cell key of every car in members (sorted by car index).
+    Returns the colliding car indices and a list of (car, other) pairs,
+    where other is a car processed earlier in the same step.
+    """
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    same = sorted_keys[1:] == sorted_keys[:-1]
+    if not same.any():
+        return members[:0], []
+
+    # Boundaries of the runs of equal keys.
+    starts = np.flatnonzero(np.concatenate(([True], ~same)))
+    ends = np.append(starts[1:], len(sorted_keys))
+    groups = np.flatnonzero(ends - starts > 1)
+
+    pairs = []
+    collided = []
+    for g in groups.tolist():
+        group = members[order[starts[g]:ends[g]]].tolist()
+        collided.extend(group)
+        for m in range(1, len(group)):
+            for j in range(m):
+                pairs.append((group[m], group[j]))
+    pairs.sort()
+    return np.array(collided, dtype=np.int64), pairs
+
+
+def swap_pairs(keys, forward, members):
+    """Find cars of this step that swapped cells head-on.
+
+    keys holds the edge key of every car in members that moved (sorted by
+    car index) and forward whether it drove the edge from its lower cell.
+    Returns the colliding car indices and a list of (car, other) pairs,
+    where other is the car processed earlier of the two.
+    """
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    same = sorted_keys[1:] == sorted_keys[:-1]
+    if not same.any():
+        return members[:0], []
+
+    starts = np.flatnonzero(np.concatenate(([True], ~same)))
+    ends = np.append(starts[1:], len(sorted_keys))
+    # Only edges driven both ways in this step hold a swap.
+    ways = forward[order]
+    driven = np.add.reduceat(ways.astype(np.int64), starts)
+    groups = np.flatnonzero((driven > 0) & (driven < ends - starts))
+
+    pairs = []
+    collided = []
+    for g in groups.tolist():
+        group = members[order[starts[g]:ends[g]]]
+        way = ways[starts[g]:ends[g]]
+        one_way, other_way = group[way].tolist(), group[~way].tolist()
+        collided.extend(one_way + other_way)
+        pairs.extend((max(a, b), min(a, b)) for a in one_way for b in other_way)
+    pairs.sort()
+    return np.array(collided, dtype=np.int64), pairs
+
+
+def parked_pairs(keys, members, parked_keys, parked_cars):
+    """Find cars of this step that move into a cell of a parked car.
+
+    parked_keys is sorted, with parked_cars in the same order. Returns the
+    parked cars that were hit and a list of (car, parked car) pairs.
+    """
+    left = np.searchsorted(parked_keys, keys, side="left")
+    right = np.searchsorted(parked_keys, keys, side="right")
+    found = np.flatnonzero(right > left)
+    pairs = []
+    hit = []
+    for i in found.tolist():
+        for p in parked_cars[left[i]:right[i]].tolist():
+            pairs.append((int(members[i]), p))
+            hit.append(p)
+    return np.array(hit, dtype=np.int64), pairs
+
+
+class VectorizedSimulation(Simulation):
+
+    def run_steps(self):
+        cars = self.cars
+        if not cars:
+            return
+
+        width, height = self.width, self.height
+        wide = width * height >= WIDE_FIELD_CELLS
+        swaps = self.swap_collisions
+        wide_edges = 2 * width * height >= WIDE_FIELD_CELLS
+        program, offsets, lengths = encode_commands(cars)
+
+        n = len(cars)
+        x = np.fromiter((car.x for car in cars), dtype=np.int64, count=n)
+        y = np.fromiter((car.y for car in cars), dtype=np.int64, count=n)
+        heading = np.fromiter((DIRECTIONS.index(car.direction) for car in cars), dtype=np.int8, count=n)
+        collided = np.fromiter((car.collided for car in cars), dtype=bool, count=n)
+        cursor = np.fromiter((car.cursor for car in cars), dtype=np.int64, count=n)
+
+        # (step, car, other) for every collision, in processing order.
+        events = []
+
+        step = self.steps
+        active = np.flatnonzero((cursor < lengths) & ~collided)
+
+        # Cells of cars that are not moving, sorted by (cell key, car).
+        stationary = self.stationary_collisions
+        if stationary:
+            parked_cars = np.flatnonzero(~((cursor < lengths) & ~collided))
+            parked_keys = cell_keys(x[parked_cars], y[parked_cars], height, wide)
+            order = np.lexsort((parked_cars, parked_keys))
+            parked_cars, parked_keys = parked_cars[order], parked_keys[order]
+
+        while active.size:
+            command = program[offsets[active] + cursor[active]]
+            new_heading = TURNS[command, heading[active]]
+            heading[active] = new_heading
+
+            # A car moves along one axis at a time, so clamping a move to the
+            # field is the same as ignoring a move off it.
+            old_x, old_y = x[active], y[active]
+            ax = np.clip(old_x + STEP_X[command, new_heading], 0, width - 1)
+            ay = np.clip(old_y + STEP_Y[command, new_heading], 0, height - 1)
+            x[active], y[active] = ax, ay
+            cursor[active] += 1
+
+            keys = cell_keys(ax, ay, height, wide)
+            hit, pairs = collision_pairs(keys, active)
+            if pairs:
+                collided[hit] = True
+            if stationary and parked_cars.size:
+                parked_hit, hit_pairs = parked_pairs(keys, active, parked_keys, parked_cars)
+                if hit_pairs:
+                    collided[parked_hit] = True
+                    collided[[car for car, _ in hit_pairs]] = True
+                    pairs = sorted(pairs + hit_pairs)
+            if swaps:
+                moved = np.flatnonzero((ax != old_x) | (ay != old_y))
+                if moved.size > 1:
+                    mx0, my0, mx1, my1 = old_x[moved], old_y[moved], ax[moved], ay[moved]
+                    edges = edge_keys(mx0, my0, mx1, my1, height, wide_edges)
+                    swap_hit, swapped = swap_pairs(edges, (mx0 < mx1) | (my0 < my1), active[moved])
+                    if swapped:
+                        collided[swap_hit] = True
+                        pairs = sorted(pairs + swapped)
+            events.extend((step, car, other) for car, other in pairs)
+
+            moving = (cursor[active] < lengths[active]) & ~collided[active]
+            if stationary and not moving.all():
+                stopped = active[~moving]
+                parked_cars = np.concatenate((parked_cars, stopped))
+                parked_keys = np.concatenate((parked_keys, keys[~moving]))
+                order = np.lexsort((parked_cars, parked_keys))
+                parked_cars, parked_keys = parked_cars[order], parked_keys[order]
+            active = active[moving]
+            step += 1
+
+        self.steps = step
+        self._write_back(x, y, heading, cursor, collided, events)
+
+    def _write_back(self, x, y, heading, cursor, collided, events):
+        cars = self.cars
+        for car, cx, cy, h, c, hit in zip(cars, x.tolist(), y.tolist(), heading.tolist(), cursor.tolist(), collided.tolist()):
+            car.x, car.y = cx, cy
+            car.direction = DIRECTIONS[h]
+            car.cursor = c
+            car.collided = hit
+
+        for step, k, j in events:
+            car, c = cars[k], cars[j]
+            c.record_collision(k, c.x, c.y, step + 1)
+            car.record_collision(j, car.x, car.y, step + 1)
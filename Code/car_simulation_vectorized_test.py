@@ -0,0 +1,99 @@
+# ===============================================================================================
+
+# This Python test script checks that the NumPy engine in car_simulation_vectorized.py
+# produces exactly the same cars, positions and collision records as Simulation.run.
+
+# ===============================================================================================
+
+
+import random
+import unittest
+
+from car_simulation import Simulation
+from car_simulation_vectorized import VectorizedSimulation
+from car_simulation_test_helpers import build, random_cars, SameResultMixin
+
+
+class TestVectorizedSimulation(SameResultMixin, unittest.TestCase):
+    engine_class = VectorizedSimulation
+
+    def test_single_car(self):
+        """Test the single car scenario from the specification."""
+        self.assertSameResult(10, 10, [("A", 1, 2, 'N', "FFRFFFFRRL")])
+
+    def test_two_cars_collide(self):
+        """Test the two car collision scenario from the specification."""
+        self.assertSameResult(10, 10, [("A", 1, 2, 'N', "FFRFFFFRRL"), ("B", 7, 8, 'W', "FFLFFFFFFF")])
+
+    def test_cars_that_do_not_move_but_collide(self):
+        """Test a pile-up of cars that share their start position."""
+        cars = [(f"Car{c}", 1, 1, 'N', "LLLLLLLLLLRRRRRRRRRRRRRR") for c in "ABCD"]
+        self.assertSameResult(5, 5, cars)
+
+    def test_move_out_of_bound(self):
+        """Test that moves beyond the field boundary are ignored."""
+        self.assertSameResult(5, 5, [("A", 0, 0, 'W', "F" * 10), ("B", 1, 1, 'N', "F" * 10)])
+
+    def test_empty_simulation(self):
+        """Test that a field without cars runs."""
+        self.assertSameResult(5, 5, [])
+
+    def test_random_scenarios(self):
+        """Test random crowded fields against Simulation.run."""
+        rng = random.Random(20250315)
+        for _ in range(50):
+            width, height = rng.randint(1, 8), rng.randint(1, 8)
+            cars = random_cars(rng, width, height, rng.randint(1, 30), 40)
+            self.assertSameResult(width, height, cars)
+            self.assertSameResult(width, height, cars, stationary_collisions=True)
+
+    def test_stationary_collisions(self):
+        """Test cars driving into parked and collided cars."""
+        cars = [("A", 0, 2, 'E', "FFFF"), ("B", 2, 2, 'N', ""), ("C", 3, 0, 'N', "FF"), ("D", 3, 4, 'S', "FF"),
+                ("E", 3, 3, 'W', "LLLLFFFF")]
+        self.assertSameResult(5, 5, cars, stationary_collisions=True)
+
+    def test_resume_after_iter_steps(self):
+        """Test that run() continues a simulation stopped part way through iter_steps."""
+        rng = random.Random(20250316)
+        for _ in range(20):
+            cars = random_cars(rng, 6, 6, 15, 30)
+            expected = build(Simulation, 6, 6, cars)
+            actual = build(VectorizedSimulation, 6, 6, cars)
+            expected.run()
+            for delta in actual.iter_steps():
+                if delta.step == 10:
+                    break
+            actual.run()
+            self.assertEqual(actual.steps, expected.steps)
+            self.assertEqual(actual.result_lines(), expected.result_lines())
+
+    def test_sparse_fields(self):
+        """Test sparse fields with 64-bit coordinates, including ones whose cell count overflows an int64."""
+        edge = (1 << 63) - 1
+        cars = [("A", 0, 0, 'S', "FFRFF"), ("B", 1, 3, 'W', "FLFFF"), ("C", edge - 1, edge - 1, 'N', "FFRFFF"),
+                ("D", edge - 1, edge - 3, 'E', "LFFLFF")]
+        self.assertSameResult(10 ** 9, 10 ** 9, cars[:2])
+        self.assertSameResult(edge, edge, cars)
+        self.assertSameResult(edge, edge, cars, stationary_collisions=True)
+
+    def test_swap_collisions(self):
+        """Test head-on swaps against Simulation.run, on a normal and on the widest field."""
+        rng = random.Random(20250320)
+        for _ in range(50):
+            width, height = rng.randint(1, 8), rng.randint(1, 8)
+            cars = random_cars(rng, width, height, rng.randint(1, 30), 40)
+            self.assertSameResult(width, height, cars, swap_collisions=True)
+            self.assertSameResult(width, height, cars, swap_collisions=True, stationary_collisions=True)
+        edge = (1 << 63) - 1
+        cars = [("A", edge - 2, 5, 'E', "FFF"), ("B", edge - 1, 5, 'W', "FFF"), ("C", 0, 0, 'N', "F"),
+                ("D", 0, 1, 'S', "F")]
+        self.assertSameResult(edge, edge, cars, swap_collisions=True)
+
+    def test_invalid_command(self):
+        """Test if an invalid command byte is used up without a turn or move, as in Simulation.run."""
+        self.assertSameResult(5, 5, [("A", 0, 0, 'N', "FXF"), ("B", 0, 3, 'S', "?F")])
+
+
+if __name__ == "__main__":
+    unittest.main()